@@ -0,0 +1,60 @@
+# Compare the encoded size and the encode/decode time of the dictionary codecs.
+#
+# Run it on the board (copy the file with the library) or on the host:
+#   micropython benchmarks/bench_codec.py
+#   python3 benchmarks/bench_codec.py
+
+import sys
+
+# the library next to the benchmarks, from any working directory (no os.path on MicroPython)
+sys.path.insert(0, (__file__.rsplit('/', 1)[0] if '/' in __file__ else '.') + '/../src')
+
+try:
+    from time import ticks_us, ticks_diff
+except ImportError:
+    from time import perf_counter
+
+    def ticks_us():
+        return int(perf_counter() * 1000000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+from lora_e220_codec import JsonCodec, CompactCodec
+from lora_e220_schema import SchemaCodec
+
+ITERATIONS = 1000
+
+SAMPLES = {
+    'telemetry': {'temp': 21.5, 'hum': 40, 'bat': 3.7, 'id': 12},
+    'status': {'node': 'greenhouse-01', 'ok': True, 'err': None, 'uptime': 123456},
+    'list': {'samples': [12, 15, 13, 18, 21, 19, 17, 16], 'rssi': -87},
+}
+
+
+def measure(function, value):
+    start = ticks_us()
+    for _ in range(ITERATIONS):
+        function(value)
+    return ticks_diff(ticks_us(), start) / ITERATIONS
+
+
+# telemetry has always the same keys, it can be sent with a schema
+SCHEMAS = SchemaCodec()
+SCHEMAS.register(1, (('temp', 'f'), ('hum', 'B'), ('bat', 'f'), ('id', 'H')))
+
+
+def main():
+    codecs = (('json', JsonCodec()), ('compact', CompactCodec()))
+    print('{:<10} {:<8} {:>6} {:>12} {:>12}'.format('sample', 'codec', 'bytes', 'encode us', 'decode us'))
+    for name, sample in SAMPLES.items():
+        sample_codecs = codecs + ((('schema', SCHEMAS.codec(1)),) if name == 'telemetry' else ())
+        for codec_name, codec in sample_codecs:
+            encoded = codec.encode(sample)
+            if isinstance(encoded, str):
+                encoded = encoded.encode('utf-8')
+            print('{:<10} {:<8} {:>6} {:>12.1f} {:>12.1f}'.format(
+                name, codec_name, len(encoded), measure(codec.encode, sample), measure(codec.decode, encoded)))
+
+
+main()
@@ -0,0 +1,91 @@
+# Memory per Configuration instance and time of the register encode/decode.
+#
+# Run it on the board (copy the file with the library) or on the host:
+#   micropython benchmarks/bench_configuration.py
+#   python3 benchmarks/bench_configuration.py
+
+import gc
+import sys
+
+# the library next to the benchmarks, from any working directory (no os.path on MicroPython)
+sys.path.insert(0, (__file__.rsplit('/', 1)[0] if '/' in __file__ else '.') + '/../src')
+
+try:
+    from time import ticks_us, ticks_diff
+except ImportError:
+    from time import perf_counter
+
+    def ticks_us():
+        return int(perf_counter() * 1000000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+try:
+    mem_alloc = gc.mem_alloc
+except AttributeError:
+    # CPython: tracemalloc counts the bytes allocated since start
+    import tracemalloc
+    tracemalloc.start()
+
+    def mem_alloc():
+        return tracemalloc.get_traced_memory()[0]
+
+from lora_e220 import Configuration
+
+ITERATIONS = 1000
+INSTANCES = 50
+MODEL = '400T22D'
+RAW = bytes((0xC1, 0x00, 0x08, 0x01, 0x02, 0x62, 0x00, 0x17, 0x03, 0x00, 0x00))
+
+
+def measure(function, *args):
+    start = ticks_us()
+    for _ in range(ITERATIONS):
+        function(*args)
+    return ticks_diff(ticks_us(), start) / ITERATIONS
+
+
+def memory(function):
+    keep = []
+    gc.collect()
+    start = mem_alloc()
+    for _ in range(INSTANCES):
+        keep.append(function())
+    used = mem_alloc() - start
+    del keep
+    return used / INSTANCES
+
+
+def new_configuration():
+    return Configuration(MODEL)
+
+
+def new_configuration_with_fields():
+    configuration = Configuration(MODEL)
+    configuration.SPED.airDataRate
+    configuration.OPTION.subPacketSetting
+    configuration.TRANSMISSION_MODE.enableRSSI
+    configuration.CRYPT.CRYPT_H
+    return configuration
+
+
+def read_fields(configuration):
+    return configuration.SPED.airDataRate + configuration.OPTION.subPacketSetting + \
+        configuration.TRANSMISSION_MODE.enableRSSI + configuration.CHAN
+
+
+def main():
+    configuration = new_configuration_with_fields()
+    print('{:<28} {:>10}'.format('memory per instance', 'bytes'))
+    print('{:<28} {:>10.0f}'.format('configuration', memory(new_configuration)))
+    print('{:<28} {:>10.0f}'.format('configuration + views', memory(new_configuration_with_fields)))
+    print('')
+    print('{:<28} {:>10}'.format('operation', 'us'))
+    print('{:<28} {:>10.2f}'.format('Configuration(model)', measure(Configuration, MODEL)))
+    print('{:<28} {:>10.2f}'.format('from_bytes', measure(configuration.from_bytes, RAW)))
+    print('{:<28} {:>10.2f}'.format('to_bytes', measure(configuration.to_bytes)))
+    print('{:<28} {:>10.2f}'.format('read 4 fields', measure(read_fields, configuration)))
+
+
+main()
@@ -0,0 +1,111 @@
+# Import time and heap of the core driver in the split layout (the diagnostics, the codecs and
+# ure loaded only when used) against the layout before the split (the core imported all of them),
+# then the cost of every layer loaded later on first use.
+#
+# Run it on the board after a soft reset (copy the file with the library), it works with the
+# modules frozen in the firmware too:
+#   micropython benchmarks/bench_import.py
+#   python3 benchmarks/bench_import.py
+
+import gc
+import sys
+
+# the library next to the benchmarks, from any working directory (no os.path on MicroPython)
+sys.path.insert(0, (__file__.rsplit('/', 1)[0] if '/' in __file__ else '.') + '/../src')
+
+try:
+    from time import ticks_us, ticks_diff
+except ImportError:
+    from time import perf_counter
+
+    def ticks_us():
+        return int(perf_counter() * 1000000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+try:
+    mem_alloc = gc.mem_alloc
+except AttributeError:
+    # CPython: tracemalloc counts the bytes allocated since start
+    import tracemalloc
+    tracemalloc.start()
+
+    def mem_alloc():
+        return tracemalloc.get_traced_memory()[0]
+
+# the modules the core imported before the split: the diagnostics were inside lora_e220
+BEFORE = ('lora_e220', 'lora_e220_diagnostics', 'lora_e220_codec', 'lora_e220_schema', 'ure')
+AFTER = ('lora_e220',)
+RUNS = 5
+
+LAYERS = (
+    ('descriptions', ('lora_e220_descriptions',)),
+    ('diagnostics', ('lora_e220_diagnostics',)),
+    ('codecs', ('lora_e220_codec', 'lora_e220_schema')),
+    ('airtime', ('lora_e220_airtime',)),
+    ('async', ('lora_e220_async',)),
+)
+
+LAZY = ('lora_e220_descriptions', 'lora_e220_diagnostics', 'lora_e220_codec', 'lora_e220_schema',
+        'lora_e220_airtime', 'ure')
+
+
+def import_module(name):
+    try:
+        __import__(name)
+    except ImportError:
+        if name != 'ure':
+            raise
+        # CPython
+        __import__('re')
+
+
+def unload():
+    # every run imports the library from scratch
+    for name in list(sys.modules):
+        if name.startswith('lora_e220') or name == 'ure':
+            del sys.modules[name]
+
+
+def load(modules):
+    gc.collect()
+    heap = mem_alloc()
+    start = ticks_us()
+    for name in modules:
+        import_module(name)
+    elapsed = ticks_diff(ticks_us(), start)
+    gc.collect()
+    return elapsed, mem_alloc() - heap
+
+
+def compare():
+    # in turns, the best time of the runs (the heap is the same at every run)
+    results = {'before': [], 'after': []}
+    for _ in range(RUNS):
+        for name, modules in (('before', BEFORE), ('after', AFTER)):
+            unload()
+            results[name].append(load(modules))
+    unload()
+    before = (min(run[0] for run in results['before']), results['before'][-1][1])
+    after = (min(run[0] for run in results['after']), results['after'][-1][1])
+    print('{:<14} {:>10} {:>10}'.format('core layout', 'import us', 'heap bytes'))
+    print('{:<14} {:>10} {:>10}'.format('before split', before[0], before[1]))
+    print('{:<14} {:>10} {:>10}'.format('after split', after[0], after[1]))
+    print('{:<14} {:>10} {:>10}'.format('saved', before[0] - after[0], before[1] - after[1]))
+
+
+def main():
+    compare()
+
+    load(AFTER)
+    loaded = [module for module in LAZY if module in sys.modules]
+    print('lazy modules loaded by the core: {}'.format(', '.join(loaded) if loaded else 'none'))
+    print()
+    print('{:<14} {:>10} {:>10}'.format('first use of', 'import us', 'heap bytes'))
+    for name, modules in LAYERS:
+        elapsed, heap = load(modules)
+        print('{:<14} {:>10} {:>10}'.format(name, elapsed, heap))
+
+
+main()
@@ -0,0 +1,66 @@
+# Messages per second sent and received by the driver on two simulated modules, against the
+# maximum rate of the airtime model. The time is simulated (VirtualClock): the result is the
+# same at every run and the run takes a few seconds.
+#
+# Run it on the host (or on the board, it doesn't need a module):
+#   python3 benchmarks/bench_throughput.py
+
+import sys
+
+# the library next to the benchmarks, from any working directory (no os.path on MicroPython)
+sys.path.insert(0, (__file__.rsplit('/', 1)[0] if '/' in __file__ else '.') + '/../src')
+
+from lora_e220 import LoRaE220
+from lora_e220_simulator import Air, SimulatedE220
+from lora_e220_constants import AirDataRate
+from lora_e220_platform import VirtualClock
+
+MODEL = '400T22D'
+MESSAGES = 100
+SIZES = (10, 50, 150)
+AIR_DATA_RATES = (('2.4kbps', AirDataRate.AIR_DATA_RATE_010_24), ('62.5kbps', AirDataRate.AIR_DATA_RATE_111_625))
+
+
+def node(air, clock):
+    module = SimulatedE220(MODEL, air, clock=clock)
+    lora = LoRaE220(MODEL, module.uart, aux_pin=module.aux, m0_pin=module.m0, m1_pin=module.m1, clock=clock)
+    lora.begin()
+    return lora
+
+
+def configure(lora, air_data_rate):
+    code, configuration = lora.get_configuration()
+    configuration.SPED.airDataRate = air_data_rate
+    lora.set_configuration(configuration, False)
+    return configuration
+
+
+def run(sender, receiver, size):
+    clock = sender.clock
+    message = 'x' * size
+    received = 0
+    start = clock.ticks_us()
+    for _ in range(MESSAGES):
+        sender.send_transparent_message(message)
+        code, value = receiver.receive_message()
+        if value == message:
+            received += 1
+    return MESSAGES * 1000000 / clock.ticks_diff(clock.ticks_us(), start), received
+
+
+def main():
+    air = Air()
+    clock = VirtualClock()
+    sender = node(air, clock)
+    receiver = node(air, clock)
+    print('{:<10} {:>6} {:>10} {:>10} {:>10}'.format('air rate', 'bytes', 'msg/s', 'model', 'received'))
+    for name, air_data_rate in AIR_DATA_RATES:
+        configuration = configure(sender, air_data_rate)
+        configure(receiver, air_data_rate)
+        for size in SIZES:
+            rate, received = run(sender, receiver, size)
+            print('{:<10} {:>6} {:>10.2f} {:>10.2f} {:>7}/{}'.format(
+                name, size, rate, configuration.get_max_message_rate(size), received, MESSAGES))
+
+
+main()
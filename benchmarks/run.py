@@ -0,0 +1,332 @@
+# Benchmark suite of the hot paths of the driver, with the results in JSON to compare two versions
+# of the library (or two boards).
+#
+# The driver runs on simulated modules (lora_e220_simulator) with a VirtualClock, so no hardware is
+# needed and the waits of the protocol don't count: the time measured is the CPU time of the
+# driver. Every case runs in batches of at least MIN_BATCH_US (a single op for the slow ones):
+# ops per second of the fastest batch (the others are slowed down by the rest of the system),
+# percentiles of the time per op of the batches, allocations per op and, for the cases that
+# wait the module, the simulated time and the clock reads per op (the same at every run).
+#
+# A wait of the driver on the module is a polling loop, every iteration reads the clock and the
+# VirtualClock advances step_us at every read: the CPU time of send and mode switch is mostly
+# these iterations. clock_reads_per_op counts them, a change of ops per second with a change of
+# clock reads is a change of the waits (or of the simulator), not of the code path, and it is
+# not reported as a regression.
+#
+# The batches of the cases take turns. Compare runs on the same machine, idle: on a shared or
+# virtual host two runs can still differ by about 10% with the same code.
+#
+#   python3 benchmarks/run.py                          # JSON on stdout
+#   python3 benchmarks/run.py --output after.json --baseline before.json
+#   micropython benchmarks/run.py                      # unix port, or on the board
+#
+# Allocations: on MicroPython alloc_bytes_per_op, the bytes allocated by an op (gc.mem_alloc with
+# the gc disabled), on CPython peak_alloc_bytes_per_op, the tracemalloc peak of a single op (the
+# biggest transient allocation, the total is not traced). The two can't be compared.
+
+import gc
+import sys
+
+# the library next to the benchmarks, from any working directory (no os.path on MicroPython)
+sys.path.insert(0, (__file__.rsplit('/', 1)[0] if '/' in __file__ else '.') + '/../src')
+
+try:
+    import ujson as json
+except ImportError:
+    import json
+
+try:
+    from time import ticks_us, ticks_diff
+except ImportError:
+    from time import perf_counter
+
+    def ticks_us():
+        return int(perf_counter() * 1000000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+from lora_e220 import LoRaE220, Configuration
+from lora_e220_operation_constant import ModeType, ResponseStatusCode
+from lora_e220_platform import VirtualClock
+from lora_e220_simulator import SimulatedE220
+
+MODEL = '400T22D'
+BATCHES = 31
+MIN_BATCH_US = 10000
+WARMUP = 20
+# ops per second change that is reported as a regression
+REGRESSION = 0.15
+
+RAW_CONFIGURATION = bytes((0xC1, 0x00, 0x08, 0x01, 0x02, 0x62, 0x00, 0x17, 0x03, 0x00, 0x00))
+MESSAGE = 'temperature=21.5;humidity=40'
+DICT = {'temp': 21.5, 'hum': 40, 'bat': 3.7, 'id': 12}
+
+
+class CountingClock(VirtualClock):
+    # VirtualClock that counts the tick reads (the iterations of the polling loops)
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+
+    def ticks_ms(self):
+        self.reads += 1
+        return super().ticks_ms()
+
+    def ticks_us(self):
+        self.reads += 1
+        return super().ticks_us()
+
+
+def simulated_node():
+    clock = CountingClock()
+    module = SimulatedE220(MODEL, clock=clock)
+    lora = LoRaE220(MODEL, module.uart, aux_pin=module.aux, m0_pin=module.m0, m1_pin=module.m1, clock=clock)
+    if lora.begin() != ResponseStatusCode.E220_SUCCESS:
+        raise RuntimeError('Simulated module not ready')
+    return lora, module, clock
+
+
+def deliver(module, clock, frame):
+    # a packet received while the application did something else: it's already output on the UART
+    # when the receive starts, so the receive doesn't poll for the whole UART output
+    module.deliver(frame, clock.ticks_us(), 200)
+    clock.advance(int(module.configuration.get_uart_time(len(frame)) * 1000))
+
+
+# every case returns the function of a single op and the virtual clock (None if it doesn't wait)
+
+def case_build_packet():
+    def op():
+        LoRaE220._build_packet(MESSAGE, 0x00, 0x02, 23)
+    return op, None
+
+
+def case_send_fixed_message():
+    lora, module, clock = simulated_node()
+
+    def op():
+        lora.send_fixed_message(0x00, 0x02, 23, MESSAGE)
+    return op, clock
+
+
+def case_receive_message():
+    lora, module, clock = simulated_node()
+    frame = MESSAGE.encode()
+
+    def op():
+        deliver(module, clock, frame)
+        lora.receive_message()
+    return op, clock
+
+
+def case_receive_until():
+    lora, module, clock = simulated_node()
+    frame = (MESSAGE + '\n').encode()
+
+    def op():
+        deliver(module, clock, frame)
+        lora.receive_message(delimiter='\n')
+    return op, clock
+
+
+def case_send_fixed_dict():
+    lora, module, clock = simulated_node()
+
+    def op():
+        lora.send_fixed_dict(0x00, 0x02, 23, DICT)
+    return op, clock
+
+
+def case_receive_dict():
+    lora, module, clock = simulated_node()
+    frame = lora.json_codec.encode(DICT).encode()
+
+    def op():
+        deliver(module, clock, frame)
+        lora.receive_dict()
+    return op, clock
+
+
+def case_configuration_to_bytes():
+    configuration = Configuration(MODEL)
+
+    def op():
+        configuration.to_bytes()
+    return op, None
+
+
+def case_configuration_from_bytes():
+    configuration = Configuration(MODEL)
+
+    def op():
+        configuration.from_bytes(RAW_CONFIGURATION)
+    return op, None
+
+
+def case_mode_switch():
+    lora, module, clock = simulated_node()
+
+    def op():
+        lora.set_mode(ModeType.MODE_3_PROGRAM)
+        lora.set_mode(ModeType.MODE_0_NORMAL)
+    return op, clock
+
+
+def case_get_configuration_cached():
+    lora, module, clock = simulated_node()
+
+    def op():
+        lora.get_configuration()
+    return op, clock
+
+
+CASES = (
+    ('build_packet', case_build_packet),
+    ('send_fixed_message', case_send_fixed_message),
+    ('receive_message', case_receive_message),
+    ('receive_until', case_receive_until),
+    ('send_fixed_dict', case_send_fixed_dict),
+    ('receive_dict', case_receive_dict),
+    ('configuration_to_bytes', case_configuration_to_bytes),
+    ('configuration_from_bytes', case_configuration_from_bytes),
+    ('mode_switch', case_mode_switch),
+    ('get_configuration_cached', case_get_configuration_cached),
+)
+
+
+def percentile(values, fraction):
+    return values[min(int(fraction * len(values)), len(values) - 1)]
+
+
+ALLOC_KEY = 'alloc_bytes_per_op' if hasattr(gc, 'mem_alloc') else 'peak_alloc_bytes_per_op'
+
+
+def allocated_per_op(op, iterations):
+    # ALLOC_KEY: bytes allocated per op on MicroPython, tracemalloc peak of an op on CPython
+    if hasattr(gc, 'mem_alloc'):
+        gc.collect()
+        gc.disable()
+        start = gc.mem_alloc()
+        for _ in range(iterations):
+            op()
+        used = gc.mem_alloc() - start
+        gc.enable()
+        return used / iterations
+
+    import tracemalloc
+    tracemalloc.start()
+    peak = 0
+    for _ in range(iterations):
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        op()
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - current)
+    tracemalloc.stop()
+    return peak
+
+
+def batch(op, size) -> int:
+    start = ticks_us()
+    for _ in range(size):
+        op()
+    return ticks_diff(ticks_us(), start)
+
+
+def batch_size(op) -> int:
+    # doubled until a batch lasts MIN_BATCH_US, so the timer resolution doesn't count
+    size = 1
+    while batch(op, size) < MIN_BATCH_US and size < 1 << 20:
+        size *= 2
+    return size
+
+
+def run_cases(setups, batches):
+    cases = []
+    for name, setup in setups:
+        op, clock = setup()
+        for _ in range(WARMUP):
+            op()
+        start = (clock.now_us, clock.reads) if clock is not None else None
+        cases.append((name, op, clock, batch_size(op), [], start))
+
+    # in turns, so that a slower period of the machine doesn't go all to the same case
+    gc.collect()
+    for _ in range(batches):
+        for name, op, clock, size, times, start in cases:
+            times.append(batch(op, size) / size)
+
+    results = {}
+    for name, op, clock, size, times, start in cases:
+        times.sort()
+        result = {
+            'ops_per_sec': 1000000 / times[0] if times[0] > 0 else None,
+            'batch_size': size,
+            'mean_us': sum(times) / batches,
+            'min_us': times[0],
+            'p50_us': percentile(times, 0.5),
+            'p90_us': percentile(times, 0.9),
+            'p99_us': percentile(times, 0.99),
+            'max_us': times[-1],
+        }
+        if clock is not None:
+            result['simulated_us_per_op'] = (clock.now_us - start[0]) / (batches * size)
+            result['clock_reads_per_op'] = (clock.reads - start[1]) / (batches * size)
+        result[ALLOC_KEY] = allocated_per_op(op, min(size, 50))
+        results[name] = result
+    return results
+
+
+def compare(results, baseline):
+    # ops per second against a previous run, on stderr so that stdout stays JSON
+    for name, result in results.items():
+        before = baseline.get('results', {}).get(name)
+        if before is None or not before.get('ops_per_sec') or not result['ops_per_sec']:
+            continue
+        change = result['ops_per_sec'] / before['ops_per_sec'] - 1
+        reads = result.get('clock_reads_per_op')
+        reads_before = before.get('clock_reads_per_op')
+        if reads is not None and reads_before and abs(reads / reads_before - 1) > 0.01:
+            # the waits changed (polling iterations), the time isn't comparable
+            mark = ' clock reads {:.0f} -> {:.0f}'.format(reads_before, reads)
+        else:
+            mark = ' REGRESSION' if change < -REGRESSION else ''
+        sys.stderr.write('{:<26} {:>+7.1f}%{}\n'.format(name, change * 100, mark))
+
+
+def argument(name, default=None):
+    if name in sys.argv:
+        return sys.argv[sys.argv.index(name) + 1]
+    return default
+
+
+def main():
+    batches = int(argument('--batches', BATCHES))
+    only = argument('--case')
+
+    results = run_cases([case for case in CASES if only is None or only == case[0]], batches)
+
+    report = {
+        'implementation': sys.implementation.name,
+        'version': '.'.join(str(v) for v in sys.implementation.version[:3]),
+        'platform': sys.platform,
+        'batches': batches,
+        'alloc_method': 'gc.mem_alloc' if hasattr(gc, 'mem_alloc') else 'tracemalloc_peak',
+        'results': results,
+    }
+
+    output = argument('--output')
+    if output is None:
+        print(json.dumps(report))
+    else:
+        with open(output, 'w') as f:
+            f.write(json.dumps(report))
+
+    baseline = argument('--baseline')
+    if baseline is not None:
+        with open(baseline) as f:
+            compare(results, json.loads(f.read()))
+
+
+main()
@@ -0,0 +1,58 @@
+# Author: Renzo Mischianti
+# Website: www.mischianti.org
+#
+# Description:
+# This script demonstrates how to use the E220 LoRa module with MicroPython and uasyncio.
+# A task sends a message every 5 seconds, another task prints the received messages,
+# and a third task keeps blinking a led to show that the event loop is never blocked.
+#
+# Note: This code was written and tested using MicroPython on an ESP32 board.
+#       It works with other boards, but you may need to change the UART pins.
+
+import uasyncio as asyncio
+from machine import UART, Pin
+
+from lora_e220_async import AsyncLoRaE220
+from lora_e220_operation_constant import ResponseStatusCode
+
+# Initialize the LoRaE220 module
+# Create a UART object to communicate with the LoRa module with ESP32
+uart2 = UART(2)
+# Create a AsyncLoRaE220 object, passing the UART object and pin configurations
+lora = AsyncLoRaE220('400T22D', uart2, aux_pin=15, m0_pin=21, m1_pin=19)
+
+led = Pin(2, Pin.OUT)
+
+
+async def blink():
+    while True:
+        led.value(not led.value())
+        await asyncio.sleep_ms(100)
+
+
+async def sender():
+    counter = 0
+    while True:
+        code = await lora.send_transparent_message('Hello {}'.format(counter))
+        print(f"Send message: {ResponseStatusCode.get_description(code)}")
+        counter += 1
+        await asyncio.sleep(5)
+
+
+async def receiver():
+    while True:
+        code, value = await lora.receive_message()
+        print(f"Receive message: {ResponseStatusCode.get_description(code)}")
+        print(value)
+
+
+async def main():
+    code = await lora.begin()
+    print(f"Initialization: {ResponseStatusCode.get_description(code)}")
+
+    asyncio.create_task(blink())
+    asyncio.create_task(sender())
+    await receiver()
+
+
+asyncio.run(main())
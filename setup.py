@@ -5,7 +5,13 @@ from setuptools import setup
 setup(
     name="ebyte-lora-e220",
     package_dir={'': 'src'},
-    py_modules=["lora_e220", "lora_e220_constants", "lora_e220_operation_constant"],
+    py_modules=["lora_e220", "lora_e220_constants", "lora_e220_operation_constant", "lora_e220_async",
+                "lora_e220_delay", "lora_e220_buffer",
+                "lora_e220_framer", "lora_e220_fragment",
+                "lora_e220_codec", "lora_e220_schema",
+                "lora_e220_airtime", "lora_e220_descriptions", "lora_e220_diagnostics",
+                "lora_e220_logging", "lora_e220_metrics", "lora_e220_platform",
+                "lora_e220_simulator", "lora_e220_network", "lora_e220_reliable"],
     version="0.0.5",
     description="LoRa EBYTE E220 device library complete and tested with Arduino, esp8266, esp32, STM32 and Raspberry Pi Pico. LLCC68",
     long_description="Ebyte E220 LoRa (Long Range) library device very cheap and very long range (from 5Km to 10Km). Arduino LoRa EBYTE E220 device library complete and tested with Arduino, esp8266, esp32, STM32 and Raspberry Pi Pico. LLCC68",
@@ -39,49 +39,87 @@ from lora_e220_constants import UARTParity, UARTBaudRate, TransmissionPower, Fix
     OperatingFrequency, LbtEnableByte, WorPeriod, RssiEnableByte, RssiAmbientNoiseEnable, SubPacketSetting
 from lora_e220_operation_constant import ResponseStatusCode, ModeType, ProgramCommand, SerialUARTBaudRate, \
     PacketLength, RegisterAddress
+from lora_e220_delay import DelayEngine
+from lora_e220_buffer import RingBuffer
+from lora_e220_framer import PacketFramer
+from lora_e220_fragment import Fragmenter, Reassembler, is_fragment, is_escaped, escape, fragment_length, \
+    ESCAPE, MAX_FRAGMENTS
+from lora_e220_logging import Logger, DEBUG
+from lora_e220_metrics import Metrics
 
-import machine
-import ure
-import utime
-import ujson
+from lora_e220_platform import default_platform, PIN_IN, PIN_OUT
 
 
-class Logger:
-    def __init__(self, enable_debug):
-        self.enable_debug = enable_debug
-        self.name = ''
+logging = Logger(False)
 
-    def debug(self, msg, *args):
-        if self.enable_debug:
-            print(self.name, ' DEBUG ', msg, *args)
+logger = logging.getLogger(__name__)
 
-    def info(self, msg, *args):
-        if self.enable_debug:
-            print(self.name, ' INFO ', msg, *args)
+BROADCAST_ADDRESS = 0xFF
+# the module is ready 2 ms after AUX goes HIGH (mode switch)
+MODE_SETTLE_MS = 2
+# after a write AUX is still HIGH until the module takes the operation, the level HIGH counts as
+# the end of the operation only this long after _arm_aux (without a LOW or an edge seen before)
+AUX_LOW_GRACE_US = 1000
 
-    def error(self, msg, *args):
-        if self.enable_debug:
-            print(self.name, ' ERROR ', msg, *args)
 
-    def getLogger(self, name):
-        self.name = name
-        return Logger(self.enable_debug)
+# a configuration is the 11 bytes of the program command: head (command, address, length) and the
+# 8 registers ADDH, ADDL, SPED, OPTION, CHAN, TRANSMISSION_MODE, CRYPT_H, CRYPT_L
+CONFIGURATION_SIZE = 11
+SPED_INDEX = 5
+OPTION_INDEX = 6
+CHAN_INDEX = 7
+TRANSMISSION_MODE_INDEX = 8
+CRYPT_INDEX = 9
+# reserved bits of OPTION (2-4) and TRANSMISSION_MODE (3 and 5) are always written as 0
+OPTION_MASK = 0b11100011
+TRANSMISSION_MODE_MASK = 0b11010111
 
 
-logging = Logger(False)
+def _get_bits(buf, index, shift, mask):
+    return (buf[index] >> shift) & mask
 
-logger = logging.getLogger(__name__)
 
-BROADCAST_ADDRESS = 0xFF
+def _set_bits(buf, index, shift, mask, value):
+    buf[index] = (buf[index] & ~(mask << shift)) | ((value & mask) << shift)
 
 
+# Speed, Option, TransmissionMode and Crypt are views on the bytes of their Configuration, created on
+# a standalone (model) they have their own byte with the default value
 class Speed:
-    def __init__(self, model):
+    __slots__ = ('model', '_buf', '_index')
+
+    def __init__(self, model, buf=None, index=0):
         self.model = model
+        self._buf = buf if buf is not None else bytearray((Speed.default(),))
+        self._index = index
 
-        self.airDataRate = AirDataRate.AIR_DATA_RATE_010_24
-        self.uartBaudRate = UARTBaudRate.BPS_9600
-        self.uartParity = UARTParity.MODE_00_8N1
+    @staticmethod
+    def default():
+        return AirDataRate.AIR_DATA_RATE_010_24 | (UARTParity.MODE_00_8N1 << 3) | (UARTBaudRate.BPS_9600 << 5)
+
+    @property
+    def airDataRate(self):
+        return _get_bits(self._buf, self._index, 0, 0b111)
+
+    @airDataRate.setter
+    def airDataRate(self, value):
+        _set_bits(self._buf, self._index, 0, 0b111, value)
+
+    @property
+    def uartParity(self):
+        return _get_bits(self._buf, self._index, 3, 0b11)
+
+    @uartParity.setter
+    def uartParity(self, value):
+        _set_bits(self._buf, self._index, 3, 0b11, value)
+
+    @property
+    def uartBaudRate(self):
+        return _get_bits(self._buf, self._index, 5, 0b111)
+
+    @uartBaudRate.setter
+    def uartBaudRate(self, value):
+        _set_bits(self._buf, self._index, 5, 0b111, value)
 
     def get_air_data_rate(self):
         return AirDataRate.get_description(self.airDataRate)
@@ -94,15 +132,59 @@ class Speed:
 
 
 class TransmissionMode:
-    def __init__(self, model):
+    __slots__ = ('model', '_buf', '_index')
+
+    def __init__(self, model, buf=None, index=0):
         self.model = model
+        self._buf = buf if buf is not None else bytearray((TransmissionMode.default(),))
+        self._index = index
+
+    @staticmethod
+    def default():
+        return WorPeriod.WOR_2000_011 | (LbtEnableByte.LBT_DISABLED << 4) | \
+            (FixedTransmission.TRANSPARENT_TRANSMISSION << 6) | (RssiEnableByte.RSSI_DISABLED << 7)
+
+    @property
+    def WORPeriod(self):
+        return _get_bits(self._buf, self._index, 0, 0b111)
+
+    @WORPeriod.setter
+    def WORPeriod(self, value):
+        _set_bits(self._buf, self._index, 0, 0b111, value)
+
+    @property
+    def enableLBT(self):
+        return _get_bits(self._buf, self._index, 4, 0b1)
+
+    @enableLBT.setter
+    def enableLBT(self, value):
+        _set_bits(self._buf, self._index, 4, 0b1, value)
+
+    @property
+    def fixedTransmission(self):
+        return _get_bits(self._buf, self._index, 6, 0b1)
 
-        self.WORPeriod = WorPeriod.WOR_2000_011
-        self.reserved2 = 0
-        self.enableLBT = LbtEnableByte.LBT_DISABLED
-        self.reserved = 0
-        self.fixedTransmission = FixedTransmission.TRANSPARENT_TRANSMISSION
-        self.enableRSSI = RssiEnableByte.RSSI_DISABLED
+    @fixedTransmission.setter
+    def fixedTransmission(self, value):
+        _set_bits(self._buf, self._index, 6, 0b1, value)
+
+    @property
+    def enableRSSI(self):
+        return _get_bits(self._buf, self._index, 7, 0b1)
+
+    @enableRSSI.setter
+    def enableRSSI(self, value):
+        _set_bits(self._buf, self._index, 7, 0b1, value)
+
+    @property
+    def reserved(self):
+        return 0
+
+    @reserved.setter
+    def reserved(self, value):
+        pass
+
+    reserved2 = reserved
 
     def get_WOR_period_description(self):
         return WorPeriod.get_description(self.WORPeriod)
@@ -118,13 +200,49 @@ class TransmissionMode:
 
 
 class Option:
-    def __init__(self, model):
+    __slots__ = ('model', '_buf', '_index')
+
+    def __init__(self, model, buf=None, index=0):
         self.model = model
+        self._buf = buf if buf is not None else bytearray((Option.default(model),))
+        self._index = index
 
-        self.transmissionPower = TransmissionPower(self.model).get_transmission_power().get_default_value()
-        self.reserved = 0
-        self.RSSIAmbientNoise = RssiAmbientNoiseEnable.RSSI_AMBIENT_NOISE_DISABLED
-        self.subPacketSetting = SubPacketSetting.SPS_200_00
+    @staticmethod
+    def default(model):
+        return TransmissionPower(model).get_transmission_power().get_default_value() | \
+            (RssiAmbientNoiseEnable.RSSI_AMBIENT_NOISE_DISABLED << 5) | (SubPacketSetting.SPS_200_00 << 6)
+
+    @property
+    def transmissionPower(self):
+        return _get_bits(self._buf, self._index, 0, 0b11)
+
+    @transmissionPower.setter
+    def transmissionPower(self, value):
+        _set_bits(self._buf, self._index, 0, 0b11, value)
+
+    @property
+    def RSSIAmbientNoise(self):
+        return _get_bits(self._buf, self._index, 5, 0b1)
+
+    @RSSIAmbientNoise.setter
+    def RSSIAmbientNoise(self, value):
+        _set_bits(self._buf, self._index, 5, 0b1, value)
+
+    @property
+    def subPacketSetting(self):
+        return _get_bits(self._buf, self._index, 6, 0b11)
+
+    @subPacketSetting.setter
+    def subPacketSetting(self, value):
+        _set_bits(self._buf, self._index, 6, 0b11, value)
+
+    @property
+    def reserved(self):
+        return 0
+
+    @reserved.setter
+    def reserved(self, value):
+        pass
 
     def get_transmission_power_description(self):
         return TransmissionPower(self.model).get_transmission_power_description(self.transmissionPower)
@@ -137,12 +255,43 @@ class Option:
 
 
 class Crypt:
-    def __init__(self):
-        self.CRYPT_H = 0
-        self.CRYPT_L = 0
+    __slots__ = ('_buf', '_index')
+
+    def __init__(self, buf=None, index=0):
+        self._buf = buf if buf is not None else bytearray(2)
+        self._index = index
+
+    @property
+    def CRYPT_H(self):
+        return self._buf[self._index]
+
+    @CRYPT_H.setter
+    def CRYPT_H(self, value):
+        self._buf[self._index] = value & 0xFF
+
+    @property
+    def CRYPT_L(self):
+        return self._buf[self._index + 1]
+
+    @CRYPT_L.setter
+    def CRYPT_L(self, value):
+        self._buf[self._index + 1] = value & 0xFF
+
+
+def _byte_property(index):
+    def get(self):
+        return self._buf[index]
+
+    def set(self, value):
+        self._buf[index] = value & 0xFF
+
+    return property(get, set)
 
 
 class Configuration:
+    __slots__ = ('model', 'package_type', 'frequency', 'transmission_power', '_buf',
+                 '_sped', '_option', '_transmission_mode', '_crypt')
+
     def __init__(self, model):
         self.model = model
 
@@ -155,16 +304,48 @@ class Configuration:
             self.frequency = int(model[0:3])
             self.transmission_power = int(model[4:6])
 
-        self._COMMAND = 0
-        self._STARTING_ADDRESS = 0
-        self._LENGTH = 0
-        self.ADDH = 0
-        self.ADDL = 0
-        self.SPED = Speed(self.model)
-        self.OPTION = Option(self.model)
-        self.CHAN = 23
-        self.TRANSMISSION_MODE = TransmissionMode(self.model)
-        self.CRYPT = Crypt()
+        self._buf = bytearray(CONFIGURATION_SIZE)
+        self._buf[SPED_INDEX] = Speed.default()
+        self._buf[OPTION_INDEX] = Option.default(model)
+        self._buf[CHAN_INDEX] = 23
+        self._buf[TRANSMISSION_MODE_INDEX] = TransmissionMode.default()
+
+        # the register views are created at the first use
+        self._sped = None
+        self._option = None
+        self._transmission_mode = None
+        self._crypt = None
+
+    _COMMAND = _byte_property(0)
+    _STARTING_ADDRESS = _byte_property(1)
+    _LENGTH = _byte_property(2)
+    ADDH = _byte_property(3)
+    ADDL = _byte_property(4)
+    CHAN = _byte_property(CHAN_INDEX)
+
+    @property
+    def SPED(self):
+        if self._sped is None:
+            self._sped = Speed(self.model, self._buf, SPED_INDEX)
+        return self._sped
+
+    @property
+    def OPTION(self):
+        if self._option is None:
+            self._option = Option(self.model, self._buf, OPTION_INDEX)
+        return self._option
+
+    @property
+    def TRANSMISSION_MODE(self):
+        if self._transmission_mode is None:
+            self._transmission_mode = TransmissionMode(self.model, self._buf, TRANSMISSION_MODE_INDEX)
+        return self._transmission_mode
+
+    @property
+    def CRYPT(self):
+        if self._crypt is None:
+            self._crypt = Crypt(self._buf, CRYPT_INDEX)
+        return self._crypt
 
     def get_model(self):
         return self.model
@@ -181,152 +362,99 @@ class Configuration:
     def get_model(self):
         return self.model
 
+    def get_time_on_air(self, payload_size):
+        # ms on air of a message of payload_size bytes with this configuration
+        from lora_e220_airtime import time_on_air
+        return time_on_air(self.SPED.airDataRate, payload_size, self.OPTION.subPacketSetting,
+                           self.TRANSMISSION_MODE.fixedTransmission)
+
+    def get_aux_busy_time(self, payload_size):
+        # ms of AUX LOW to send a message of payload_size bytes (UART transfer + time on air)
+        from lora_e220_airtime import aux_busy_time
+        return aux_busy_time(self.SPED.airDataRate, self.SPED.uartBaudRate, payload_size,
+                             self.OPTION.subPacketSetting, self.TRANSMISSION_MODE.fixedTransmission,
+                             self._has_parity())
+
+    def get_max_message_rate(self, payload_size):
+        # messages per second of payload_size bytes that the module can send back to back
+        from lora_e220_airtime import max_message_rate
+        return max_message_rate(self.SPED.airDataRate, self.SPED.uartBaudRate, payload_size,
+                                self.OPTION.subPacketSetting, self.TRANSMISSION_MODE.fixedTransmission,
+                                self._has_parity())
+
+    def get_uart_time(self, size):
+        # ms to move size bytes between microcontroller and module
+        from lora_e220_airtime import uart_time
+        return uart_time(self.SPED.uartBaudRate, size, self._has_parity())
+
+    def _has_parity(self):
+        return self.SPED.uartParity in (UARTParity.MODE_01_8O1, UARTParity.MODE_10_8E1)
+
     def to_hex_string(self):
         return ''.join(['0x{:02X} '.format(x) for x in self.to_hex_array()])
 
     def to_bytes(self):
-        hexarray = self.to_hex_array()
-        # Convert values to valid byte values
-        for i in range(len(hexarray)):
-            if hexarray[i] > 255:
-                hexarray[i] = hexarray[i] % 256
-
-        return bytes(hexarray)
+        return bytes(self._buf)
 
     def from_hex_array(self, hex_array):
-        self._COMMAND = hex_array[0]
-        self._STARTING_ADDRESS = hex_array[1]
-        self._LENGTH = hex_array[2]
-        self.ADDH = hex_array[3]
-        self.ADDL = hex_array[4]
-
-        self.SPED.airDataRate = hex_array[5] & 0b00000111
-        self.SPED.uartParity = (hex_array[5] & 0b00011000) >> 3
-        self.SPED.uartBaudRate = (hex_array[5] & 0b11100000) >> 5
-
-        self.OPTION.transmissionPower = hex_array[6] & 0b00000011
-        self.OPTION.RSSIAmbientNoise = (hex_array[6] & 0b00100000) >> 5
-        self.OPTION.subPacketSetting = (hex_array[6] & 0b11000000) >> 6
-
-        self.CHAN = hex_array[7]
-
-        self.TRANSMISSION_MODE.WORPeriod = hex_array[8] & 0b00000111
-        self.TRANSMISSION_MODE.enableLBT = (hex_array[8] & 0b00010000) >> 4
-        self.TRANSMISSION_MODE.fixedTransmission = (hex_array[8] & 0b01000000) >> 6
-        self.TRANSMISSION_MODE.enableRSSI = (hex_array[8] & 0b10000000) >> 7
-
-        self.CRYPT.CRYPT_H = hex_array[9]
-        self.CRYPT.CRYPT_L = hex_array[10]
+        self.from_bytes(bytearray([x & 0xFF for x in hex_array]))
 
     def to_hex_array(self):
-        return [self._COMMAND,
-                self._STARTING_ADDRESS,
-                self._LENGTH,
-                self.ADDH,
-                self.ADDL,
-                self.SPED.airDataRate | (self.SPED.uartParity << 3) | (self.SPED.uartBaudRate << 5),
-                self.OPTION.transmissionPower | (self.OPTION.RSSIAmbientNoise << 5) | (
-                            self.OPTION.subPacketSetting << 6),
-                self.CHAN,
-                self.TRANSMISSION_MODE.WORPeriod | (self.TRANSMISSION_MODE.enableLBT << 4) | (
-                        self.TRANSMISSION_MODE.fixedTransmission << 6) | (self.TRANSMISSION_MODE.enableRSSI << 7),
-                self.CRYPT.CRYPT_H,
-                self.CRYPT.CRYPT_L]
+        return list(self._buf)
 
     def from_hex_string(self, hex_string):
         self.from_hex_array([int(hex_string[i:i + 2], 16) for i in range(0, len(hex_string), 2)])
 
     def from_bytes(self, bytes):
-        self.from_hex_array([x for x in bytes])
+        if len(bytes) < CONFIGURATION_SIZE:
+            raise ValueError('Invalid configuration size')
+        self._buf[:] = bytes[:CONFIGURATION_SIZE]
+        self._buf[OPTION_INDEX] &= OPTION_MASK
+        self._buf[TRANSMISSION_MODE_INDEX] &= TRANSMISSION_MODE_MASK
 
 
 def print_configuration(configuration):
-    print("----------------------------------------")
-    print("HEAD : ", hex(configuration._COMMAND), " ", hex(configuration._STARTING_ADDRESS), " ",
-          hex(configuration._LENGTH))
-    print("")
-    print("AddH : ", hex(configuration.ADDH))
-    print("AddL : ", hex(configuration.ADDL))
-    print("")
-    print("Chan : ", str(configuration.CHAN), " -> ", configuration.get_frequency())
-    print("")
-    print("SpeedParityBit : ", bin(configuration.SPED.uartParity), " -> ",
-          configuration.SPED.get_UART_parity_description())
-    print("SpeedUARTDatte : ", bin(configuration.SPED.uartBaudRate), " -> ", configuration.SPED.get_UART_baud_rate())
-    print("SpeedAirDataRate : ", bin(configuration.SPED.airDataRate), " -> ", configuration.SPED.get_air_data_rate())
-    print("")
-    print("OptionSubPacketSett: ", bin(configuration.OPTION.subPacketSetting), " -> ",
-          configuration.OPTION.get_sub_packet_setting())
-    print("OptionTranPower : ", bin(configuration.OPTION.transmissionPower), " -> ",
-          configuration.OPTION.get_transmission_power_description())
-    print("OptionRSSIAmbientNo: ", bin(configuration.OPTION.RSSIAmbientNoise), " -> ",
-          configuration.OPTION.get_RSSI_ambient_noise_enable())
-    print("")
-    print("TransModeWORPeriod : ", bin(configuration.TRANSMISSION_MODE.WORPeriod), " -> ",
-          configuration.TRANSMISSION_MODE.get_WOR_period_description())
-    print("TransModeEnableLBT : ", bin(configuration.TRANSMISSION_MODE.enableLBT), " -> ",
-          configuration.TRANSMISSION_MODE.get_LBT_enable_byte_description())
-    print("TransModeEnableRSSI: ", bin(configuration.TRANSMISSION_MODE.enableRSSI), " -> ",
-          configuration.TRANSMISSION_MODE.get_RSSI_enable_byte_description())
-    print("TransModeFixedTrans: ", bin(configuration.TRANSMISSION_MODE.fixedTransmission), " -> ",
-          configuration.TRANSMISSION_MODE.get_fixed_transmission_description())
-    print("----------------------------------------")
+    # the printer is in lora_e220_diagnostics, loaded only when used
+    from lora_e220_diagnostics import print_configuration
+    print_configuration(configuration)
 
 
-MAX_SIZE_TX_PACKET = 200
+def __getattr__(name):
+    # lora_e220.ModuleInformation is the class of lora_e220_diagnostics, loaded on first access
+    if name == 'ModuleInformation':
+        from lora_e220_diagnostics import ModuleInformation
+        return ModuleInformation
+    raise AttributeError(name)
 
 
-class ModuleInformation:
-    def __init__(self):
-        self._COMMAND = 0
-        self._STARTING_ADDRESS = 0
-        self._LENGTH = 0
-        self.model = 0
-        self.version = 0
-        self.features = 0
-
-    def to_hex_array(self):
-        hex_array = bytearray()
-        hex_array.append(self._COMMAND)
-        hex_array.append(self._STARTING_ADDRESS)
-        hex_array.append(self._LENGTH)
-        hex_array.append(self.model)
-        hex_array.append(self.version)
-        hex_array.append(self.features)
-        return hex_array
-
-    def from_hex_array(self, hex_array):
-        self._COMMAND = hex_array[0]
-        self._STARTING_ADDRESS = hex_array[1]
-        self._LENGTH = hex_array[2]
-        self.model = hex_array[3]
-        self.version = hex_array[4]
-        self.features = hex_array[5]
-
-    def to_hex_string(self):
-        return ''.join(['{:02X}'.format(x) for x in self.to_hex_array()])
+MAX_SIZE_TX_PACKET = 200
 
-    def to_bytes(self):
-        return bytes(self.to_hex_array())
+# magic byte of lora_e220_codec.CompactCodec, the codec is loaded by the first compact message
+COMPACT_CODEC_MAGIC = 0xB1
 
-    def from_hex_string(self, hex_string):
-        self.from_hex_array([int(hex_string[i:i + 2], 16) for i in range(0, len(hex_string), 2)])
 
-    def from_bytes(self, bytes):
-        self.from_hex_array([x for x in bytes])
+def valid_model(model) -> bool:
+    # frequency (230, 400, 900), package (T, R, MM, M), power (22, 30), S or D: 400T22D, 900MM30S
+    if not isinstance(model, str) or len(model) < 7:
+        return False
+    return model[:3] in ('230', '400', '900') and model[3:-3] in ('T', 'R', 'MM', 'M') and \
+        model[-3:-1] in ('22', '30') and model[-1] in ('S', 'D')
 
 
 class LoRaE220:
     # now the constructor that receive directly the UART object
     def __init__(self, model, uart, aux_pin=None, m0_pin=None, m1_pin=None,
-                 uart_baudrate=SerialUARTBaudRate.BPS_RATE_9600):
+                 uart_baudrate=SerialUARTBaudRate.BPS_RATE_9600, aux_irq=False, delay_engine=None,
+                 rx_buffer_size=512, max_message_size=1024, fragment_timeout=5000, platform=None, clock=None):
         self.uart = uart
         self.model = model
 
-        pattern = '^(230|400|900)(T|R|MM|M)(22|30)[SD]$'
+        # clock and pins (machine and utime on MicroPython, see lora_e220_platform for the host), every
+        # wait and tick read of the driver goes through the clock, a VirtualClock makes them simulated
+        self.platform = platform if platform is not None else default_platform()
+        self.clock = clock if clock is not None else self.platform.clock
 
-        model_regex = ure.compile(pattern)
-        if not model_regex.match(model):
+        if not valid_model(model):
             raise ValueError('Invalid model')
 
         self.aux_pin = aux_pin
@@ -340,6 +468,64 @@ class LoRaE220:
         self.uart_baudrate = uart_baudrate
         self.mode = None
 
+        # set_mode skips the switch to the current mode and records the time of the others
+        self.last_mode_switch_us = None
+        self._mode_switches = 0
+        self._mode_switches_skipped = 0
+        self._mode_switch_us = 0
+        self._mode_switch_max_us = 0
+
+        # counters and histograms, see stats()
+        self.metrics = Metrics()
+
+        # AUX rising edge captured by interrupt instead of polling the pin
+        self.aux_irq = aux_irq
+        self._aux_rised = False
+        self._aux_armed = False
+        self._aux_armed_us = 0
+        self.aux_rise_us = 0
+        self.last_aux_latency_us = None
+
+        # every fixed wait of the driver goes through the delay engine (sleep + short spin by default)
+        self.delay_engine = delay_engine if delay_engine is not None else DelayEngine(clock=self.clock)
+
+        # preallocated receive buffer, filled with readinto and read through memoryview
+        self._rx = RingBuffer(rx_buffer_size)
+        # split the received stream in packets by the idle time between them
+        self._framer = PacketFramer(self._rx, uart_baudrate, clock=self.clock)
+
+        # messages bigger than the sub packet size are fragmented and rebuilt on receive
+        self.sub_packet_size = SubPacketSetting.get_size(SubPacketSetting.SPS_200_00)
+
+        # the AUX timeouts are computed from the configuration (air data rate, packet size, UART speed):
+        # expected time * (1 + timeout_margin) + timeout_floor_ms
+        self._timing = Configuration(model)
+        self.timeout_margin = 0.5
+        self.timeout_floor_ms = 20
+        self._fragmenter = Fragmenter()
+        self._reassembler = Reassembler(max_message_size, fragment_timeout, clock=self.clock)
+
+        # codec used by send_*_dict, receive_dict selects it by the magic byte of the message, the codecs
+        # are loaded at the first use
+        self._json_codec = None
+        self._codec = None
+        self._schemas = None
+        self.codecs = {}
+
+        # shadow copy of the configuration registers (with the response head), get_configuration
+        # reads it instead of switching to program mode
+        self._shadow = bytearray(PacketLength.PL_CONFIGURATION + 3)
+        self._shadow_valid = False
+        # False after a volatile write, a permanent write then rewrites all the registers
+        self._shadow_saved = True
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        # channel hopping with volatile writes of the channel register
+        self.hop_sequence = None
+        self._hop_index = 0
+        self.last_hop_latency_us = None
+
     # model is like 400T22D or 433T27D or 433T30D or 868T20S or 868T27S or 868T30S
     # def __init__(self, model, tx_pin, rx_pin, uart_id=0, aux_pin=None, m0_pin=None, m1_pin=None,
     #              uart_baudrate=SerialUARTBaudRate.BPS_RATE_9600):
@@ -347,31 +533,103 @@ class LoRaE220:
     #     super().__init__(model, self.uart, aux_pin, m0_pin, m1_pin, uart_baudrate)
 
     def begin(self, uart_parity=UARTParity.MODE_00_8N1):
+        self._init_hardware(uart_parity)
+
+        code = self.set_mode(ModeType.MODE_0_NORMAL)
+        if code != ResponseStatusCode.SUCCESS:
+            return code
+
+        if self._can_read_configuration():
+            # fill the shadow registers, a failure only means that the first read goes to the module
+            read_code = self._read_configuration()[0]
+            if read_code != ResponseStatusCode.E220_SUCCESS:
+                logger.debug("read configuration: %s", read_code)
+                # the module stays in normal mode (skipped if the read has switched it back)
+                code = self.set_mode(ModeType.MODE_0_NORMAL)
+
+        return code
+
+    def _init_hardware(self, uart_parity, timeout=1000, timeout_char=1000):
         self.uart.init(baudrate=self.uart_baudrate, bits=8, parity=UARTParity.get_uart_value(uart_parity), stop=1,
-                       timeout=1000, timeout_char=1000)
+                       timeout=timeout, timeout_char=timeout_char)
 
         self.m0 = None
         self.m1 = None
         self.aux = None
         if self.aux_pin is not None:
-            self.aux = machine.Pin(self.aux_pin, machine.Pin.IN)
+            self.aux = self._pin(self.aux_pin, PIN_IN)
+            if self.aux_irq:
+                self.platform.aux_irq(self.aux, self._on_aux_rising)
+        self._framer.aux = self.aux
         if self.m0_pin is not None and self.m1_pin is not None:
-            self.m0 = machine.Pin(self.m0_pin, machine.Pin.OUT)
-            self.m1 = machine.Pin(self.m1_pin, machine.Pin.OUT)
+            self.m0 = self._pin(self.m0_pin, PIN_OUT)
+            self.m1 = self._pin(self.m1_pin, PIN_OUT)
             self.m0.on()
             self.m1.on()
+        # the pins are driven without set_mode, the next switch can't be skipped
+        self.mode = None
 
         # self.uart.timeout(1000)
 
-        code = self.set_mode(ModeType.MODE_0_NORMAL)
-        if code != ResponseStatusCode.SUCCESS:
-            return code
-
-        return code
+    def _pin(self, pin, mode):
+        # a pin object (machine.Pin, NoopPin, FilePin...) is used as is, an id is created by the platform
+        if hasattr(pin, 'value'):
+            return pin
+        return self.platform.pin(pin, mode)
 
     def set_mode(self, mode: ModeType) -> ResponseStatusCode:
-        self.managed_delay(40)
+        if mode == self.mode:
+            self._mode_switches_skipped += 1
+            return ResponseStatusCode.E220_SUCCESS
+
+        start = self.clock.ticks_us()
+        if self.aux is not None:
+            res = self._switch_mode(mode)
+        else:
+            # without AUX the fixed waits of the datasheet
+            self.delay(40)
+
+            if not self._apply_mode_pins(mode):
+                return ResponseStatusCode.ERR_E220_INVALID_PARAM
+
+            self.delay(40)
+
+            res = self.wait_complete_response(self._packet_timeout())
 
+        if res == ResponseStatusCode.E220_SUCCESS:
+            self.mode = mode
+            self._mode_switched(start)
+        else:
+            # the pins could be in the new mode without the module in it
+            self.mode = None
+            self.metrics.error(res)
+
+        return res
+
+    def _mode_switched(self, start):
+        self.last_mode_switch_us = self.clock.ticks_diff(self.clock.ticks_us(), start)
+        self.metrics.mode_switched(self.last_mode_switch_us)
+        self._mode_switches += 1
+        self._mode_switch_us += self.last_mode_switch_us
+        if self.last_mode_switch_us > self._mode_switch_max_us:
+            self._mode_switch_max_us = self.last_mode_switch_us
+
+    def stats(self) -> dict:
+        # counters and histograms of the driver (a new dict, the radio path doesn't allocate)
+        stats = self.metrics.snapshot()
+        stats['rx_high_water'] = self._rx.high_water
+        stats['rx_buffer_size'] = self._rx.size
+        return stats
+
+    def reset_stats(self):
+        self.metrics.reset()
+        self._rx.high_water = len(self._rx)
+
+    def mode_switch_stats(self):
+        return {'count': self._mode_switches, 'skipped': self._mode_switches_skipped,
+                'us': self._mode_switch_us, 'max_us': self._mode_switch_max_us}
+
+    def _apply_mode_pins(self, mode) -> bool:
         if self.m0 is None and self.m1 is None:
             logger.debug(
                 "The M0 and M1 pins are not set, which means that you are connecting the pins directly as you need!")
@@ -397,49 +655,132 @@ class LoRaE220:
                 self.m1.on()
                 logger.debug("MODE PROGRAM!")
             else:
-                return ResponseStatusCode.ERR_E220_INVALID_PARAM
+                return False
+        return True
 
-        self.managed_delay(40)
+    def delay(self, ms):
+        self.delay_engine.delay(ms)
 
-        res = self.wait_complete_response(1000)
-        if res == ResponseStatusCode.E220_SUCCESS:
-            self.mode = mode
-
-        return res
+    def delay_stats(self):
+        return self.delay_engine.stats()
 
     @staticmethod
-    def managed_delay(timeout):
-        t = utime.ticks_ms()
+    def managed_delay(timeout, clock=None):
+        # busy wait on the default clock (LoRaE220.managed_delay(ms) of the existing code), or on clock
+        if clock is None:
+            clock = default_platform().clock
+        t = clock.ticks_ms()
 
         # make darn sure ticks_ms() is not about to reach max data type limit and start over
-        if utime.ticks_add(t, timeout) == 0:
+        if clock.ticks_add(t, timeout) == 0:
             t = 0
 
-        while utime.ticks_diff(utime.ticks_ms(), t) < timeout:
+        while clock.ticks_diff(clock.ticks_ms(), t) < timeout:
             pass
 
+    def _managed_delay(self, timeout):
+        # managed_delay on the clock of the driver (a VirtualClock in the simulations)
+        LoRaE220.managed_delay(timeout, self.clock)
+
+    def _on_aux_rising(self, pin):
+        # IRQ context: no allocation, only flag and timestamp
+        self._aux_rised = True
+        self.aux_rise_us = self.clock.ticks_us()
+
+    def _arm_aux(self):
+        # called just before an operation that pulls AUX LOW, to forget the previous edge
+        self._aux_rised = False
+        self._aux_armed = True
+        self._aux_armed_us = self.clock.ticks_us()
+
+    def _aux_wait_started(self):
+        # AUX LOW again: the edge seen before is of a previous operation, only a new one counts
+        if self.aux.value() == 0:
+            self._aux_rised = False
+
+    def _aux_ready(self) -> bool:
+        # call _aux_wait_started at the start of the wait, the flag could be a stale edge
+        if self._aux_rised:
+            return True
+        if self.aux.value() == 0:
+            # the module took the armed operation, the next HIGH is its end
+            self._aux_armed = False
+            return False
+        # HIGH: right after the write it's still the level before the operation
+        return not self._aux_armed or \
+            self.clock.ticks_diff(self.clock.ticks_us(), self._aux_armed_us) >= AUX_LOW_GRACE_US
+
+    def _update_aux_latency(self):
+        self._aux_armed = False
+        if self._aux_rised:
+            self.last_aux_latency_us = self.clock.ticks_diff(self.aux_rise_us, self._aux_armed_us)
+        else:
+            # AUX was already HIGH (or the edge was lost), the latency is the time we waited
+            self.last_aux_latency_us = self.clock.ticks_diff(self.clock.ticks_us(), self._aux_armed_us)
+
     def wait_complete_response(self, timeout, wait_no_aux=100) -> ResponseStatusCode:
-        result = ResponseStatusCode.E220_SUCCESS
-        t = utime.ticks_ms()
+        if self.aux is not None:
+            result = self._wait_aux(timeout)
+            if result != ResponseStatusCode.E220_SUCCESS:
+                return result
+            # AUX HIGH is the end of the operation, the same settle time of a mode switch
+            self.delay(MODE_SETTLE_MS)
+        else:
+            self.delay(wait_no_aux)
+            logger.debug("Wait no AUX pin!")
+            self.delay(20)
+
+        logger.debug("Complete!")
+        return ResponseStatusCode.E220_SUCCESS
+
+    def _wait_aux(self, timeout) -> ResponseStatusCode:
+        start = self.clock.ticks_us()
+        t = self.clock.ticks_ms()
 
-        if utime.ticks_add(t, timeout) == 0:
+        if self.clock.ticks_add(t, timeout) == 0:
             t = 0
 
-        if self.aux is not None:
-            while self.aux.value() == 0:
-                if utime.ticks_diff(utime.ticks_ms(), t) > timeout:
-                    result = ResponseStatusCode.ERR_E220_TIMEOUT
+        if self.aux_irq:
+            self._aux_wait_started()
+            while not self._aux_ready():
+                if self.clock.ticks_diff(self.clock.ticks_ms(), t) > timeout:
                     logger.debug("Timeout error!")
-                    return result
+                    return ResponseStatusCode.ERR_E220_TIMEOUT
+                # sleep until the next interrupt (AUX edge or system tick)
+                self.clock.idle()
 
-            logger.debug("AUX HIGH!")
-        else:
-            self.managed_delay(wait_no_aux)
-            logger.debug("Wait no AUX pin!")
+            self._update_aux_latency()
+            self.metrics.aux_waited(self.clock.ticks_diff(self.clock.ticks_us(), start))
+            logger.debug("AUX HIGH (IRQ)!")
+            return ResponseStatusCode.E220_SUCCESS
 
-        self.managed_delay(20)
-        logger.debug("Complete!")
-        return result
+        while not self._aux_ready():
+            if self.clock.ticks_diff(self.clock.ticks_ms(), t) > timeout:
+                logger.debug("Timeout error!")
+                return ResponseStatusCode.ERR_E220_TIMEOUT
+
+        self._aux_armed = False
+        self.metrics.aux_waited(self.clock.ticks_diff(self.clock.ticks_us(), start))
+        logger.debug("AUX HIGH!")
+        return ResponseStatusCode.E220_SUCCESS
+
+    def _switch_mode(self, mode) -> ResponseStatusCode:
+        # mode switch gated by AUX instead of fixed waits: the module accepts the new mode when AUX
+        # is HIGH and is ready MODE_SETTLE_MS after AUX goes HIGH again
+        res = self._wait_aux(self._packet_timeout())
+        if res != ResponseStatusCode.E220_SUCCESS:
+            return res
+
+        self._arm_aux()
+        if not self._apply_mode_pins(mode):
+            return ResponseStatusCode.ERR_E220_INVALID_PARAM
+
+        self.delay(MODE_SETTLE_MS)
+        res = self._wait_aux(self._packet_timeout())
+        if res == ResponseStatusCode.E220_SUCCESS:
+            self.delay(MODE_SETTLE_MS)
+
+        return res
 
     def check_UART_configuration(self, mode) -> ResponseStatusCode:
         if mode == ModeType.MODE_3_PROGRAM and self.uart_baudrate != SerialUARTBaudRate.BPS_RATE_9600:
@@ -452,11 +793,134 @@ class LoRaE220:
         if code != ResponseStatusCode.E220_SUCCESS:
             return code, None
 
+        data = self._configuration_command(configuration, permanentConfiguration)
+        ranges = self._changed_registers(data, permanentConfiguration)
+        if len(ranges) == 0:
+            # nothing to write, the module stays in its mode
+            return code, self._cached_configuration()
+
         prev_mode = self.mode
         code = self.set_mode(ModeType.MODE_3_PROGRAM)
         if code != ResponseStatusCode.E220_SUCCESS:
             return code, None
 
+        if logger.isEnabledFor(DEBUG):
+            logger.debug("Writing configuration: %s registers %s", configuration.to_hex_string(), ranges)
+        for start, end in ranges:
+            code, response = self._write_registers(data[0], start, data[3 + start:3 + end])
+            if code != ResponseStatusCode.E220_SUCCESS:
+                break
+            self._shadow[3 + start:3 + end] = response[3:]
+
+        mode_code = self.set_mode(prev_mode)
+        self.clean_UART_buffer()
+        return self._registers_written(code, mode_code, ranges, permanentConfiguration)
+
+    def _changed_registers(self, data, permanentConfiguration) -> list:
+        # contiguous ranges (start, end) of the registers that differ from the shadow copy, a gap shorter than
+        # a command head is written too, a second command costs more
+        if not self._shadow_valid or (permanentConfiguration and not self._shadow_saved):
+            return [(0, PacketLength.PL_CONFIGURATION)]
+
+        ranges = []
+        for register in range(PacketLength.PL_CONFIGURATION):
+            if data[3 + register] == self._shadow[3 + register]:
+                continue
+            if len(ranges) > 0 and register - ranges[-1][1] < 3:
+                ranges[-1] = (ranges[-1][0], register + 1)
+            else:
+                ranges.append((register, register + 1))
+        return ranges
+
+    def _write_registers(self, cmd, addr, data) -> (ResponseStatusCode, bytes):
+        # write data in the registers from addr, the module answers with the head and the registers written
+        packet = bytearray((cmd, addr, len(data)))
+        packet.extend(data)
+        if self.uart.write(packet) != len(packet):
+            return ResponseStatusCode.ERR_E220_DATA_SIZE_NOT_MATCH, None
+
+        response = self.uart.read(len(packet))
+        return self._check_registers_response(response, addr, len(data)), response
+
+    @staticmethod
+    def _check_registers_response(response, addr, size) -> ResponseStatusCode:
+        if response is None or len(response) != size + 3:
+            return ResponseStatusCode.ERR_E220_DATA_SIZE_NOT_MATCH
+        if response[0] == ProgramCommand.WRONG_FORMAT:
+            return ResponseStatusCode.ERR_E220_WRONG_FORMAT
+        if response[0] != ProgramCommand.RETURNED_COMMAND or response[1] != addr or response[2] != size:
+            return ResponseStatusCode.ERR_E220_HEAD_NOT_RECOGNIZED
+        return ResponseStatusCode.E220_SUCCESS
+
+    def _registers_written(self, code, mode_code, ranges, permanentConfiguration):
+        if code != ResponseStatusCode.E220_SUCCESS:
+            # some registers could be written, the next read goes to the module
+            self._shadow_valid = False
+            self.metrics.error(code)
+            return code, None
+
+        if ranges[0] == (0, PacketLength.PL_CONFIGURATION):
+            self._shadow[0] = ProgramCommand.RETURNED_COMMAND
+            self._shadow[1] = RegisterAddress.REG_ADDRESS_CFG
+            self._shadow[2] = PacketLength.PL_CONFIGURATION
+            self._shadow_saved = permanentConfiguration
+        elif not permanentConfiguration:
+            self._shadow_saved = False
+
+        configuration = self._cached_configuration()
+        self._configuration_updated(configuration)
+        return mode_code, configuration
+
+    def set_channel(self, chan, volatile=True) -> ResponseStatusCode:
+        # write only the channel register, volatile by default so a hop doesn't write the flash
+        if not 0 <= chan <= 0xFF:
+            return ResponseStatusCode.ERR_E220_INVALID_PARAM
+        code = self.check_UART_configuration(ModeType.MODE_3_PROGRAM)
+        if code != ResponseStatusCode.E220_SUCCESS:
+            return code
+
+        start = self.clock.ticks_us()
+        prev_mode = self.mode
+        code = self.set_mode(ModeType.MODE_3_PROGRAM)
+        if code != ResponseStatusCode.E220_SUCCESS:
+            return code
+
+        cmd = ProgramCommand.WRITE_CFG_PWR_DWN_LOSE if volatile else ProgramCommand.WRITE_CFG_PWR_DWN_SAVE
+        code, response = self._write_registers(cmd, RegisterAddress.REG_ADDRESS_CHANNEL, bytes((chan,)))
+
+        mode_code = self.set_mode(prev_mode)
+        return self._channel_written(code, mode_code, response, volatile, start)
+
+    def hop(self, sequence=None) -> (ResponseStatusCode, int):
+        # set the next channel of the sequence, a new sequence restarts from its first channel
+        chan = self._next_hop(sequence)
+        return self.set_channel(chan), chan
+
+    def _next_hop(self, sequence) -> int:
+        if sequence is not None and sequence != self.hop_sequence:
+            self.hop_sequence = sequence
+            self._hop_index = 0
+        if not self.hop_sequence:
+            raise ValueError('No hop sequence')
+
+        chan = self.hop_sequence[self._hop_index]
+        self._hop_index = (self._hop_index + 1) % len(self.hop_sequence)
+        return chan
+
+    def _channel_written(self, code, mode_code, response, volatile, start) -> ResponseStatusCode:
+        if code != ResponseStatusCode.E220_SUCCESS:
+            self._shadow_valid = False
+            self.metrics.error(code)
+            return code
+
+        if self._shadow_valid:
+            self._shadow[3 + RegisterAddress.REG_ADDRESS_CHANNEL] = response[3]
+            if volatile:
+                self._shadow_saved = False
+        self.last_hop_latency_us = self.clock.ticks_diff(self.clock.ticks_us(), start)
+        return mode_code
+
+    def _configuration_command(self, configuration, permanentConfiguration=True) -> bytes:
         configuration._STARTING_ADDRESS = RegisterAddress.REG_ADDRESS_CFG
         configuration._LENGTH = PacketLength.PL_CONFIGURATION
 
@@ -465,30 +929,20 @@ class LoRaE220:
         else:
             configuration._COMMAND = ProgramCommand.WRITE_CFG_PWR_DWN_LOSE
 
-        data = configuration.to_bytes()
-        logger.debug("Writing configuration: {} size {}".format(configuration.to_hex_string(), len(data)))
-
-        len_writed = self.uart.write(data)
-        if len_writed != len(data):
-            self.set_mode(prev_mode)
-            return code, None
-
-        code = self.set_mode(prev_mode)
-        if code != ResponseStatusCode.E220_SUCCESS:
-            return code, None
-
-        data = self.uart.read()
+        return configuration.to_bytes()
 
+    def _parse_configuration(self, data, code) -> (ResponseStatusCode, Configuration):
         if data is None or len(data) != PacketLength.PL_CONFIGURATION+3:
             if data is not None:
-                logger.debug("data: {}".format(data))
-                logger.debug("data len: {}".format(len(data)))
+                logger.debug("data: %s", data)
+                logger.debug("data len: %s", len(data))
             code = ResponseStatusCode.ERR_E220_DATA_SIZE_NOT_MATCH
+            self.metrics.error(code)
             return code, None
-        logger.debug("data: {}".format(data))
-        logger.debug("data len: {}".format(len(data)))
+        logger.debug("data: %s", data)
+        logger.debug("data len: %s", len(data))
 
-        logger.debug("model: {}".format(self.model))
+        logger.debug("model: %s", self.model)
         configuration = Configuration(self.model)
         configuration.from_bytes(data)
 
@@ -499,21 +953,28 @@ class LoRaE220:
                 PacketLength.PL_CONFIGURATION != configuration._LENGTH:
             code = ResponseStatusCode.ERR_E220_HEAD_NOT_RECOGNIZED
 
-        self.clean_UART_buffer()
-
+        self.metrics.error(code)
         return code, configuration
 
     def write_program_command(self, cmd, addr, pl) -> int:
         cmd = bytearray([cmd, addr, pl])
         size = self.uart.write(cmd)
 
-        self.managed_delay(50)  # need to check
+        self.delay(50)  # need to check
 
         return size != 3
 
-    def get_configuration(self) -> (ResponseStatusCode, Configuration):
+    def get_configuration(self, refresh=False) -> (ResponseStatusCode, Configuration):
+        if not refresh and self._shadow_valid:
+            self.cache_hits += 1
+            return ResponseStatusCode.E220_SUCCESS, self._cached_configuration()
+
+        self.cache_misses += 1
+        return self._read_configuration()
+
+    def _read_configuration(self) -> (ResponseStatusCode, Configuration):
         code = self.check_UART_configuration(ModeType.MODE_3_PROGRAM)
-        logger.debug("check_UART_configuration: {}".format(code))
+        logger.debug("check_UART_configuration: %s", code)
         if code != ResponseStatusCode.E220_SUCCESS:
             return code, None
 
@@ -521,7 +982,7 @@ class LoRaE220:
         code = self.set_mode(ModeType.MODE_3_PROGRAM)
         if code != ResponseStatusCode.E220_SUCCESS:
             return code, None
-        logger.debug("set_mode: {}".format(code))
+        logger.debug("set_mode: %s", code)
 
         self.write_program_command(
             ProgramCommand.READ_CONFIGURATION,
@@ -529,30 +990,51 @@ class LoRaE220:
             PacketLength.PL_CONFIGURATION)
 
         data = self.uart.read()
-        if data is None or len(data) != PacketLength.PL_CONFIGURATION+3:
-            if data is not None:
-                logger.debug("data: {}".format(data))
-                logger.debug("data len: {}".format(len(data)))
-            code = ResponseStatusCode.ERR_E220_DATA_SIZE_NOT_MATCH
+        code, configuration = self._parse_configuration(data, code)
+        if configuration is None:
+            self.set_mode(prev_mode)
             return code, None
 
-        logger.debug("data: {}".format(data))
-        logger.debug("data len: {}".format(len(data)))
+        mode_code = self.set_mode(prev_mode)
+        if code == ResponseStatusCode.E220_SUCCESS:
+            self._configuration_updated(configuration)
+            code = mode_code
 
-        logger.debug("model: {}".format(self.model))
+        return code, configuration
+
+    def _can_read_configuration(self) -> bool:
+        # without M0 and M1 the module can't be put in program mode and the command would be transmitted
+        return self.m0 is not None and self.m1 is not None and \
+            self.check_UART_configuration(ModeType.MODE_3_PROGRAM) == ResponseStatusCode.E220_SUCCESS
+
+    def _cached_configuration(self) -> Configuration:
         configuration = Configuration(self.model)
-        configuration.from_bytes(data)
-        code = self.set_mode(prev_mode)
+        configuration.from_bytes(self._shadow)
+        return configuration
 
-        if ProgramCommand.WRONG_FORMAT == configuration._COMMAND:
-            code = ResponseStatusCode.ERR_E220_WRONG_FORMAT
+    def invalidate_configuration_cache(self):
+        # the next get_configuration reads the module, to call if it is configured by other means
+        self._shadow_valid = False
 
-        if ProgramCommand.RETURNED_COMMAND != configuration._COMMAND or \
-                RegisterAddress.REG_ADDRESS_CFG != configuration._STARTING_ADDRESS or \
-                PacketLength.PL_CONFIGURATION != configuration._LENGTH:
-            code = ResponseStatusCode.ERR_E220_HEAD_NOT_RECOGNIZED
+    def _configuration_updated(self, configuration):
+        # keep in sync the parameters that depend on the module configuration
+        self._shadow[:] = configuration.to_bytes()
+        self._shadow_valid = True
+        self.sub_packet_size = SubPacketSetting.get_size(configuration.OPTION.subPacketSetting)
+        self._timing = configuration
 
-        return code, configuration
+    def get_aux_busy_time(self, size) -> float:
+        # ms of AUX LOW to send a packet of size bytes with the current configuration
+        return self._timing.get_aux_busy_time(size)
+
+    def _send_timeout(self, size) -> int:
+        # ms to wait AUX HIGH after writing a message of size bytes
+        expected = self.get_aux_busy_time(size)
+        return int(expected * (1 + self.timeout_margin)) + 1 + self.timeout_floor_ms
+
+    def _packet_timeout(self) -> int:
+        # ms to wait the end of the longest packet that can be in flight (mode switch, receive)
+        return self._send_timeout(self.sub_packet_size)
 
     def get_module_information(self):
         code = self.check_UART_configuration(ModeType.MODE_3_PROGRAM)
@@ -567,9 +1049,11 @@ class LoRaE220:
         self.write_program_command(
             ProgramCommand.READ_CONFIGURATION, RegisterAddress.REG_ADDRESS_PID, PacketLength.PL_PID)
 
+        from lora_e220_diagnostics import ModuleInformation
         module_information = ModuleInformation()
-        data = self.uart.read(4)
-        if data is None or len(data) != 4:
+        data = self.uart.read(PacketLength.PL_PID + 3)
+        if data is None or len(data) != PacketLength.PL_PID + 3:
+            self.set_mode(prev_mode)
             code = ResponseStatusCode.ERR_E220_DATA_SIZE_NOT_MATCH
             return code, None
 
@@ -604,62 +1088,228 @@ class LoRaE220:
                 data[i] = data[i] % 256
         return data
 
-    def receive_dict(self, rssi=False, delimiter=None, size=None) -> (ResponseStatusCode, any, int or None):
-        code, msg, rssi_value = self.receive_message(rssi, delimiter, size)
+    def receive_dict(self, rssi=False, delimiter=None, size=None,
+                     codec=None) -> (ResponseStatusCode, any, int or None):
+        code, data, rssi_value = self._receive(rssi, delimiter, size)
+        return self._parse_dict(code, data, rssi_value, codec)
+
+    @property
+    def json_codec(self):
+        if self._json_codec is None:
+            from lora_e220_codec import JsonCodec
+            self._json_codec = JsonCodec()
+        return self._json_codec
+
+    @property
+    def codec(self):
+        return self._codec if self._codec is not None else self.json_codec
+
+    @codec.setter
+    def codec(self, codec):
+        self._codec = codec
+
+    @property
+    def schemas(self):
+        if self._schemas is None:
+            from lora_e220_schema import SchemaCodec
+            self._schemas = SchemaCodec()
+            self.register_codec(self._schemas)
+        return self._schemas
+
+    def register_codec(self, codec):
+        # the receiver selects the codec by the first byte of the message
+        self.codecs[codec.MAGIC] = codec
+
+    def register_schema(self, schema_id, fields):
+        # fields: sequence of (name, type), the same on sender and receiver, see lora_e220_schema
+        self.schemas.register(schema_id, fields)
+
+    def _dict_codec(self, codec, schema_id):
+        if schema_id is not None:
+            return self.schemas.codec(schema_id)
+        return codec or self.codec
+
+    def _get_codec(self, data):
+        if len(data) > 0:
+            if data[0] in self.codecs:
+                return self.codecs[data[0]]
+            if data[0] == COMPACT_CODEC_MAGIC:
+                from lora_e220_codec import CompactCodec
+                self.register_codec(CompactCodec())
+                return self.codecs[data[0]]
+        return self.json_codec
+
+    def _parse_dict(self, code, data, rssi_value, codec=None):
         if code != ResponseStatusCode.E220_SUCCESS:
             return code, None, None
 
+        if codec is None:
+            codec = self._get_codec(data)
         try:
-            msg = ujson.loads(msg)
+            msg = codec.decode(data)
         except Exception as e:
-            logger.error("Error: {}".format(e))
+            logger.error("Error: %s", e)
+            self.metrics.error(ResponseStatusCode.ERR_E220_JSON_PARSE)
             return ResponseStatusCode.ERR_E220_JSON_PARSE, None, None
 
         return code, msg, rssi_value
 
     def receive_message(self, rssi=False, delimiter=None, size=None):
-        code = ResponseStatusCode.E220_SUCCESS
-        rssi_value = None
+        code, data, rssi_value = self._receive(rssi, delimiter, size)
+        return self._decode_message(code, data, rssi_value, rssi)
+
+    def receive_raw(self, rssi=False, delimiter=None, size=None):
+        # zero copy: the data is a memoryview on the receive buffer, valid until the next receive call
+        code, data, rssi_value = self._receive(rssi, delimiter, size)
+        return (code, data, rssi_value) if rssi else (code, data)
+
+    def _receive(self, rssi=False, delimiter=None, size=None):
+        strip_rssi = rssi
         if delimiter is not None:
             data = self._read_until(delimiter)
-            if rssi:
-                rssi_value = data[-1]  # last byte is rssi
-                data = data[:-1]  # remove rssi from data
         elif size is not None:
-            data = self.uart.read(size)
+            data = self._read_size(size)
+            strip_rssi = False
         else:
-            data = self.uart.read()
-            self.clean_UART_buffer()
-            if rssi:
-                rssi_value = data[-1]  # last byte is rssi
-                data = data[:-1]  # remove rssi from data
+            return self._receive_packet(strip_rssi)
+
+        return self._split_frame(data, strip_rssi)
+
+    def _receive_packet(self, strip_rssi):
+        # one packet, or all the fragments of a fragmented message
+        while True:
+            done, code, data, rssi_value = self._take_packet(self._framer.peek_frame(self.uart), strip_rssi)
+            if done:
+                return code, data, rssi_value
+
+    def _take_packet(self, frame, strip_rssi):
+        # fragments arrived back to back are in the same frame, they are taken one at a time
+        if frame is not None:
+            size = fragment_length(frame, 1 if strip_rssi else 0)
+            if size > len(frame) and self._framer.reopen():
+                # a fragment cut by the end of the receive buffer, the rest is still in the UART
+                return False, ResponseStatusCode.E220_SUCCESS, None, None
+            frame = frame[:size]
+            self._framer.consume_frame(len(frame))
+        code, data, rssi_value = self._split_frame(frame, strip_rssi)
+        done, code, data = self._reassemble(code, data)
+        return done, code, data, rssi_value
+
+    def _reassemble(self, code, data):
+        # returns (done, code, data), done is False while waiting for the other fragments
+        if code != ResponseStatusCode.E220_SUCCESS:
+            return True, code, data
+        if is_escaped(data):
+            return True, code, data[len(ESCAPE):]
+        if not is_fragment(data):
+            return True, code, data
 
+        code, message = self._reassembler.feed(data)
+        if code != ResponseStatusCode.E220_SUCCESS:
+            logger.debug("Fragment discarded: %s", code)
+            self.metrics.error(code)
+            return True, code, None
+        return message is not None, code, message
+
+    def _split_frame(self, data, strip_rssi):
+        # _split_message that counts the received frame
+        code, data, rssi_value = self._split_message(data, strip_rssi)
+        if code != ResponseStatusCode.E220_SUCCESS:
+            self.metrics.error(code)
+            return code, data, rssi_value
+
+        self.metrics.received(len(data))
+        if rssi_value is not None:
+            self.metrics.rssi_received(rssi_value)
+        return code, data, rssi_value
+
+    @staticmethod
+    def _split_message(data, strip_rssi):
         if data is None or len(data) == 0:
-            return (ResponseStatusCode.ERR_E220_DATA_SIZE_NOT_MATCH, None, None) \
-                if rssi else (ResponseStatusCode.ERR_E220_DATA_SIZE_NOT_MATCH, None)
+            return ResponseStatusCode.ERR_E220_DATA_SIZE_NOT_MATCH, None, None
+
+        rssi_value = None
+        if strip_rssi:
+            rssi_value = data[-1]  # last byte is rssi
+            data = data[:-1]  # remove rssi from data
+
+        return ResponseStatusCode.E220_SUCCESS, data, rssi_value
 
-        data = data.decode('utf-8')
-        msg = data
+    @staticmethod
+    def _decode_message(code, data, rssi_value, rssi):
+        if code != ResponseStatusCode.E220_SUCCESS:
+            return (code, None, None) if rssi else (code, None)
+
+        msg = str(data, 'utf-8')
 
         return (code, msg, rssi_value) if rssi else (code, msg)
 
     def clean_UART_buffer(self):
+        self._rx.clear()
+        self._framer.reset()
         self.uart.read()
 
-    def _read_until(self, terminator='\n') -> bytes:
-        line = b''
+    def poll(self) -> int:
+        # call it often in the main loop to timestamp the incoming bytes, returns the complete packets waiting
+        return self._framer.poll(self.uart)
+
+    def _read_until(self, terminator='\n'):
+        terminator = self._terminator(terminator)
+
+        # delimited reads don't use the packet boundaries
+        self._framer.reset()
+        scanned = 0
         while True:
-            c = self.uart.read(1)
-            if c == terminator:
+            data, scanned = self._find_terminator(terminator, scanned)
+            if data is not None:
+                return data
+            if self._rx.fill(self.uart, wait=True) == 0:
+                # timeout, the partial data remain in the buffer for the next call
+                return None
+
+    @staticmethod
+    def _terminator(terminator) -> int:
+        if isinstance(terminator, str):
+            return ord(terminator)
+        if not isinstance(terminator, int):
+            return terminator[0]
+        return terminator
+
+    def _find_terminator(self, terminator, scanned):
+        # (data before the terminator, bytes already scanned), data is None if the terminator isn't there yet
+        rx = self._rx
+        index = rx.find(terminator, scanned)
+        if index >= 0:
+            data = rx.peek(index)
+            rx.consume(index + 1)
+            return data, 0
+
+        if rx.free() == 0:
+            # no terminator in a full buffer, return all the data to not lock the receiver
+            return self._take(len(rx)), 0
+        return None, len(rx)
+
+    def _read_size(self, size):
+        self._framer.reset()
+        rx = self._rx
+        size = min(size, rx.size)
+        while len(rx) < size:
+            if rx.fill(self.uart, wait=True) == 0:
                 break
-            line += c
-        return line
+
+        return self._take(size)
+
+    def _take(self, size):
+        size = min(size, len(self._rx))
+        data = self._rx.peek(size)
+        self._rx.consume(size)
+        return data
 
     def send_broadcast_message(self, CHAN, message) -> ResponseStatusCode:
         return self._send_message(message, BROADCAST_ADDRESS, BROADCAST_ADDRESS, CHAN)
 
-    def send_broadcast_dict(self, CHAN, dict_message) -> ResponseStatusCode:
-        message = ujson.dumps(dict_message)
+    def send_broadcast_dict(self, CHAN, dict_message, codec=None, schema_id=None) -> ResponseStatusCode:
+        message = self._dict_codec(codec, schema_id).encode(dict_message)
         return self._send_message(message, BROADCAST_ADDRESS, BROADCAST_ADDRESS, CHAN)
 
     def send_transparent_message(self, message) -> ResponseStatusCode:
@@ -668,53 +1318,85 @@ class LoRaE220:
     def send_fixed_message(self, ADDH, ADDL, CHAN, message) -> ResponseStatusCode:
         return self._send_message(message, ADDH, ADDL, CHAN)
 
-    def send_fixed_dict(self, ADDH, ADDL, CHAN, dict_message) -> ResponseStatusCode:
-        message = ujson.dumps(dict_message)
+    def send_fixed_dict(self, ADDH, ADDL, CHAN, dict_message, codec=None, schema_id=None) -> ResponseStatusCode:
+        message = self._dict_codec(codec, schema_id).encode(dict_message)
         return self._send_message(message, ADDH, ADDL, CHAN)
 
-    def send_transparent_dict(self, dict_message) -> ResponseStatusCode:
-        message = ujson.dumps(dict_message)
+    def send_transparent_dict(self, dict_message, codec=None, schema_id=None) -> ResponseStatusCode:
+        message = self._dict_codec(codec, schema_id).encode(dict_message)
         return self._send_message(message)
 
     def _send_message(self, message, ADDH=None, ADDL=None, CHAN=None) -> ResponseStatusCode:
-        result = ResponseStatusCode.E220_SUCCESS
+        if isinstance(message, str):
+            message = message.encode('utf-8')
+
+        packet = escape(message)
+        if len(packet) <= self.sub_packet_size:
+            return self._send_packet(packet, ADDH, ADDL, CHAN)
 
-        size_ = len(message.encode('utf-8'))
-        if size_ > MAX_SIZE_TX_PACKET + 2:
+        # bigger than a sub packet: fragments with header, rebuilt by the receiver
+        if Fragmenter.fragment_count(len(message), self.sub_packet_size) > MAX_FRAGMENTS:
             return ResponseStatusCode.ERR_E220_PACKET_TOO_BIG
 
-        if ADDH is not None and ADDL is not None and CHAN is not None:
-            if isinstance(message, str):
-                message = message.encode('utf-8')
-            dataarray = bytes([ADDH, ADDL, CHAN]) + message
-            dataarray = LoRaE220._normalize_array(dataarray)
-            lenMS = self.uart.write(bytes(dataarray))
-            size_ += 3
-        elif isinstance(message, str):
-            lenMS = self.uart.write(message.encode('utf-8'))
-        else:
-            lenMS = self.uart.write(bytes(message))
+        result = ResponseStatusCode.E220_SUCCESS
+        for fragment in self._fragmenter.fragments(message, self.sub_packet_size):
+            result = self._send_packet(fragment, ADDH, ADDL, CHAN)
+            if result != ResponseStatusCode.E220_SUCCESS:
+                return result
+        return result
 
-        if lenMS != size_:
-            logger.debug("Send... len:", lenMS, " size:", size_)
-            if lenMS == 0:
-                result = ResponseStatusCode.ERR_E220_NO_RESPONSE_FROM_DEVICE
-            else:
-                result = ResponseStatusCode.ERR_E220_DATA_SIZE_NOT_MATCH
+    def _send_packet(self, message, ADDH=None, ADDL=None, CHAN=None) -> ResponseStatusCode:
+        result, data = self._build_packet(message, ADDH, ADDL, CHAN)
+        if result != ResponseStatusCode.E220_SUCCESS:
+            self.metrics.error(result)
+            return result
+
+        self._arm_aux()
+        lenMS = self.uart.write(data)
+        result = self._check_written(lenMS, len(data))
         if result != ResponseStatusCode.E220_SUCCESS:
+            self.metrics.error(result)
             return result
 
-        result = self.wait_complete_response(1000)
+        result = self.wait_complete_response(self._send_timeout(len(message)))
         if result != ResponseStatusCode.E220_SUCCESS:
+            self.metrics.error(result)
             return result
+        self.metrics.sent(len(data))
         logger.debug("Clear buffer...")
         self.clean_UART_buffer()
 
         logger.debug("ok!")
         return result
 
+    @staticmethod
+    def _build_packet(message, ADDH=None, ADDL=None, CHAN=None) -> (ResponseStatusCode, bytes):
+        if isinstance(message, str):
+            message = message.encode('utf-8')
+        else:
+            message = bytes(message)
+
+        if len(message) > MAX_SIZE_TX_PACKET + 2:
+            return ResponseStatusCode.ERR_E220_PACKET_TOO_BIG, None
+
+        if ADDH is not None and ADDL is not None and CHAN is not None:
+            dataarray = bytes([ADDH, ADDL, CHAN]) + message
+            dataarray = LoRaE220._normalize_array(dataarray)
+            return ResponseStatusCode.E220_SUCCESS, bytes(dataarray)
+
+        return ResponseStatusCode.E220_SUCCESS, message
+
+    @staticmethod
+    def _check_written(lenMS, size_) -> ResponseStatusCode:
+        if lenMS != size_:
+            logger.debug("Send... len: %s size: %s", lenMS, size_)
+            if lenMS == 0:
+                return ResponseStatusCode.ERR_E220_NO_RESPONSE_FROM_DEVICE
+            return ResponseStatusCode.ERR_E220_DATA_SIZE_NOT_MATCH
+        return ResponseStatusCode.E220_SUCCESS
+
     def available(self) -> int:
-        return self.uart.any()
+        return self.uart.any() + len(self._rx)
 
     def end(self) -> ResponseStatusCode:
         try:
@@ -724,5 +1406,5 @@ class LoRaE220:
             return ResponseStatusCode.E220_SUCCESS
 
         except Exception as E:
-            logger.error("Error: {}".format(E))
+            logger.error("Error: %s", E)
             return ResponseStatusCode.ERR_E220_DEINIT_UART_FAILED
@@ -0,0 +1,96 @@
+#############################################################################################
+# EBYTE LoRa E220 Series for MicroPython - airtime model
+#
+# Time on air of a message with the LoRa formula of the Semtech datasheets (SX126x/LLCC68):
+#
+#   Tsym     = 2^SF / BW
+#   Tpreamble = (preamble + 4.25) * Tsym          (+ 6.25 for SF5 and SF6)
+#   symbols  = 8 + max(ceil((8*PL - 4*SF + 28 + 16*CRC - 20*IH) / (4*(SF - 2*DE))) * (CR + 4), 0)
+#
+# The module doesn't expose spreading factor and bandwidth, the table below approximates
+# every air data rate with LLCC68 parameters: the bandwidth is 125kHz up to 4.8k, 250kHz at
+# 9.6k and 500kHz above, the spreading factor is the one with the nearest bit rate
+# (SF * BW / 2^SF * 4/5) at that bandwidth, e.g. 2.4k is SF9 (1758bps, SF8 is 3125bps).
+# You can replace an entry (AIR_DATA_RATE_PARAMETERS[rate] = (sf, bw)) after a measurement.
+#
+# The message is sent in sub packets (200/128/64/32 bytes) every one with its preamble and
+# header, in fixed transmission the 3 bytes of address and channel are sent too.
+#############################################################################################
+
+from lora_e220_constants import AirDataRate, SubPacketSetting, UARTBaudRate, FixedTransmission
+
+# air data rate -> (spreading factor, bandwidth Hz)
+AIR_DATA_RATE_PARAMETERS = {
+    AirDataRate.AIR_DATA_RATE_000_24: (9, 125000),
+    AirDataRate.AIR_DATA_RATE_001_24: (9, 125000),
+    AirDataRate.AIR_DATA_RATE_010_24: (9, 125000),
+    AirDataRate.AIR_DATA_RATE_011_48: (7, 125000),
+    AirDataRate.AIR_DATA_RATE_100_96: (7, 250000),
+    AirDataRate.AIR_DATA_RATE_101_192: (7, 500000),
+    AirDataRate.AIR_DATA_RATE_110_384: (6, 500000),
+    AirDataRate.AIR_DATA_RATE_111_625: (5, 500000),
+}
+
+PREAMBLE_SYMBOLS = 8
+CODING_RATE = 1  # 4/5
+CRC = 1
+FIXED_HEADER_SIZE = 3
+# start bit + 8 data bits + stop bit (+ parity)
+UART_BITS_PER_BYTE = 10
+
+
+def packet_time_on_air(air_data_rate, payload_size) -> float:
+    # ms on air of a single LoRa packet
+    sf, bw = AIR_DATA_RATE_PARAMETERS[air_data_rate]
+    t_sym = (1 << sf) * 1000 / bw
+    low_data_rate = 1 if t_sym > 16 else 0
+
+    if sf < 7:
+        preamble = PREAMBLE_SYMBOLS + 6.25
+        numerator = 8 * payload_size - 4 * sf + 20 + 16 * CRC
+    else:
+        preamble = PREAMBLE_SYMBOLS + 4.25
+        numerator = 8 * payload_size - 4 * sf + 28 + 16 * CRC
+    denominator = 4 * (sf - 2 * low_data_rate)
+    symbols = 8 + max(-(-numerator // denominator) * (CODING_RATE + 4), 0)
+
+    return (preamble + symbols) * t_sym
+
+
+def time_on_air(air_data_rate, payload_size, sub_packet_setting=SubPacketSetting.SPS_200_00,
+                fixed_transmission=FixedTransmission.TRANSPARENT_TRANSMISSION) -> float:
+    # ms on air of a message, split in sub packets
+    if fixed_transmission == FixedTransmission.FIXED_TRANSMISSION:
+        payload_size += FIXED_HEADER_SIZE
+    sub_packet_size = SubPacketSetting.get_size(sub_packet_setting)
+
+    full, last = divmod(payload_size, sub_packet_size)
+    total = full * packet_time_on_air(air_data_rate, sub_packet_size)
+    if last > 0 or payload_size == 0:
+        total += packet_time_on_air(air_data_rate, last)
+    return total
+
+
+def uart_time(uart_baud_rate, size, parity=False) -> float:
+    # ms to move size bytes on the UART, uart_baud_rate is the UARTBaudRate value
+    bits = UART_BITS_PER_BYTE + (1 if parity else 0)
+    return size * bits * 1000 / UARTBaudRate.get_bps(uart_baud_rate)
+
+
+def aux_busy_time(air_data_rate, uart_baud_rate, payload_size, sub_packet_setting=SubPacketSetting.SPS_200_00,
+                  fixed_transmission=FixedTransmission.TRANSPARENT_TRANSMISSION, parity=False) -> float:
+    # ms of AUX LOW for a send: the module starts to transmit when the first sub packet is in its
+    # buffer, the UART transfer of the other sub packets overlaps the transmission
+    size = payload_size
+    if fixed_transmission == FixedTransmission.FIXED_TRANSMISSION:
+        size += FIXED_HEADER_SIZE
+    first = min(size, SubPacketSetting.get_size(sub_packet_setting))
+    on_air = time_on_air(air_data_rate, payload_size, sub_packet_setting, fixed_transmission)
+    return max(uart_time(uart_baud_rate, first, parity) + on_air, uart_time(uart_baud_rate, size, parity))
+
+
+def max_message_rate(air_data_rate, uart_baud_rate, payload_size, sub_packet_setting=SubPacketSetting.SPS_200_00,
+                     fixed_transmission=FixedTransmission.TRANSPARENT_TRANSMISSION, parity=False) -> float:
+    # messages per second that the module can sustain back to back
+    return 1000 / aux_busy_time(air_data_rate, uart_baud_rate, payload_size, sub_packet_setting,
+                                fixed_transmission, parity)
@@ -0,0 +1,455 @@
+#############################################################################################
+# EBYTE LoRa E220 Series for MicroPython - asyncio driver
+#
+# Non-blocking version of LoRaE220: every operation that waits for the module (AUX pin,
+# mode switch, UART response) yields to the event loop, so other tasks keep running
+# while a packet is in flight or the module is being configured.
+#
+# The UART is wrapped in a uasyncio StreamReader/StreamWriter, the frame building and
+# response parsing are shared with the blocking LoRaE220 class. The messages are received
+# like in LoRaE220 (preallocated buffer, packet framer, fragments) polling the UART every
+# millisecond on the event loop.
+#############################################################################################
+
+import uasyncio as asyncio
+
+from lora_e220 import LoRaE220, BROADCAST_ADDRESS, MODE_SETTLE_MS, logger
+from lora_e220_logging import DEBUG
+from lora_e220_constants import UARTParity
+from lora_e220_delay import DelayStrategy
+from lora_e220_fragment import Fragmenter, escape, MAX_FRAGMENTS
+from lora_e220_operation_constant import ResponseStatusCode, ModeType, ProgramCommand, PacketLength, \
+    RegisterAddress, SerialUARTBaudRate
+
+
+class AsyncLoRaE220(LoRaE220):
+    # the UART is polled by the event loop, so reads must never block inside the driver
+    UART_TIMEOUT = 0
+    UART_TIMEOUT_CHAR = 10
+    # ms to wait the first byte of a receive (and the next one of a delimited or sized read)
+    RECEIVE_TIMEOUT = 1000
+
+    def __init__(self, model, uart, aux_pin=None, m0_pin=None, m1_pin=None,
+                 uart_baudrate=SerialUARTBaudRate.BPS_RATE_9600, aux_irq=False, delay_engine=None,
+                 rx_buffer_size=512, max_message_size=1024, fragment_timeout=5000, platform=None, clock=None):
+        super().__init__(model, uart, aux_pin, m0_pin, m1_pin, uart_baudrate, aux_irq, delay_engine,
+                         rx_buffer_size, max_message_size, fragment_timeout, platform=platform, clock=clock)
+
+        self.sreader = None
+        self.swriter = None
+        # ThreadSafeFlag can be set from the AUX interrupt and awaited by the driver
+        self._aux_flag = asyncio.ThreadSafeFlag() if aux_irq and hasattr(asyncio, 'ThreadSafeFlag') else None
+
+    async def begin(self, uart_parity=UARTParity.MODE_00_8N1):
+        self._init_hardware(uart_parity, timeout=self.UART_TIMEOUT, timeout_char=self.UART_TIMEOUT_CHAR)
+
+        self.sreader = asyncio.StreamReader(self.uart)
+        self.swriter = asyncio.StreamWriter(self.uart, {})
+
+        code = await self.set_mode(ModeType.MODE_0_NORMAL)
+        if code != ResponseStatusCode.E220_SUCCESS:
+            return code
+
+        if self._can_read_configuration():
+            read_code = (await self._read_configuration())[0]
+            if read_code != ResponseStatusCode.E220_SUCCESS:
+                logger.debug("read configuration: %s", read_code)
+                code = await self.set_mode(ModeType.MODE_0_NORMAL)
+
+        return code
+
+    async def delay(self, ms):
+        start = self.clock.ticks_us()
+        await asyncio.sleep_ms(ms)
+        self.delay_engine.account(DelayStrategy.ASYNC, self.clock.ticks_diff(self.clock.ticks_us(), start))
+
+    def _on_aux_rising(self, pin):
+        super()._on_aux_rising(pin)
+        if self._aux_flag is not None:
+            self._aux_flag.set()
+
+    def _arm_aux(self):
+        super()._arm_aux()
+        self._clear_aux_flag()
+
+    def _aux_wait_started(self):
+        super()._aux_wait_started()
+        if not self._aux_rised:
+            self._clear_aux_flag()
+
+    def _clear_aux_flag(self):
+        if self._aux_flag is not None and hasattr(self._aux_flag, 'clear'):
+            self._aux_flag.clear()
+
+    async def set_mode(self, mode: ModeType) -> ResponseStatusCode:
+        if mode == self.mode:
+            self._mode_switches_skipped += 1
+            return ResponseStatusCode.E220_SUCCESS
+
+        start = self.clock.ticks_us()
+        if self.aux is not None:
+            res = await self._switch_mode(mode)
+        else:
+            await self.delay(40)
+
+            if not self._apply_mode_pins(mode):
+                return ResponseStatusCode.ERR_E220_INVALID_PARAM
+
+            await self.delay(40)
+
+            res = await self.wait_complete_response(self._packet_timeout())
+
+        if res == ResponseStatusCode.E220_SUCCESS:
+            self.mode = mode
+            self._mode_switched(start)
+        else:
+            self.mode = None
+            self.metrics.error(res)
+
+        return res
+
+    async def wait_complete_response(self, timeout, wait_no_aux=100) -> ResponseStatusCode:
+        if self.aux is not None:
+            res = await self._wait_aux(timeout)
+            if res != ResponseStatusCode.E220_SUCCESS:
+                return res
+            await self.delay(MODE_SETTLE_MS)
+        else:
+            await self.delay(wait_no_aux)
+            logger.debug("Wait no AUX pin!")
+            await self.delay(20)
+
+        logger.debug("Complete!")
+        return ResponseStatusCode.E220_SUCCESS
+
+    async def _wait_aux(self, timeout) -> ResponseStatusCode:
+        start = self.clock.ticks_us()
+        if self._aux_flag is not None:
+            self._aux_wait_started()
+            t = self.clock.ticks_ms()
+            while not self._aux_ready():
+                # the flag can still be set by an edge before the wait (no clear() on old ports)
+                remaining = timeout - self.clock.ticks_diff(self.clock.ticks_ms(), t)
+                if remaining <= 0:
+                    logger.debug("Timeout error!")
+                    return ResponseStatusCode.ERR_E220_TIMEOUT
+                try:
+                    # armed: the level HIGH counts after the grace time, without an edge
+                    wait = min(remaining, 1) if self._aux_armed else remaining
+                    await asyncio.wait_for_ms(self._aux_flag.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+
+            self._update_aux_latency()
+            self.metrics.aux_waited(self.clock.ticks_diff(self.clock.ticks_us(), start))
+            logger.debug("AUX HIGH (IRQ)!")
+            return ResponseStatusCode.E220_SUCCESS
+
+        t = self.clock.ticks_ms()
+        while not self._aux_ready():
+            if self.clock.ticks_diff(self.clock.ticks_ms(), t) > timeout:
+                logger.debug("Timeout error!")
+                return ResponseStatusCode.ERR_E220_TIMEOUT
+            await asyncio.sleep_ms(1)
+
+        self._aux_armed = False
+        self.metrics.aux_waited(self.clock.ticks_diff(self.clock.ticks_us(), start))
+        logger.debug("AUX HIGH!")
+        return ResponseStatusCode.E220_SUCCESS
+
+    async def _switch_mode(self, mode) -> ResponseStatusCode:
+        res = await self._wait_aux(self._packet_timeout())
+        if res != ResponseStatusCode.E220_SUCCESS:
+            return res
+
+        self._arm_aux()
+        if not self._apply_mode_pins(mode):
+            return ResponseStatusCode.ERR_E220_INVALID_PARAM
+
+        await self.delay(MODE_SETTLE_MS)
+        res = await self._wait_aux(self._packet_timeout())
+        if res == ResponseStatusCode.E220_SUCCESS:
+            await self.delay(MODE_SETTLE_MS)
+
+        return res
+
+    async def _write(self, data) -> int:
+        self.swriter.write(data)
+        await self.swriter.drain()
+        return len(data)
+
+    async def _read_exactly(self, size, timeout=1000):
+        try:
+            return await asyncio.wait_for_ms(self.sreader.readexactly(size), timeout)
+        except (asyncio.TimeoutError, EOFError):
+            return None
+
+    async def write_program_command(self, cmd, addr, pl) -> int:
+        size = await self._write(bytearray([cmd, addr, pl]))
+
+        await self.delay(50)  # need to check
+
+        return size != 3
+
+    async def set_configuration(self, configuration, permanentConfiguration=True):
+        code = self.check_UART_configuration(ModeType.MODE_3_PROGRAM)
+        if code != ResponseStatusCode.E220_SUCCESS:
+            return code, None
+
+        data = self._configuration_command(configuration, permanentConfiguration)
+        ranges = self._changed_registers(data, permanentConfiguration)
+        if len(ranges) == 0:
+            return code, self._cached_configuration()
+
+        prev_mode = self.mode
+        code = await self.set_mode(ModeType.MODE_3_PROGRAM)
+        if code != ResponseStatusCode.E220_SUCCESS:
+            return code, None
+
+        if logger.isEnabledFor(DEBUG):
+            logger.debug("Writing configuration: %s registers %s", configuration.to_hex_string(), ranges)
+        for start, end in ranges:
+            code, response = await self._write_registers(data[0], start, data[3 + start:3 + end])
+            if code != ResponseStatusCode.E220_SUCCESS:
+                break
+            self._shadow[3 + start:3 + end] = response[3:]
+
+        mode_code = await self.set_mode(prev_mode)
+        self.clean_UART_buffer()
+        return self._registers_written(code, mode_code, ranges, permanentConfiguration)
+
+    async def _write_registers(self, cmd, addr, data):
+        packet = bytearray((cmd, addr, len(data)))
+        packet.extend(data)
+        await self._write(packet)
+
+        response = await self._read_exactly(len(packet))
+        return self._check_registers_response(response, addr, len(data)), response
+
+    async def set_channel(self, chan, volatile=True) -> ResponseStatusCode:
+        if not 0 <= chan <= 0xFF:
+            return ResponseStatusCode.ERR_E220_INVALID_PARAM
+        code = self.check_UART_configuration(ModeType.MODE_3_PROGRAM)
+        if code != ResponseStatusCode.E220_SUCCESS:
+            return code
+
+        start = self.clock.ticks_us()
+        prev_mode = self.mode
+        code = await self.set_mode(ModeType.MODE_3_PROGRAM)
+        if code != ResponseStatusCode.E220_SUCCESS:
+            return code
+
+        cmd = ProgramCommand.WRITE_CFG_PWR_DWN_LOSE if volatile else ProgramCommand.WRITE_CFG_PWR_DWN_SAVE
+        code, response = await self._write_registers(cmd, RegisterAddress.REG_ADDRESS_CHANNEL, bytes((chan,)))
+
+        mode_code = await self.set_mode(prev_mode)
+        return self._channel_written(code, mode_code, response, volatile, start)
+
+    async def hop(self, sequence=None):
+        chan = self._next_hop(sequence)
+        return await self.set_channel(chan), chan
+
+    async def get_configuration(self, refresh=False):
+        if not refresh and self._shadow_valid:
+            self.cache_hits += 1
+            return ResponseStatusCode.E220_SUCCESS, self._cached_configuration()
+
+        self.cache_misses += 1
+        return await self._read_configuration()
+
+    async def _read_configuration(self):
+        code = self.check_UART_configuration(ModeType.MODE_3_PROGRAM)
+        if code != ResponseStatusCode.E220_SUCCESS:
+            return code, None
+
+        prev_mode = self.mode
+        code = await self.set_mode(ModeType.MODE_3_PROGRAM)
+        if code != ResponseStatusCode.E220_SUCCESS:
+            return code, None
+
+        await self.write_program_command(
+            ProgramCommand.READ_CONFIGURATION,
+            RegisterAddress.REG_ADDRESS_CFG,
+            PacketLength.PL_CONFIGURATION)
+
+        data = await self._read_exactly(PacketLength.PL_CONFIGURATION + 3)
+        code, configuration = self._parse_configuration(data, code)
+        if configuration is None:
+            await self.set_mode(prev_mode)
+            return code, None
+
+        mode_code = await self.set_mode(prev_mode)
+        if code == ResponseStatusCode.E220_SUCCESS:
+            self._configuration_updated(configuration)
+            code = mode_code
+
+        return code, configuration
+
+    async def get_module_information(self):
+        code = self.check_UART_configuration(ModeType.MODE_3_PROGRAM)
+        if code != ResponseStatusCode.E220_SUCCESS:
+            return code, None
+
+        prev_mode = self.mode
+        code = await self.set_mode(ModeType.MODE_3_PROGRAM)
+        if code != ResponseStatusCode.E220_SUCCESS:
+            return code, None
+
+        await self.write_program_command(
+            ProgramCommand.READ_CONFIGURATION, RegisterAddress.REG_ADDRESS_PID, PacketLength.PL_PID)
+
+        data = await self._read_exactly(PacketLength.PL_PID + 3)
+
+        code = await self.set_mode(prev_mode)
+        if data is None:
+            return ResponseStatusCode.ERR_E220_DATA_SIZE_NOT_MATCH, None
+        if code != ResponseStatusCode.E220_SUCCESS:
+            return code, None
+
+        from lora_e220_diagnostics import ModuleInformation
+        module_information = ModuleInformation()
+        module_information.from_bytes(data)
+
+        if ProgramCommand.WRONG_FORMAT == module_information._COMMAND:
+            code = ResponseStatusCode.ERR_E220_WRONG_FORMAT
+        if ProgramCommand.RETURNED_COMMAND != module_information._COMMAND or \
+                RegisterAddress.REG_ADDRESS_PID != module_information._STARTING_ADDRESS or \
+                PacketLength.PL_PID != module_information._LENGTH:
+            code = ResponseStatusCode.ERR_E220_HEAD_NOT_RECOGNIZED
+
+        return code, module_information
+
+    async def receive_dict(self, rssi=False, delimiter=None, size=None, codec=None):
+        code, data, rssi_value = await self._receive(rssi, delimiter, size)
+        return self._parse_dict(code, data, rssi_value, codec)
+
+    async def receive_message(self, rssi=False, delimiter=None, size=None):
+        code, data, rssi_value = await self._receive(rssi, delimiter, size)
+        return self._decode_message(code, data, rssi_value, rssi)
+
+    async def receive_raw(self, rssi=False, delimiter=None, size=None):
+        code, data, rssi_value = await self._receive(rssi, delimiter, size)
+        return (code, data, rssi_value) if rssi else (code, data)
+
+    async def _receive(self, rssi=False, delimiter=None, size=None):
+        strip_rssi = rssi
+        if delimiter is not None:
+            data = await self._read_until(delimiter)
+        elif size is not None:
+            data = await self._read_size(size)
+            strip_rssi = False
+        else:
+            return await self._receive_packet(strip_rssi)
+
+        return self._split_frame(data, strip_rssi)
+
+    async def _receive_packet(self, strip_rssi):
+        while True:
+            done, code, data, rssi_value = self._take_packet(await self._peek_frame(), strip_rssi)
+            if done:
+                return code, data, rssi_value
+
+    async def _peek_frame(self):
+        # the framer must be polled more often than the gap between two packets (min 3ms)
+        clock = self.clock
+        framer = self._framer
+        start = clock.ticks_ms()
+        while framer.poll(self.uart) == 0:
+            if not framer.receiving() and clock.ticks_diff(clock.ticks_ms(), start) > self.RECEIVE_TIMEOUT:
+                return None
+            await asyncio.sleep_ms(1)
+        return framer.frame()
+
+    async def _fill(self) -> int:
+        # rx.fill(uart, wait=True) that yields: bytes read, 0 after RECEIVE_TIMEOUT ms without bytes
+        clock = self.clock
+        start = clock.ticks_ms()
+        while True:
+            read = self._rx.fill(self.uart)
+            if read > 0 or clock.ticks_diff(clock.ticks_ms(), start) > self.RECEIVE_TIMEOUT:
+                return read
+            await asyncio.sleep_ms(1)
+
+    async def _read_until(self, terminator='\n'):
+        terminator = self._terminator(terminator)
+
+        self._framer.reset()
+        scanned = 0
+        while True:
+            data, scanned = self._find_terminator(terminator, scanned)
+            if data is not None:
+                return data
+            if await self._fill() == 0:
+                return None
+
+    async def _read_size(self, size):
+        self._framer.reset()
+        size = min(size, self._rx.size)
+        while len(self._rx) < size:
+            if await self._fill() == 0:
+                break
+
+        return self._take(size)
+
+    async def send_broadcast_message(self, CHAN, message) -> ResponseStatusCode:
+        return await self._send_message(message, BROADCAST_ADDRESS, BROADCAST_ADDRESS, CHAN)
+
+    async def send_broadcast_dict(self, CHAN, dict_message, codec=None, schema_id=None) -> ResponseStatusCode:
+        message = self._dict_codec(codec, schema_id).encode(dict_message)
+        return await self._send_message(message, BROADCAST_ADDRESS, BROADCAST_ADDRESS, CHAN)
+
+    async def send_transparent_message(self, message) -> ResponseStatusCode:
+        return await self._send_message(message)
+
+    async def send_fixed_message(self, ADDH, ADDL, CHAN, message) -> ResponseStatusCode:
+        return await self._send_message(message, ADDH, ADDL, CHAN)
+
+    async def send_fixed_dict(self, ADDH, ADDL, CHAN, dict_message, codec=None, schema_id=None) -> ResponseStatusCode:
+        message = self._dict_codec(codec, schema_id).encode(dict_message)
+        return await self._send_message(message, ADDH, ADDL, CHAN)
+
+    async def send_transparent_dict(self, dict_message, codec=None, schema_id=None) -> ResponseStatusCode:
+        message = self._dict_codec(codec, schema_id).encode(dict_message)
+        return await self._send_message(message)
+
+    async def _send_message(self, message, ADDH=None, ADDL=None, CHAN=None) -> ResponseStatusCode:
+        if isinstance(message, str):
+            message = message.encode('utf-8')
+
+        packet = escape(message)
+        if len(packet) <= self.sub_packet_size:
+            return await self._send_packet(packet, ADDH, ADDL, CHAN)
+
+        if Fragmenter.fragment_count(len(message), self.sub_packet_size) > MAX_FRAGMENTS:
+            return ResponseStatusCode.ERR_E220_PACKET_TOO_BIG
+
+        result = ResponseStatusCode.E220_SUCCESS
+        for fragment in self._fragmenter.fragments(message, self.sub_packet_size):
+            result = await self._send_packet(fragment, ADDH, ADDL, CHAN)
+            if result != ResponseStatusCode.E220_SUCCESS:
+                return result
+        return result
+
+    async def _send_packet(self, message, ADDH=None, ADDL=None, CHAN=None) -> ResponseStatusCode:
+        result, data = self._build_packet(message, ADDH, ADDL, CHAN)
+        if result != ResponseStatusCode.E220_SUCCESS:
+            self.metrics.error(result)
+            return result
+
+        self._arm_aux()
+        lenMS = await self._write(data)
+        result = self._check_written(lenMS, len(data))
+        if result != ResponseStatusCode.E220_SUCCESS:
+            self.metrics.error(result)
+            return result
+
+        result = await self.wait_complete_response(self._send_timeout(len(message)))
+        if result != ResponseStatusCode.E220_SUCCESS:
+            self.metrics.error(result)
+            return result
+        self.metrics.sent(len(data))
+        logger.debug("Clear buffer...")
+        self.clean_UART_buffer()
+
+        logger.debug("ok!")
+        return result
@@ -0,0 +1,84 @@
+#############################################################################################
+# EBYTE LoRa E220 Series for MicroPython - receive buffer
+#
+# Preallocated receive buffer filled in bulk with uart.readinto(), the messages are handed
+# out as memoryview slices, so the receive path doesn't allocate for every byte.
+#
+# The buffer is used as a ring: data is appended at the tail and consumed from the head,
+# when the tail reaches the end the pending bytes are moved back to the start, so that a
+# message is always contiguous and can be returned as a single memoryview.
+#############################################################################################
+
+
+class RingBuffer:
+    def __init__(self, size=512):
+        self.buf = bytearray(size)
+        self.mv = memoryview(self.buf)
+        self.size = size
+        self.head = 0
+        self.tail = 0
+        # highest number of pending bytes seen
+        self.high_water = 0
+
+    def __len__(self):
+        return self.tail - self.head
+
+    def free(self):
+        return self.size - len(self)
+
+    def clear(self):
+        self.head = 0
+        self.tail = 0
+
+    def _compact(self):
+        pending = self.tail - self.head
+        if self.head == 0:
+            return
+        if pending <= self.head:
+            self.mv[0:pending] = self.mv[self.head:self.tail]
+        else:
+            # overlapping regions, move byte by byte from the start
+            buf = self.buf
+            head = self.head
+            for i in range(pending):
+                buf[i] = buf[head + i]
+        self.head = 0
+        self.tail = pending
+
+    def fill(self, uart, wait=False) -> int:
+        # read what is already in the UART, if wait is True and nothing is there block for 1 byte (UART timeout)
+        n = uart.any()
+        if n == 0:
+            if not wait:
+                return 0
+            n = 1
+
+        if self.tail + n > self.size:
+            self._compact()
+        n = min(n, self.size - self.tail)
+        if n == 0:
+            return 0
+
+        read = uart.readinto(self.mv[self.tail:self.tail + n])
+        if not read:
+            return 0
+        self.tail += read
+        if self.tail - self.head > self.high_water:
+            self.high_water = self.tail - self.head
+        return read
+
+    def find(self, value, start=0) -> int:
+        # index (relative to head) of the first byte equal to value, -1 if not present
+        buf = self.buf
+        for i in range(self.head + start, self.tail):
+            if buf[i] == value:
+                return i - self.head
+        return -1
+
+    def peek(self, size):
+        return self.mv[self.head:self.head + size]
+
+    def consume(self, size):
+        self.head += size
+        if self.head >= self.tail:
+            self.clear()
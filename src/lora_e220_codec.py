@@ -0,0 +1,198 @@
+#############################################################################################
+# EBYTE LoRa E220 Series for MicroPython - dictionary codecs
+#
+# A codec converts the dictionary sent with send_*_dict and received with receive_dict.
+# Every codec has an encode(obj) and a decode(data) method and a MAGIC first byte that
+# lets the receiver select the right codec for every message (JSON has no magic byte, it
+# is the default when the first byte is not a known magic).
+#
+# CompactCodec is a MessagePack like binary encoding, small values and short strings are
+# encoded with a single type byte, integers are zigzag varint, floats are float32 by
+# default. A dict like {'t': 21.5, 'h': 40} is 12 bytes against 20 of JSON.
+#############################################################################################
+
+try:
+    import ustruct as struct
+except ImportError:
+    import struct
+
+try:
+    import ujson as json
+except ImportError:
+    import json
+
+
+class JsonCodec:
+    MAGIC = None
+
+    def encode(self, obj):
+        return json.dumps(obj)
+
+    def decode(self, data):
+        if not isinstance(data, str):
+            data = str(data, 'utf-8')
+        return json.loads(data)
+
+
+class CompactCodec:
+    MAGIC = 0xB1
+
+    # type bytes
+    FIX_INT = 0x00  # 0x00-0x7F positive int
+    FIX_MAP = 0x80  # 0x80-0x8F map with up to 15 items
+    FIX_ARRAY = 0x90  # 0x90-0x9F array with up to 15 items
+    FIX_STR = 0xA0  # 0xA0-0xBF string with up to 31 bytes
+    NONE = 0xC0
+    FALSE = 0xC2
+    TRUE = 0xC3
+    BYTES = 0xC4
+    STR = 0xC5
+    ARRAY = 0xC6
+    MAP = 0xC7
+    FLOAT32 = 0xCA
+    FLOAT64 = 0xCB
+    INT = 0xD0
+    NEG_FIX_INT = 0xE0  # 0xE0-0xFF negative int -32..-1
+
+    def __init__(self, float64=False):
+        self.float64 = float64
+
+    def encode(self, obj) -> bytearray:
+        out = bytearray()
+        out.append(self.MAGIC)
+        self._encode(obj, out)
+        return out
+
+    def decode(self, data):
+        if len(data) == 0 or data[0] != self.MAGIC:
+            raise ValueError('Not a compact message')
+        value, pos = self._decode(data, 1)
+        return value
+
+    @staticmethod
+    def _write_varint(value, out):
+        while value > 0x7F:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+
+    @staticmethod
+    def _read_varint(data, pos):
+        value = 0
+        shift = 0
+        while True:
+            b = data[pos]
+            pos += 1
+            value |= (b & 0x7F) << shift
+            if b < 0x80:
+                return value, pos
+            shift += 7
+
+    def _encode(self, obj, out):
+        if obj is None:
+            out.append(self.NONE)
+        elif obj is True:
+            out.append(self.TRUE)
+        elif obj is False:
+            out.append(self.FALSE)
+        elif isinstance(obj, int):
+            if 0 <= obj <= 0x7F:
+                out.append(obj)
+            elif -32 <= obj < 0:
+                out.append(obj & 0xFF)
+            else:
+                out.append(self.INT)
+                # zigzag, small negative numbers stay small
+                self._write_varint((obj << 1) if obj >= 0 else ((-obj) << 1) - 1, out)
+        elif isinstance(obj, float):
+            if self.float64:
+                out.append(self.FLOAT64)
+                out.extend(struct.pack('<d', obj))
+            else:
+                out.append(self.FLOAT32)
+                out.extend(struct.pack('<f', obj))
+        elif isinstance(obj, str):
+            self._encode_raw(obj.encode('utf-8'), self.FIX_STR, 31, self.STR, out)
+        elif isinstance(obj, (bytes, bytearray, memoryview)):
+            out.append(self.BYTES)
+            self._write_varint(len(obj), out)
+            out.extend(obj)
+        elif isinstance(obj, (list, tuple)):
+            self._encode_header(len(obj), self.FIX_ARRAY, self.ARRAY, out)
+            for item in obj:
+                self._encode(item, out)
+        elif isinstance(obj, dict):
+            self._encode_header(len(obj), self.FIX_MAP, self.MAP, out)
+            for key, value in obj.items():
+                self._encode(key, out)
+                self._encode(value, out)
+        else:
+            raise TypeError('Type not supported')
+
+    def _encode_header(self, size, fix_type, var_type, out):
+        if size <= 15:
+            out.append(fix_type | size)
+        else:
+            out.append(var_type)
+            self._write_varint(size, out)
+
+    def _encode_raw(self, raw, fix_type, fix_max, var_type, out):
+        if len(raw) <= fix_max:
+            out.append(fix_type | len(raw))
+        else:
+            out.append(var_type)
+            self._write_varint(len(raw), out)
+        out.extend(raw)
+
+    def _decode(self, data, pos):
+        t = data[pos]
+        pos += 1
+        if t < self.FIX_MAP:
+            return t, pos
+        if t >= self.NEG_FIX_INT:
+            return t - 0x100, pos
+        if t < self.FIX_ARRAY:
+            return self._decode_map(data, pos, t & 0x0F)
+        if t < self.FIX_STR:
+            return self._decode_array(data, pos, t & 0x0F)
+        if t < self.NONE:
+            size = t & 0x1F
+            return str(data[pos:pos + size], 'utf-8'), pos + size
+        if t == self.NONE:
+            return None, pos
+        if t == self.FALSE:
+            return False, pos
+        if t == self.TRUE:
+            return True, pos
+        if t == self.INT:
+            value, pos = self._read_varint(data, pos)
+            return (value >> 1) if not value & 1 else -((value + 1) >> 1), pos
+        if t == self.FLOAT32:
+            return struct.unpack('<f', bytes(data[pos:pos + 4]))[0], pos + 4
+        if t == self.FLOAT64:
+            return struct.unpack('<d', bytes(data[pos:pos + 8]))[0], pos + 8
+        if t == self.STR or t == self.BYTES:
+            size, pos = self._read_varint(data, pos)
+            raw = data[pos:pos + size]
+            return (str(raw, 'utf-8') if t == self.STR else bytes(raw)), pos + size
+        if t == self.ARRAY:
+            size, pos = self._read_varint(data, pos)
+            return self._decode_array(data, pos, size)
+        if t == self.MAP:
+            size, pos = self._read_varint(data, pos)
+            return self._decode_map(data, pos, size)
+        raise ValueError('Unknown type')
+
+    def _decode_array(self, data, pos, size):
+        value = []
+        for _ in range(size):
+            item, pos = self._decode(data, pos)
+            value.append(item)
+        return value, pos
+
+    def _decode_map(self, data, pos, size):
+        value = {}
+        for _ in range(size):
+            key, pos = self._decode(data, pos)
+            value[key], pos = self._decode(data, pos)
+        return value, pos
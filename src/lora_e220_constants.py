@@ -1,3 +1,9 @@
+def _describe(table, value):
+    # the strings are in lora_e220_descriptions, loaded by the first description
+    import lora_e220_descriptions
+    return lora_e220_descriptions.describe(getattr(lora_e220_descriptions, table), value)
+
+
 class UARTParity:
     MODE_00_8N1 = 0b00
     MODE_01_8O1 = 0b01
@@ -6,29 +12,14 @@ class UARTParity:
 
     @staticmethod
     def get_description(uart_parity):
-        if uart_parity == UARTParity.MODE_00_8N1:
-            return "8N1 (Default)"
-        elif uart_parity == UARTParity.MODE_01_8O1:
-            return "8O1"
-        elif uart_parity == UARTParity.MODE_10_8E1:
-            return "8E1"
-        elif uart_parity == UARTParity.MODE_11_8N1:
-            return "8N1"
-        else:
-            return "Invalid UART Parity!"
+        return _describe('UART_PARITY', uart_parity)
 
     @staticmethod
     def get_uart_value(uart_parity):
-        if uart_parity == UARTParity.MODE_00_8N1:
-            return None
-        elif uart_parity == UARTParity.MODE_01_8O1:
-            return 0
-        elif uart_parity == UARTParity.MODE_10_8E1:
-            return 1
-        elif uart_parity == UARTParity.MODE_11_8N1:
-            return None
-        else:
-            return ValueError("Invalid UART Parity!")
+        # parity argument of machine.UART: None, 0 (even) or 1 (odd)
+        if uart_parity in (0, 1, 2, 3):
+            return (None, 1, 0, None)[uart_parity]
+        return ValueError("Invalid UART Parity!")
 
 
 class UARTBaudRate:
@@ -43,24 +34,11 @@ class UARTBaudRate:
 
     @staticmethod
     def get_description(uart_baud_rate):
-        if uart_baud_rate == UARTBaudRate.BPS_1200:
-            return "1200bps"
-        elif uart_baud_rate == UARTBaudRate.BPS_2400:
-            return "2400bps"
-        elif uart_baud_rate == UARTBaudRate.BPS_4800:
-            return "4800bps"
-        elif uart_baud_rate == UARTBaudRate.BPS_9600:
-            return "9600bps (default)"
-        elif uart_baud_rate == UARTBaudRate.BPS_19200:
-            return "19200bps"
-        elif uart_baud_rate == UARTBaudRate.BPS_38400:
-            return "38400bps"
-        elif uart_baud_rate == UARTBaudRate.BPS_57600:
-            return "57600bps"
-        elif uart_baud_rate == UARTBaudRate.BPS_115200:
-            return "115200bps"
-        else:
-            return "Invalid UART Baud Rate!"
+        return _describe('UART_BAUD_RATE', uart_baud_rate)
+
+    @staticmethod
+    def get_bps(uart_baud_rate):
+        return (1200, 2400, 4800, 9600, 19200, 38400, 57600, 115200)[uart_baud_rate & 0b111]
 
 
 class AirDataRate:
@@ -75,24 +53,7 @@ class AirDataRate:
 
     @staticmethod
     def get_description(air_data_rate):
-        if air_data_rate == AirDataRate.AIR_DATA_RATE_000_24:
-            return "2.4kbps"
-        elif air_data_rate == AirDataRate.AIR_DATA_RATE_001_24:
-            return "2.4kbps"
-        elif air_data_rate == AirDataRate.AIR_DATA_RATE_010_24:
-            return "2.4kbps (default)"
-        elif air_data_rate == AirDataRate.AIR_DATA_RATE_011_48:
-            return "4.8kbps"
-        elif air_data_rate == AirDataRate.AIR_DATA_RATE_100_96:
-            return "9.6kbps"
-        elif air_data_rate == AirDataRate.AIR_DATA_RATE_101_192:
-            return "19.2kbps"
-        elif air_data_rate == AirDataRate.AIR_DATA_RATE_110_384:
-            return "38.4kbps"
-        elif air_data_rate == AirDataRate.AIR_DATA_RATE_111_625:
-            return "62.5kbps"
-        else:
-            return "Invalid Air Data Rate!"
+        return _describe('AIR_DATA_RATE', air_data_rate)
 
 
 class SubPacketSetting:
@@ -103,16 +64,11 @@ class SubPacketSetting:
 
     @staticmethod
     def get_description(sub_packet_setting):
-        if sub_packet_setting == SubPacketSetting.SPS_200_00:
-            return "200bytes (default)"
-        elif sub_packet_setting == SubPacketSetting.SPS_128_01:
-            return "128bytes"
-        elif sub_packet_setting == SubPacketSetting.SPS_064_10:
-            return "64bytes"
-        elif sub_packet_setting == SubPacketSetting.SPS_032_11:
-            return "32bytes"
-        else:
-            return "Invalid Sub Packet Setting!"
+        return _describe('SUB_PACKET_SETTING', sub_packet_setting)
+
+    @staticmethod
+    def get_size(sub_packet_setting):
+        return (200, 128, 64, 32)[sub_packet_setting & 0b11]
 
 
 class RssiAmbientNoiseEnable:
@@ -121,12 +77,7 @@ class RssiAmbientNoiseEnable:
 
     @staticmethod
     def get_description(rssi_ambient_noise_enabled):
-        if rssi_ambient_noise_enabled == RssiAmbientNoiseEnable.RSSI_AMBIENT_NOISE_ENABLED:
-            return "Enabled"
-        elif rssi_ambient_noise_enabled == RssiAmbientNoiseEnable.RSSI_AMBIENT_NOISE_DISABLED:
-            return "Disabled (default)"
-        else:
-            return "Invalid RSSI Ambient Noise enabled!"
+        return _describe('RSSI_AMBIENT_NOISE', rssi_ambient_noise_enabled)
 
 
 class WorPeriod:
@@ -141,24 +92,7 @@ class WorPeriod:
 
     @staticmethod
     def get_description(wor_period):
-        if wor_period == WorPeriod.WOR_500_000:
-            return "500ms"
-        elif wor_period == WorPeriod.WOR_1000_001:
-            return "1000ms"
-        elif wor_period == WorPeriod.WOR_1500_010:
-            return "1500ms"
-        elif wor_period == WorPeriod.WOR_2000_011:
-            return "2000ms (default)"
-        elif wor_period == WorPeriod.WOR_2500_100:
-            return "2500ms"
-        elif wor_period == WorPeriod.WOR_3000_101:
-            return "3000ms"
-        elif wor_period == WorPeriod.WOR_3500_110:
-            return "3500ms"
-        elif wor_period == WorPeriod.WOR_4000_111:
-            return "4000ms"
-        else:
-            return "Invalid WOR period!"
+        return _describe('WOR_PERIOD', wor_period)
 
 
 class LbtEnableByte:
@@ -167,13 +101,7 @@ class LbtEnableByte:
 
     @staticmethod
     def get_description(lbt_enable_byte):
-        if lbt_enable_byte == LbtEnableByte.LBT_ENABLED:
-            return "Enabled"
-        elif lbt_enable_byte == LbtEnableByte.LBT_DISABLED:
-            return "Disabled (default)"
-        else:
-            return "Invalid LBT enable byte!"
-
+        return _describe('LBT_ENABLE', lbt_enable_byte)
 
 
 class RssiEnableByte:
@@ -182,12 +110,7 @@ class RssiEnableByte:
 
     @staticmethod
     def get_description(rssi_enable_byte):
-        if rssi_enable_byte == RssiEnableByte.RSSI_ENABLED:
-            return "Enabled"
-        elif rssi_enable_byte == RssiEnableByte.RSSI_DISABLED:
-            return "Disabled (default)"
-        else:
-            return "Invalid RSSI enable byte!"
+        return _describe('RSSI_ENABLE', rssi_enable_byte)
 
 
 class FixedTransmission:
@@ -196,12 +119,7 @@ class FixedTransmission:
 
     @staticmethod
     def get_description(fixed_transmission):
-        if fixed_transmission == FixedTransmission.TRANSPARENT_TRANSMISSION:
-            return "Transparent transmission (default)"
-        elif fixed_transmission == FixedTransmission.FIXED_TRANSMISSION:
-            return "Fixed transmission (first three bytes can be used as high/low address and channel)"
-        else:
-            return "Invalid fixed transmission param!"
+        return _describe('FIXED_TRANSMISSION', fixed_transmission)
 
 
 class TransmissionPower22:
@@ -212,16 +130,7 @@ class TransmissionPower22:
 
     @staticmethod
     def get_description(transmission_power):
-        if transmission_power == TransmissionPower22.POWER_22:
-            return "22dBm (Default)"
-        elif transmission_power == TransmissionPower22.POWER_17:
-            return "17dBm"
-        elif transmission_power == TransmissionPower22.POWER_13:
-            return "13dBm"
-        elif transmission_power == TransmissionPower22.POWER_10:
-            return "10dBm"
-        else:
-            return "Invalid transmission power param"
+        return _describe('TRANSMISSION_POWER_22', transmission_power)
 
     @staticmethod
     def get_default_value():
@@ -236,16 +145,7 @@ class TransmissionPower30:
 
     @staticmethod
     def get_description(transmission_power):
-        if transmission_power == TransmissionPower30.POWER_30:
-            return "30dBm (Default)"
-        elif transmission_power == TransmissionPower30.POWER_27:
-            return "27dBm"
-        elif transmission_power == TransmissionPower30.POWER_24:
-            return "24dBm"
-        elif transmission_power == TransmissionPower30.POWER_21:
-            return "21dBm"
-        else:
-            return "Invalid transmission power param"
+        return _describe('TRANSMISSION_POWER_30', transmission_power)
 
     @staticmethod
     def get_default_value():
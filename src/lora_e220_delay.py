@@ -0,0 +1,73 @@
+#############################################################################################
+# EBYTE LoRa E220 Series for MicroPython - delay engine
+#
+# The module needs a lot of "wait at least N ms" (mode switch, settle after AUX, program
+# command). A pure spin loop keeps the CPU at 100% for all that time, so the engine sleeps
+# for the bulk of the wait with the cheapest strategy enabled and spins only for the last
+# few milliseconds, where the sleep granularity could make it late.
+#
+# The time spent with every strategy is accumulated, so you can check where the time goes.
+#############################################################################################
+
+from lora_e220_platform import default_platform
+
+
+class DelayStrategy:
+    BUSY = 0
+    SLEEP = 1
+    LIGHTSLEEP = 2
+    ASYNC = 3
+
+    NAMES = ('busy', 'sleep', 'lightsleep', 'async')
+
+
+class DelayEngine:
+    # sleep: clock.sleep_ms (utime.sleep_ms), lets the RTOS/other threads run, the UART keeps receiving
+    # lightsleep: clock.lightsleep (machine.lightsleep), lowest power but on some ports the UART RX is stopped,
+    #             so it's disabled by default
+    def __init__(self, sleep=True, lightsleep=False, sleep_jitter_ms=2, lightsleep_min_ms=20,
+                 lightsleep_jitter_ms=5, clock=None):
+        self.clock = clock if clock is not None else default_platform().clock
+        self.sleep = sleep
+        self.lightsleep = lightsleep
+        self.sleep_jitter_ms = sleep_jitter_ms
+        self.lightsleep_min_ms = lightsleep_min_ms
+        self.lightsleep_jitter_ms = lightsleep_jitter_ms
+
+        self.count = [0, 0, 0, 0]
+        self.spent_us = [0, 0, 0, 0]
+
+    def delay(self, ms):
+        clock = self.clock
+        start = clock.ticks_us()
+        deadline = clock.ticks_add(start, ms * 1000)
+
+        if self.lightsleep and ms >= self.lightsleep_min_ms:
+            clock.lightsleep(ms - self.lightsleep_jitter_ms)
+            self._account_since(DelayStrategy.LIGHTSLEEP, start)
+        elif self.sleep and ms > self.sleep_jitter_ms:
+            clock.sleep_ms(ms - self.sleep_jitter_ms)
+            self._account_since(DelayStrategy.SLEEP, start)
+
+        # spin the remaining part to hit the deadline
+        busy_start = clock.ticks_us()
+        if clock.ticks_diff(deadline, busy_start) > 0:
+            while clock.ticks_diff(deadline, clock.ticks_us()) > 0:
+                pass
+            self._account_since(DelayStrategy.BUSY, busy_start)
+
+    def _account_since(self, strategy, start):
+        self.account(strategy, self.clock.ticks_diff(self.clock.ticks_us(), start))
+
+    def account(self, strategy, us):
+        self.count[strategy] += 1
+        self.spent_us[strategy] += us
+
+    def stats(self):
+        return {DelayStrategy.NAMES[i]: {'count': self.count[i], 'ms': self.spent_us[i] // 1000}
+                for i in range(len(DelayStrategy.NAMES))}
+
+    def reset_stats(self):
+        for i in range(len(self.count)):
+            self.count[i] = 0
+            self.spent_us[i] = 0
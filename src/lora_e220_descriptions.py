@@ -0,0 +1,54 @@
+#############################################################################################
+# EBYTE LoRa E220 Series for MicroPython - descriptions
+#
+# Human readable descriptions of the constants, indexed by the constant value. This module
+# is imported only by the first get_description call, a node that never prints its
+# configuration doesn't load these strings.
+#
+# Every table is (descriptions, invalid value description).
+#############################################################################################
+
+UART_PARITY = (("8N1 (Default)", "8O1", "8E1", "8N1"), "Invalid UART Parity!")
+
+UART_BAUD_RATE = (("1200bps", "2400bps", "4800bps", "9600bps (default)", "19200bps", "38400bps", "57600bps",
+                   "115200bps"), "Invalid UART Baud Rate!")
+
+AIR_DATA_RATE = (("2.4kbps", "2.4kbps", "2.4kbps (default)", "4.8kbps", "9.6kbps", "19.2kbps", "38.4kbps",
+                  "62.5kbps"), "Invalid Air Data Rate!")
+
+SUB_PACKET_SETTING = (("200bytes (default)", "128bytes", "64bytes", "32bytes"), "Invalid Sub Packet Setting!")
+
+RSSI_AMBIENT_NOISE = (("Disabled (default)", "Enabled"), "Invalid RSSI Ambient Noise enabled!")
+
+WOR_PERIOD = (("500ms", "1000ms", "1500ms", "2000ms (default)", "2500ms", "3000ms", "3500ms", "4000ms"),
+              "Invalid WOR period!")
+
+LBT_ENABLE = (("Disabled (default)", "Enabled"), "Invalid LBT enable byte!")
+
+RSSI_ENABLE = (("Disabled (default)", "Enabled"), "Invalid RSSI enable byte!")
+
+FIXED_TRANSMISSION = (("Transparent transmission (default)",
+                       "Fixed transmission (first three bytes can be used as high/low address and channel)"),
+                      "Invalid fixed transmission param!")
+
+TRANSMISSION_POWER_22 = (("22dBm (Default)", "17dBm", "13dBm", "10dBm"), "Invalid transmission power param")
+
+TRANSMISSION_POWER_30 = (("30dBm (Default)", "27dBm", "24dBm", "21dBm"), "Invalid transmission power param")
+
+# ResponseStatusCode starts from 1
+RESPONSE_STATUS = (("Success", "Unknown", "Not support!", "Not implement", "Not initial!", "Invalid param!",
+                    "Data size not match!", "Buff too small!", "Timeout!!", "Hardware error!",
+                    "Save mode returned not recognized!", "No response from device! (Check wiring)",
+                    "Wrong UART configuration! (BPS must be 9600 for configuration)",
+                    "The device support only 200byte of data transmission!", "JSON parse error!",
+                    "Deinit UART failed!", "Wrong format!"), "Invalid status!")
+
+
+def describe(table, value, first=0):
+    descriptions, invalid = table
+    if not isinstance(value, int):
+        return invalid
+    value -= first
+    if 0 <= value < len(descriptions):
+        return descriptions[value]
+    return invalid
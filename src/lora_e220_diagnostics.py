@@ -0,0 +1,79 @@
+#############################################################################################
+# EBYTE LoRa E220 Series for MicroPython - diagnostics
+#
+# Pretty printing of the configuration and the module information, imported only when
+# used: a node that only sends and receives doesn't load this code.
+#############################################################################################
+
+
+def print_configuration(configuration):
+    print("----------------------------------------")
+    print("HEAD : ", hex(configuration._COMMAND), " ", hex(configuration._STARTING_ADDRESS), " ",
+          hex(configuration._LENGTH))
+    print("")
+    print("AddH : ", hex(configuration.ADDH))
+    print("AddL : ", hex(configuration.ADDL))
+    print("")
+    print("Chan : ", str(configuration.CHAN), " -> ", configuration.get_frequency())
+    print("")
+    print("SpeedParityBit : ", bin(configuration.SPED.uartParity), " -> ",
+          configuration.SPED.get_UART_parity_description())
+    print("SpeedUARTDatte : ", bin(configuration.SPED.uartBaudRate), " -> ", configuration.SPED.get_UART_baud_rate())
+    print("SpeedAirDataRate : ", bin(configuration.SPED.airDataRate), " -> ", configuration.SPED.get_air_data_rate())
+    print("")
+    print("OptionSubPacketSett: ", bin(configuration.OPTION.subPacketSetting), " -> ",
+          configuration.OPTION.get_sub_packet_setting())
+    print("OptionTranPower : ", bin(configuration.OPTION.transmissionPower), " -> ",
+          configuration.OPTION.get_transmission_power_description())
+    print("OptionRSSIAmbientNo: ", bin(configuration.OPTION.RSSIAmbientNoise), " -> ",
+          configuration.OPTION.get_RSSI_ambient_noise_enable())
+    print("")
+    print("TransModeWORPeriod : ", bin(configuration.TRANSMISSION_MODE.WORPeriod), " -> ",
+          configuration.TRANSMISSION_MODE.get_WOR_period_description())
+    print("TransModeEnableLBT : ", bin(configuration.TRANSMISSION_MODE.enableLBT), " -> ",
+          configuration.TRANSMISSION_MODE.get_LBT_enable_byte_description())
+    print("TransModeEnableRSSI: ", bin(configuration.TRANSMISSION_MODE.enableRSSI), " -> ",
+          configuration.TRANSMISSION_MODE.get_RSSI_enable_byte_description())
+    print("TransModeFixedTrans: ", bin(configuration.TRANSMISSION_MODE.fixedTransmission), " -> ",
+          configuration.TRANSMISSION_MODE.get_fixed_transmission_description())
+    print("----------------------------------------")
+
+
+class ModuleInformation:
+    def __init__(self):
+        self._COMMAND = 0
+        self._STARTING_ADDRESS = 0
+        self._LENGTH = 0
+        self.model = 0
+        self.version = 0
+        self.features = 0
+
+    def to_hex_array(self):
+        hex_array = bytearray()
+        hex_array.append(self._COMMAND)
+        hex_array.append(self._STARTING_ADDRESS)
+        hex_array.append(self._LENGTH)
+        hex_array.append(self.model)
+        hex_array.append(self.version)
+        hex_array.append(self.features)
+        return hex_array
+
+    def from_hex_array(self, hex_array):
+        self._COMMAND = hex_array[0]
+        self._STARTING_ADDRESS = hex_array[1]
+        self._LENGTH = hex_array[2]
+        self.model = hex_array[3]
+        self.version = hex_array[4]
+        self.features = hex_array[5]
+
+    def to_hex_string(self):
+        return ''.join(['{:02X}'.format(x) for x in self.to_hex_array()])
+
+    def to_bytes(self):
+        return bytes(self.to_hex_array())
+
+    def from_hex_string(self, hex_string):
+        self.from_hex_array([int(hex_string[i:i + 2], 16) for i in range(0, len(hex_string), 2)])
+
+    def from_bytes(self, bytes):
+        self.from_hex_array([x for x in bytes])
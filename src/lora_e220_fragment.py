@@ -0,0 +1,141 @@
+#############################################################################################
+# EBYTE LoRa E220 Series for MicroPython - fragmentation
+#
+# Messages bigger than the sub packet size of the module are split in fragments, every one
+# with a 5 byte header:
+#
+#   0xFA | message id | fragment index | fragment count | chunk length
+#
+# 0xFA can't be the first byte of an UTF-8 string (or of a JSON), so the receiver can tell
+# a fragment from a normal message. A binary message that starts with 0xFA is sent after
+# the 2 byte escape 0xFA 0x00 (message id 0 is never used by the fragments), the receiver
+# strips it. The fragments are sent in order on the UART link, so
+# the receiver rebuilds the message in a preallocated buffer appending the fragments,
+# an out of order or stale fragment discards the partial message.
+#
+# The fragments arrive back to back: if the receiver doesn't poll while they arrive (it is
+# sending, or doing something else) they are in the UART together and the gap between them
+# is lost. The chunk length splits them again (fragment_length).
+#############################################################################################
+
+from lora_e220_operation_constant import ResponseStatusCode
+
+from lora_e220_platform import default_platform
+
+FRAGMENT_MARKER = 0xFA
+FRAGMENT_HEADER_SIZE = 5
+MAX_FRAGMENTS = 255
+ESCAPE = bytes((FRAGMENT_MARKER, 0x00))
+
+
+def is_fragment(data) -> bool:
+    return data is not None and len(data) >= FRAGMENT_HEADER_SIZE and data[0] == FRAGMENT_MARKER \
+        and data[1] != 0 and data[2] < data[3]
+
+
+def escape(message):
+    # a message not fragmented that starts with the marker
+    if len(message) > 0 and message[0] == FRAGMENT_MARKER:
+        return ESCAPE + message
+    return message
+
+
+def is_escaped(data) -> bool:
+    return data is not None and len(data) >= 2 and data[0] == FRAGMENT_MARKER and data[1] == 0
+
+
+def fragment_length(frame, trailer=0) -> int:
+    # bytes of the first packet of frame: the first fragment (with its trailer, the RSSI byte) if frame
+    # starts with a fragment, more than len(frame) if it is cut, else all the frame (the length of a
+    # normal message is unknown)
+    if not is_fragment(frame):
+        return len(frame)
+    return FRAGMENT_HEADER_SIZE + frame[FRAGMENT_HEADER_SIZE - 1] + trailer
+
+
+class Fragmenter:
+    def __init__(self):
+        self._message_id = 0
+
+    @staticmethod
+    def fragment_count(size, packet_size) -> int:
+        payload = packet_size - FRAGMENT_HEADER_SIZE
+        return (size + payload - 1) // payload
+
+    def fragments(self, data, packet_size):
+        # generator of the fragments (header + chunk) of data, packet_size is the sub packet size of the module
+        payload = packet_size - FRAGMENT_HEADER_SIZE
+        count = self.fragment_count(len(data), packet_size)
+        if count > MAX_FRAGMENTS:
+            raise ValueError('Message too big')
+
+        # 1..255, 0 is the escape
+        self._message_id = self._message_id % 255 + 1
+        mv = memoryview(data)
+        for index in range(count):
+            chunk = mv[index * payload:(index + 1) * payload]
+            yield bytes((FRAGMENT_MARKER, self._message_id, index, count, len(chunk))) + chunk
+
+
+class Reassembler:
+    def __init__(self, max_size=1024, timeout=5000, clock=None):
+        self.max_size = max_size
+        self.clock = clock if clock is not None else default_platform().clock
+        self.timeout = timeout
+
+        # allocated on the first fragment, nodes that never receive fragments don't pay it
+        self.buf = None
+        self.mv = None
+
+        self.message_id = None
+        self.next_index = 0
+        self.size = 0
+        self.started = 0
+
+    def reset(self):
+        self.message_id = None
+        self.next_index = 0
+        self.size = 0
+
+    def feed(self, fragment) -> (ResponseStatusCode, memoryview):
+        # returns (SUCCESS, None) while the message is incomplete, (SUCCESS, message) when complete
+        if self.buf is None:
+            self.buf = bytearray(self.max_size)
+            self.mv = memoryview(self.buf)
+
+        message_id = fragment[1]
+        index = fragment[2]
+        count = fragment[3]
+
+        if self.message_id is not None and self.clock.ticks_diff(self.clock.ticks_ms(), self.started) > self.timeout:
+            self.reset()
+
+        if index == 0:
+            self.reset()
+            self.message_id = message_id
+            self.started = self.clock.ticks_ms()
+        elif message_id != self.message_id or index != self.next_index:
+            # lost or stale fragment, the message can't be rebuilt
+            self.reset()
+            return ResponseStatusCode.ERR_E220_DATA_SIZE_NOT_MATCH, None
+
+        chunk = len(fragment) - FRAGMENT_HEADER_SIZE
+        if chunk != fragment[FRAGMENT_HEADER_SIZE - 1]:
+            # truncated, or two fragments not split
+            self.reset()
+            return ResponseStatusCode.ERR_E220_DATA_SIZE_NOT_MATCH, None
+
+        if self.size + chunk > self.max_size:
+            self.reset()
+            return ResponseStatusCode.ERR_E220_PACKET_TOO_BIG, None
+
+        self.mv[self.size:self.size + chunk] = fragment[FRAGMENT_HEADER_SIZE:]
+        self.size += chunk
+        self.next_index = index + 1
+
+        if self.next_index < count:
+            return ResponseStatusCode.E220_SUCCESS, None
+
+        size = self.size
+        self.reset()
+        return ResponseStatusCode.E220_SUCCESS, self.mv[:size]
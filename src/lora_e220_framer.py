@@ -0,0 +1,120 @@
+#############################################################################################
+# EBYTE LoRa E220 Series for MicroPython - packet framer
+#
+# The module outputs every received packet on the UART as a continuous burst of bytes, the
+# next packet can't come before its own time on air, so an idle line longer than a few
+# character times marks the end of a packet. When the AUX pin is connected it goes HIGH as
+# soon as the module has emptied its buffer, so the frame can be closed without waiting the
+# whole gap.
+#
+# The framer reads into the shared RingBuffer and keeps only the length of the complete
+# frames (a small preallocated queue), every frame keeps its own RSSI byte. The packets that
+# arrive while nobody polls are read together in one frame, a reader that knows their
+# length (the fragments) takes them one at a time with peek_frame and consume_frame.
+#############################################################################################
+
+from lora_e220_platform import default_platform
+
+
+class PacketFramer:
+    # 1 start bit + 8 data bits + parity + 1 stop bit
+    BITS_PER_CHAR = 11
+
+    def __init__(self, rx, baudrate, aux=None, gap_chars=4, min_gap_us=3000, max_frames=16, clock=None):
+        self.rx = rx
+        self.clock = clock if clock is not None else default_platform().clock
+        self.aux = aux
+        self.char_us = self.BITS_PER_CHAR * 1000000 // baudrate
+        self.gap_us = max(gap_chars * self.char_us, min_gap_us)
+
+        self._frames = [0] * max_frames
+        self._first = 0
+        self._count = 0
+        self._framed = 0
+        self._last_byte_us = 0
+        # the only frame was closed by the full buffer, not by the gap
+        self._cut = False
+
+    def reset(self):
+        self._first = 0
+        self._count = 0
+        self._framed = 0
+        self._cut = False
+
+    def frames(self) -> int:
+        return self._count
+
+    def _open_length(self) -> int:
+        return len(self.rx) - self._framed
+
+    def _close_frame(self):
+        size = self._open_length()
+        if self._count == len(self._frames):
+            # queue full, keep the bytes in the open frame until a slot is free
+            return False
+        self._frames[(self._first + self._count) % len(self._frames)] = size
+        self._count += 1
+        self._framed += size
+        return True
+
+    def poll(self, uart) -> int:
+        # read the bytes already in the UART and close the current frame if the line is idle
+        now = self.clock.ticks_us()
+        if self.rx.fill(uart) > 0:
+            self._last_byte_us = now
+            while self.rx.free() > 0 and self.rx.fill(uart) > 0:
+                pass
+        elif self._open_length() > 0:
+            idle = self.clock.ticks_diff(now, self._last_byte_us)
+            if idle >= self.gap_us or (self.aux is not None and self.aux.value() == 1 and idle >= 2 * self.char_us):
+                self._close_frame()
+
+        if self.rx.free() == 0 and self._framed == 0:
+            # a frame bigger than the buffer, give it out as is
+            self._cut = self._close_frame()
+        return self._count
+
+    def receiving(self) -> bool:
+        # bytes of a frame not closed yet
+        return self._open_length() > 0
+
+    def frame(self):
+        # the first complete frame (a view on the buffer, not consumed), None if there isn't one
+        if self._count == 0:
+            return None
+        return self.rx.peek(self._frames[self._first])
+
+    def consume_frame(self, size=None):
+        # drop the first size bytes (all by default) of the first frame, the rest stays the first frame
+        frame = self._frames[self._first]
+        size = frame if size is None else min(size, frame)
+        if size == frame:
+            self._first = (self._first + 1) % len(self._frames)
+            self._count -= 1
+            self._cut = False
+        else:
+            self._frames[self._first] = frame - size
+        self._framed -= size
+        self.rx.consume(size)
+
+    def reopen(self) -> bool:
+        # the frame closed by the full buffer goes on with the bytes after it (a reader found it incomplete)
+        if not self._cut:
+            return False
+        self.reset()
+        return True
+
+    def peek_frame(self, uart, timeout=1000):
+        # wait timeout ms for the first byte, then until the end of the frame
+        clock = self.clock
+        start = clock.ticks_ms()
+        while self.poll(uart) == 0:
+            if not self.receiving() and clock.ticks_diff(clock.ticks_ms(), start) > timeout:
+                return None
+        return self.frame()
+
+    def read_frame(self, uart, timeout=1000):
+        data = self.peek_frame(uart, timeout)
+        if data is not None:
+            self.consume_frame()
+        return data
@@ -0,0 +1,118 @@
+#############################################################################################
+# EBYTE LoRa E220 Series for MicroPython - logging
+#
+# Minimal logger with levels: the message is formatted (msg % args) only when the level is
+# enabled, a disabled call costs a single comparison. The loggers returned by getLogger share
+# level and sink with the root logger that created them.
+#
+# By default the records are printed, a RingBufferSink keeps the last records in RAM to read
+# them from a deployed node without a serial console.
+#############################################################################################
+
+from lora_e220_platform import default_platform
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+NONE = 100
+
+LEVEL_NAMES = {DEBUG: 'DEBUG', INFO: 'INFO', WARNING: 'WARNING', ERROR: 'ERROR'}
+
+
+class RingBufferSink:
+    def __init__(self, size=32):
+        self._records = [None] * size
+        self._next = 0
+        # records written since the start (or the last clear), the oldest are overwritten
+        self.count = 0
+
+    def write(self, ticks, level, name, text):
+        self._records[self._next] = (ticks, level, name, text)
+        self._next = (self._next + 1) % len(self._records)
+        self.count += 1
+
+    def records(self) -> list:
+        # (ticks_ms, level, name, text) from the oldest to the newest
+        if self.count < len(self._records):
+            return self._records[:self.count]
+        return self._records[self._next:] + self._records[:self._next]
+
+    def clear(self):
+        for i in range(len(self._records)):
+            self._records[i] = None
+        self._next = 0
+        self.count = 0
+
+    def dump(self):
+        for ticks, level, name, text in self.records():
+            print(ticks, name, LEVEL_NAMES[level], text)
+
+
+class Logger:
+    def __init__(self, enable_debug=False, name='', level=None, sink=None, clock=None):
+        self.name = name
+        self.level = level if level is not None else (DEBUG if enable_debug else NONE)
+        self.sink = sink
+        # ticks of the sink records, None is the clock of the default platform
+        self.clock = clock
+        self._loggers = {}
+
+    def getLogger(self, name):
+        logger = self._loggers.get(name)
+        if logger is None:
+            logger = Logger(name=name, level=self.level, sink=self.sink, clock=self.clock)
+            self._loggers[name] = logger
+        return logger
+
+    def setLevel(self, level):
+        self.level = level
+        for logger in self._loggers.values():
+            logger.setLevel(level)
+
+    def setSink(self, sink):
+        # None prints the records
+        self.sink = sink
+        for logger in self._loggers.values():
+            logger.setSink(sink)
+
+    def setClock(self, clock):
+        self.clock = clock
+        for logger in self._loggers.values():
+            logger.setClock(clock)
+
+    def isEnabledFor(self, level) -> bool:
+        return self.level <= level
+
+    @property
+    def enable_debug(self):
+        return self.level <= DEBUG
+
+    @enable_debug.setter
+    def enable_debug(self, enable_debug):
+        self.setLevel(DEBUG if enable_debug else NONE)
+
+    def debug(self, msg, *args):
+        if self.level <= DEBUG:
+            self._log(DEBUG, msg, args)
+
+    def info(self, msg, *args):
+        if self.level <= INFO:
+            self._log(INFO, msg, args)
+
+    def warning(self, msg, *args):
+        if self.level <= WARNING:
+            self._log(WARNING, msg, args)
+
+    def error(self, msg, *args):
+        if self.level <= ERROR:
+            self._log(ERROR, msg, args)
+
+    def _log(self, level, msg, args):
+        if args:
+            msg = msg % args
+        if self.sink is None:
+            print(self.name, LEVEL_NAMES[level], msg)
+        else:
+            clock = self.clock if self.clock is not None else default_platform().clock
+            self.sink.write(clock.ticks_ms(), level, self.name, msg)
@@ -0,0 +1,99 @@
+#############################################################################################
+# EBYTE LoRa E220 Series for MicroPython - metrics
+#
+# Counters and histograms of the driver, kept in arrays allocated once: recording an event
+# only increments integers, so the metrics can stay enabled on a deployed node.
+#
+# The histograms have fixed buckets, every bound is the upper limit (included) of its bucket
+# and the last bucket counts the values bigger than the last bound.
+#############################################################################################
+
+from array import array
+
+from lora_e220_operation_constant import ResponseStatusCode
+
+AUX_WAIT_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000)
+MODE_SWITCH_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+RSSI_BUCKETS_DBM = (-120, -110, -100, -90, -80, -70, -60, -50)
+
+BYTES_SENT = 0
+PACKETS_SENT = 1
+BYTES_RECEIVED = 2
+PACKETS_RECEIVED = 3
+COUNTER_NAMES = ('bytes_sent', 'packets_sent', 'bytes_received', 'packets_received')
+
+# ResponseStatusCode values, the error count is indexed by code
+STATUS_CODES = ResponseStatusCode.ERR_E220_WRONG_FORMAT + 1
+
+
+class Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = array('L', [0] * (len(bounds) + 1))
+
+    def add(self, value):
+        # while loop: no iterator allocated
+        bounds = self.bounds
+        i = 0
+        n = len(bounds)
+        while i < n and value > bounds[i]:
+            i += 1
+        self.counts[i] += 1
+
+    def reset(self):
+        for i in range(len(self.counts)):
+            self.counts[i] = 0
+
+    def snapshot(self) -> dict:
+        return {'buckets': self.bounds, 'counts': list(self.counts)}
+
+
+class Metrics:
+    def __init__(self):
+        self.counters = array('L', [0] * len(COUNTER_NAMES))
+        self.errors = array('L', [0] * STATUS_CODES)
+        self.aux_wait = Histogram(AUX_WAIT_BUCKETS_MS)
+        self.mode_switch = Histogram(MODE_SWITCH_BUCKETS_MS)
+        self.rssi = Histogram(RSSI_BUCKETS_DBM)
+
+    def sent(self, size):
+        self.counters[BYTES_SENT] += size
+        self.counters[PACKETS_SENT] += 1
+
+    def received(self, size):
+        self.counters[BYTES_RECEIVED] += size
+        self.counters[PACKETS_RECEIVED] += 1
+
+    def error(self, code):
+        if code != ResponseStatusCode.E220_SUCCESS and 0 <= code < STATUS_CODES:
+            self.errors[code] += 1
+
+    def aux_waited(self, us):
+        self.aux_wait.add(us // 1000)
+
+    def mode_switched(self, us):
+        self.mode_switch.add(us // 1000)
+
+    def rssi_received(self, rssi):
+        # the module appends the RSSI byte, dBm = -(256 - value)
+        self.rssi.add(rssi - 256)
+
+    def reset(self):
+        for i in range(len(self.counters)):
+            self.counters[i] = 0
+        for i in range(len(self.errors)):
+            self.errors[i] = 0
+        self.aux_wait.reset()
+        self.mode_switch.reset()
+        self.rssi.reset()
+
+    def snapshot(self) -> dict:
+        # a copy of the values (allocates, to call from the export code not from the radio path)
+        snapshot = {}
+        for i in range(len(COUNTER_NAMES)):
+            snapshot[COUNTER_NAMES[i]] = self.counters[i]
+        snapshot['errors'] = {code: self.errors[code] for code in range(STATUS_CODES) if self.errors[code] > 0}
+        snapshot['aux_wait_ms'] = self.aux_wait.snapshot()
+        snapshot['mode_switch_ms'] = self.mode_switch.snapshot()
+        snapshot['rssi_dbm'] = self.rssi.snapshot()
+        return snapshot
@@ -0,0 +1,358 @@
+#############################################################################################
+# EBYTE LoRa E220 Series for MicroPython - network simulator
+#
+# Discrete event simulation of many nodes, every one a LoRaE220 driver on a SimulatedE220
+# with its own VirtualClock, on a shared radio channel (the Network is the Air of the
+# modules). The events (sends of the traffic, reads of the received packets) run in time
+# order, a node runs its driver call to the end at once and its clock stays ahead of the
+# network while it's busy, so the next events of the node wait for it like on a real
+# microcontroller.
+#
+#   network = Network(seed=1)
+#   gateway = network.add_node(0x0000, 0, 0)
+#   for i in range(300):
+#       node = network.add_node(i + 1, x, y)
+#       network.periodic(node, 60000, 20, target=0x0000)
+#   network.run(3600000)
+#   print(network.report())
+#
+# Radio model:
+#   - time on air from the air data rate (lora_e220_airtime), sub packet by sub packet
+#   - log distance path loss from 1m (free space at the module frequency), optional log-normal
+#     shadowing drawn once per pair of nodes
+#   - a packet is lost under the sensitivity of its air data rate, when the receiver is
+#     transmitting (half duplex) and when a packet on the same CHAN overlaps it without being
+#     capture_db weaker at the receiver (capture effect)
+#   - addressing of the modules: fixed (with BROADCAST_ADDRESS) or transparent, 0xFFFF listens all
+# The payload of the traffic starts with the message id in hex, the report gives delivery
+# ratio (over the modules that listen the message), latency (send call to read of the
+# receiver) and channel utilisation (time with at least a packet on air). The nodes added with
+# listen=False (sensors that only send) count the packets they receive without reading them,
+# a broadcast heard by thousands of nodes doesn't run thousands of driver reads.
+#############################################################################################
+
+import heapq
+import math
+import random
+
+from lora_e220 import LoRaE220, BROADCAST_ADDRESS
+from lora_e220_airtime import AIR_DATA_RATE_PARAMETERS
+from lora_e220_constants import AirDataRate, FixedTransmission, RssiEnableByte
+from lora_e220_operation_constant import ResponseStatusCode
+from lora_e220_platform import VirtualClock
+from lora_e220_simulator import Air, SimulatedE220
+
+BROADCAST = (BROADCAST_ADDRESS << 8) | BROADCAST_ADDRESS
+
+# dBm of the OPTION transmissionPower values by power of the model
+TRANSMISSION_POWER_DBM = {22: (22, 17, 13, 10), 30: (30, 27, 24, 21)}
+# SNR needed to demodulate by spreading factor (LLCC68 datasheet)
+SNR_LIMIT_DB = {5: -2.5, 6: -5, 7: -7.5, 8: -10, 9: -12.5, 10: -15, 11: -17.5, 12: -20}
+NOISE_FIGURE_DB = 6
+
+MESSAGE_ID_SIZE = 8
+
+
+def sensitivity(air_data_rate) -> float:
+    # dBm, thermal noise of the bandwidth + noise figure + SNR limit of the spreading factor
+    sf, bw = AIR_DATA_RATE_PARAMETERS[air_data_rate]
+    return -174 + 10 * math.log10(bw) + NOISE_FIGURE_DB + SNR_LIMIT_DB[sf]
+
+
+def percentile(values, fraction):
+    # values sorted
+    if not values:
+        return None
+    return values[min(int(fraction * len(values)), len(values) - 1)]
+
+
+class Node:
+    def __init__(self, network, address, x, y, model, listen):
+        self.address = address
+        self.listen = listen
+        self.x = x
+        self.y = y
+        self.clock = VirtualClock(network.now_us, network.step_us)
+        self.module = SimulatedE220(model, network, clock=self.clock)
+        self.lora = LoRaE220(model, self.module.uart, aux_pin=self.module.aux, m0_pin=self.module.m0,
+                             m1_pin=self.module.m1, aux_irq=True, clock=self.clock)
+        self.sent = 0
+        self.received = 0
+        self.send_errors = 0
+
+
+class Transmission:
+    __slots__ = ('sender', 'chan', 'address', 'payload', 'start', 'end', 'power')
+
+    def __init__(self, sender, chan, address, payload, start, end, power):
+        self.sender = sender
+        self.chan = chan
+        self.address = address
+        self.payload = payload
+        self.start = start
+        self.end = end
+        self.power = power
+
+
+class Network(Air):
+    def __init__(self, seed=0, path_loss_exponent=3.0, shadowing_db=0, capture_db=6, step_us=100):
+        super().__init__()
+        self.random = random.Random(seed)
+        self.path_loss_exponent = path_loss_exponent
+        self.shadowing_db = shadowing_db
+        # (node, node) -> shadowing dB of the link, drawn once (the obstacles between two nodes don't move)
+        self._shadowing = {}
+        self.capture_db = capture_db
+        # simulated time of a tick read (a polling loop iteration) of the nodes
+        self.step_us = step_us
+
+        self.now_us = 0
+        self._events = []
+        self._sequence = 0
+        self.events = 0
+
+        self.nodes = []
+        self._node_of = {}
+        # CHAN -> modules listening on it
+        self._listeners = {}
+        self._chan_of = {}
+        # CHAN -> transmissions that can still overlap a packet not resolved yet
+        self._active = {}
+        self._last_transmission = {}
+        self._max_airtime_us = 0
+
+        # message id -> send time us
+        self._messages = {}
+        self._next_message_id = 0
+        self.latencies_us = []
+        self.lost = {'sensitivity': 0, 'collision': 0, 'half_duplex': 0}
+        self.expected = 0
+        self.delivered = 0
+        self.delivered_to_readers = 0
+        # CHAN -> [time on air us, time with at least a packet us, end of the last packet]
+        self._airtime = {}
+
+    # nodes and traffic
+
+    def add_node(self, address, x=0.0, y=0.0, chan=23, air_data_rate=AirDataRate.AIR_DATA_RATE_010_24,
+                 fixed=True, model='400T22D', listen=True) -> Node:
+        node = Node(self, address, x, y, model, listen)
+        self._node_of[node.module] = node
+        configuration = node.module.configuration
+        configuration.ADDH = address >> 8
+        configuration.ADDL = address & 0xFF
+        configuration.CHAN = chan
+        configuration.SPED.airDataRate = air_data_rate
+        configuration.TRANSMISSION_MODE.fixedTransmission = FixedTransmission.FIXED_TRANSMISSION if fixed \
+            else FixedTransmission.TRANSPARENT_TRANSMISSION
+        configuration.TRANSMISSION_MODE.enableRSSI = RssiEnableByte.RSSI_ENABLED
+        node.module.save()
+        code = node.lora.begin()
+        if code != ResponseStatusCode.E220_SUCCESS:
+            raise RuntimeError('Node {} begin: {}'.format(address, code))
+        self.nodes.append(node)
+        return node
+
+    def at(self, ms, callback, *args):
+        # callback(*args) at ms of simulated time
+        self._schedule(int(ms * 1000), callback, args)
+
+    def periodic(self, node, interval_ms, size, target=None, chan=None, jitter_ms=None, start_ms=None):
+        # a message of size bytes every interval_ms (+ random jitter, default 10%) to target (None broadcast)
+        interval_us = int(interval_ms * 1000)
+        jitter_us = int((interval_ms / 10 if jitter_ms is None else jitter_ms) * 1000)
+        start_us = self.now_us + (self.random.randrange(interval_us) if start_ms is None else int(start_ms * 1000))
+        self._schedule(start_us, self._periodic_send, (node, interval_us, jitter_us, size, target, chan))
+
+    def send(self, node, size, target=None, chan=None) -> ResponseStatusCode:
+        # send now a traced message of size bytes from node (call it from an event)
+        message_id = self._next_message_id
+        self._next_message_id += 1
+        self._messages[message_id] = self.now_us
+        message = '{:08x}'.format(message_id) + 'x' * max(size - MESSAGE_ID_SIZE, 0)
+
+        self._node_time(node)
+        chan = node.module.configuration.CHAN if chan is None else chan
+        lora = node.lora
+        if node.module.configuration.TRANSMISSION_MODE.fixedTransmission != FixedTransmission.FIXED_TRANSMISSION:
+            code = lora.send_transparent_message(message)
+        elif target is None or target == BROADCAST:
+            code = lora.send_broadcast_message(chan, message)
+        else:
+            code = lora.send_fixed_message(target >> 8, target & 0xFF, chan, message)
+
+        if code == ResponseStatusCode.E220_SUCCESS:
+            node.sent += 1
+        else:
+            node.send_errors += 1
+        return code
+
+    def _periodic_send(self, node, interval_us, jitter_us, size, target, chan):
+        self.send(node, size, target, chan)
+        next_us = self.now_us + interval_us + (self.random.randrange(-jitter_us, jitter_us + 1) if jitter_us else 0)
+        self._schedule(next_us, self._periodic_send, (node, interval_us, jitter_us, size, target, chan))
+
+    # event loop
+
+    def _schedule(self, time_us, callback, args):
+        self._sequence += 1
+        heapq.heappush(self._events, (time_us, self._sequence, callback, args))
+
+    def _node_time(self, node):
+        # the node starts the event when it's free
+        if node.clock.now_us < self.now_us:
+            node.clock.now_us = self.now_us
+
+    def run(self, duration_ms):
+        end = self.now_us + int(duration_ms * 1000)
+        events = self._events
+        while events and events[0][0] <= end:
+            time_us, sequence, callback, args = heapq.heappop(events)
+            self.now_us = time_us
+            callback(*args)
+            self.events += 1
+        self.now_us = end
+
+    # radio
+
+    def attach(self, module):
+        super().attach(module)
+        self.configuration_changed(module)
+
+    def configuration_changed(self, module):
+        chan = module.configuration.CHAN
+        old = self._chan_of.get(module)
+        if old == chan:
+            return
+        if old is not None:
+            self._listeners[old].remove(module)
+        self._listeners.setdefault(chan, []).append(module)
+        self._chan_of[module] = chan
+
+    def tx_power(self, module) -> float:
+        configuration = module.configuration
+        return TRANSMISSION_POWER_DBM[configuration.transmission_power][configuration.OPTION.transmissionPower]
+
+    def path_loss(self, sender, receiver) -> float:
+        # dB, log distance from 1m with the free space loss at 1m
+        a = self._node_of[sender]
+        b = self._node_of[receiver]
+        distance = max(math.sqrt((a.x - b.x) ** 2 + (a.y - b.y) ** 2), 1.0)
+        frequency = sender.configuration.get_frequency()
+        loss = 20 * math.log10(frequency) - 27.55 + 10 * self.path_loss_exponent * math.log10(distance)
+        if self.shadowing_db:
+            link = (a, b) if id(a) < id(b) else (b, a)
+            shadowing = self._shadowing.get(link)
+            if shadowing is None:
+                shadowing = self._shadowing[link] = self.random.gauss(0, self.shadowing_db)
+            loss += shadowing
+        return loss
+
+    def transmit(self, sender, chan, address, packets):
+        self.transmissions += 1
+        power = self.tx_power(sender)
+        configuration = sender.configuration
+        for payload, end in packets:
+            airtime = int(configuration.get_time_on_air(len(payload)) * 1000)
+            transmission = Transmission(sender, chan, address, payload, end - airtime, end, power)
+            self._active.setdefault(chan, []).append(transmission)
+            self._last_transmission[sender] = transmission
+            if airtime > self._max_airtime_us:
+                self._max_airtime_us = airtime
+            self._account_airtime(chan, transmission.start, end)
+            self._schedule(end, self._resolve, (transmission,))
+
+    def _account_airtime(self, chan, start, end):
+        airtime = self._airtime.get(chan)
+        if airtime is None:
+            airtime = self._airtime[chan] = [0, 0, 0]
+        airtime[0] += end - start
+        airtime[1] += max(0, end - max(start, airtime[2]))
+        airtime[2] = max(airtime[2], end)
+
+    def _resolve(self, transmission):
+        # end of a packet: every overlapping packet has been sent by now
+        active = self._active[transmission.chan]
+        horizon = self.now_us - self._max_airtime_us
+        active[:] = [other for other in active if other.end > horizon]
+        overlapping = [other for other in active if other is not transmission and
+                       other.start < transmission.end and other.end > transmission.start]
+
+        sender = transmission.sender
+        for module in self._listeners.get(transmission.chan, ()):
+            if module is sender or not module.receives(sender, transmission.chan, transmission.address):
+                continue
+            self.expected += 1
+            rx_power = transmission.power - self.path_loss(sender, module)
+            if rx_power < sensitivity(module.configuration.SPED.airDataRate):
+                self.lost['sensitivity'] += 1
+                continue
+            own = self._last_transmission.get(module)
+            if own is not None and own.start < transmission.end and own.end > transmission.start:
+                self.lost['half_duplex'] += 1
+                continue
+            if self._collides(transmission, overlapping, module, rx_power):
+                self.lost['collision'] += 1
+                continue
+
+            self.delivered += 1
+            node = self._node_of[module]
+            if node.listen:
+                self.delivered_to_readers += 1
+                module.deliver(transmission.payload, transmission.end, min(max(256 + int(rx_power), 0), 255))
+                # read when the module has output the packet (and its RSSI byte) on the UART
+                output_us = int(module.configuration.get_uart_time(len(transmission.payload) + 1) * 1000)
+                self._schedule(transmission.end + output_us, self._read, (node,))
+            else:
+                node.received += 1
+
+    def _collides(self, transmission, overlapping, receiver, rx_power) -> bool:
+        for other in overlapping:
+            if other.sender is receiver:
+                continue
+            if other.power - self.path_loss(other.sender, receiver) > rx_power - self.capture_db:
+                return True
+        return False
+
+    def _read(self, node):
+        self._node_time(node)
+        lora = node.lora
+        while lora.available() > 0:
+            code, message, rssi = lora.receive_message(rssi=True)
+            if code != ResponseStatusCode.E220_SUCCESS or message is None:
+                break
+            node.received += 1
+            sent_us = self._messages.get(int(message[:MESSAGE_ID_SIZE], 16)) \
+                if len(message) >= MESSAGE_ID_SIZE else None
+            if sent_us is not None:
+                self.latencies_us.append(node.clock.now_us - sent_us)
+
+    # results
+
+    def report(self) -> dict:
+        latencies = sorted(self.latencies_us)
+        read = len(latencies)
+        duration = self.now_us if self.now_us > 0 else 1
+        return {
+            'duration_ms': self.now_us // 1000,
+            'nodes': len(self.nodes),
+            'events': self.events,
+            'messages': len(self._messages),
+            'send_errors': sum(node.send_errors for node in self.nodes),
+            'expected': self.expected,
+            'delivered': self.delivered,
+            'delivery_ratio': self.delivered / self.expected if self.expected else None,
+            'lost': dict(self.lost),
+            'read': read,
+            # delivered to a listening node but not read: dropped by the driver (UART buffer cleaned by a send)
+            'not_read': self.delivered_to_readers - read,
+            'latency_ms': {
+                'p50': percentile(latencies, 0.5) / 1000 if latencies else None,
+                'p90': percentile(latencies, 0.9) / 1000 if latencies else None,
+                'p99': percentile(latencies, 0.99) / 1000 if latencies else None,
+                'mean': sum(latencies) / read / 1000 if latencies else None,
+                'max': latencies[-1] / 1000 if latencies else None,
+            },
+            'utilisation': {chan: airtime[1] / duration for chan, airtime in self._airtime.items()},
+            'airtime_ms': {chan: airtime[0] // 1000 for chan, airtime in self._airtime.items()},
+        }
@@ -23,9 +23,9 @@ class ProgramCommand:
 class RegisterAddress:
     REG_ADDRESS_CFG = 0x00
     REG_ADDRESS_SPED = 0x02
-    REG_ADDRESS_TRANS_MODE = 0x03
+    REG_ADDRESS_OPTION = 0x03
     REG_ADDRESS_CHANNEL = 0x04
-    REG_ADDRESS_OPTION = 0x05
+    REG_ADDRESS_TRANS_MODE = 0x05
     REG_ADDRESS_CRYPT = 0x06
     REG_ADDRESS_PID = 0x08
 
@@ -62,42 +62,9 @@ class ResponseStatusCode:
 
     @staticmethod
     def get_description(status):
-        if status == ResponseStatusCode.E220_SUCCESS:
-            return "Success"
-        elif status == ResponseStatusCode.ERR_E220_UNKNOWN:
-            return "Unknown"
-        elif status == ResponseStatusCode.ERR_E220_NOT_SUPPORT:
-            return "Not support!"
-        elif status == ResponseStatusCode.ERR_E220_NOT_IMPLEMENT:
-            return "Not implement"
-        elif status == ResponseStatusCode.ERR_E220_NOT_INITIAL:
-            return "Not initial!"
-        elif status == ResponseStatusCode.ERR_E220_INVALID_PARAM:
-            return "Invalid param!"
-        elif status == ResponseStatusCode.ERR_E220_DATA_SIZE_NOT_MATCH:
-            return "Data size not match!"
-        elif status == ResponseStatusCode.ERR_E220_BUF_TOO_SMALL:
-            return "Buff too small!"
-        elif status == ResponseStatusCode.ERR_E220_TIMEOUT:
-            return "Timeout!!"
-        elif status == ResponseStatusCode.ERR_E220_HARDWARE:
-            return "Hardware error!"
-        elif status == ResponseStatusCode.ERR_E220_HEAD_NOT_RECOGNIZED:
-            return "Save mode returned not recognized!"
-        elif status == ResponseStatusCode.ERR_E220_NO_RESPONSE_FROM_DEVICE:
-            return "No response from device! (Check wiring)"
-        elif status == ResponseStatusCode.ERR_E220_WRONG_UART_CONFIG:
-            return "Wrong UART configuration! (BPS must be 9600 for configuration)"
-        elif status == ResponseStatusCode.ERR_E220_PACKET_TOO_BIG:
-            return "The device support only 200byte of data transmission!"
-        elif status == ResponseStatusCode.ERR_E220_JSON_PARSE:
-            return "JSON parse error!"
-        elif status == ResponseStatusCode.ERR_E220_DEINIT_UART_FAILED:
-            return "Deinit UART failed!"
-        elif status == ResponseStatusCode.ERR_E220_WRONG_FORMAT:
-            return "Wrong format!"
-        else:
-            return "Invalid status!"
+        import lora_e220_descriptions
+        return lora_e220_descriptions.describe(lora_e220_descriptions.RESPONSE_STATUS, status,
+                                               ResponseStatusCode.E220_SUCCESS)
 
 
 class SerialUARTBaudRate:
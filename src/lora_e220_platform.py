@@ -0,0 +1,256 @@
+#############################################################################################
+# EBYTE LoRa E220 Series for MicroPython - platform
+#
+# The driver reaches the hardware only through a platform:
+#   clock: ticks_ms, ticks_us, ticks_diff, ticks_add, sleep_ms, idle, lightsleep
+#          (VirtualClock runs the simulations faster than real time)
+#   pin(pin_id, mode): an object with value(), on(), off()
+#   aux_irq(pin, handler): call handler on the AUX rising edge (if the platform can)
+# and the UART object passed to the constructor (the machine.UART API).
+#
+# On MicroPython the default platform uses utime and machine. On CPython (a Linux gateway
+# with the module on an USB serial adapter) HostPlatform uses time, SerialUART adapts a
+# pyserial port and the pins are no-op or files (sysfs GPIO).
+#############################################################################################
+
+try:
+    import utime
+except ImportError:
+    utime = None
+
+try:
+    import machine
+except ImportError:
+    # CPython, or a MicroPython port without machine (unix)
+    machine = None
+
+PIN_IN = 0
+PIN_OUT = 1
+
+
+def _no_idle():
+    pass
+
+
+class MicroPythonClock:
+    def __init__(self):
+        self.ticks_ms = utime.ticks_ms
+        self.ticks_us = utime.ticks_us
+        self.ticks_diff = utime.ticks_diff
+        self.ticks_add = utime.ticks_add
+        self.sleep_ms = utime.sleep_ms
+        self.idle = machine.idle if hasattr(machine, 'idle') else _no_idle
+        self.lightsleep = machine.lightsleep if hasattr(machine, 'lightsleep') else utime.sleep_ms
+
+
+class HostClock:
+    # the ticks don't wrap around, ticks_diff and ticks_add are plain integer operations
+    def __init__(self):
+        import time
+        self._time = time
+
+    def ticks_ms(self):
+        return self._time.monotonic_ns() // 1000000
+
+    def ticks_us(self):
+        return self._time.monotonic_ns() // 1000
+
+    @staticmethod
+    def ticks_diff(end, start):
+        return end - start
+
+    @staticmethod
+    def ticks_add(ticks, delta):
+        return ticks + delta
+
+    def sleep_ms(self, ms):
+        self._time.sleep(ms / 1000)
+
+    def idle(self):
+        self._time.sleep(0.0001)
+
+    def lightsleep(self, ms):
+        self.sleep_ms(ms)
+
+
+class VirtualClock:
+    # simulated time for the simulator (lora_e220_simulator): sleep and idle advance it at once, so
+    # a run takes the time of the computation and not of the waits. Every tick read advances it by
+    # step_us (an iteration of a polling loop), so the busy waits end too.
+    def __init__(self, start_us=0, step_us=10, idle_us=1000):
+        self.now_us = start_us
+        self.step_us = step_us
+        # machine.idle wakes up at the next interrupt, at worst the system tick
+        self.idle_us = idle_us
+
+    def advance(self, us):
+        self.now_us += us
+
+    def ticks_ms(self):
+        self.now_us += self.step_us
+        return self.now_us // 1000
+
+    def ticks_us(self):
+        self.now_us += self.step_us
+        return self.now_us
+
+    @staticmethod
+    def ticks_diff(end, start):
+        return end - start
+
+    @staticmethod
+    def ticks_add(ticks, delta):
+        return ticks + delta
+
+    def sleep_ms(self, ms):
+        self.now_us += int(ms * 1000)
+
+    def idle(self):
+        self.now_us += self.idle_us
+
+    def lightsleep(self, ms):
+        self.sleep_ms(ms)
+
+
+class MicroPythonPlatform:
+    def __init__(self):
+        self.clock = MicroPythonClock()
+
+    @staticmethod
+    def pin(pin_id, mode):
+        return machine.Pin(pin_id, machine.Pin.IN if mode == PIN_IN else machine.Pin.OUT)
+
+    @staticmethod
+    def aux_irq(pin, handler):
+        pin.irq(trigger=machine.Pin.IRQ_RISING, handler=handler)
+
+
+class HostPlatform:
+    # gpio_path: format of the value file of a pin number, like '/sys/class/gpio/gpio{}/value',
+    # None for no-op pins (M0 and M1 wired by hand, AUX not connected)
+    def __init__(self, gpio_path=None, clock=None):
+        self.clock = clock if clock is not None else HostClock()
+        self.gpio_path = gpio_path
+
+    def pin(self, pin_id, mode):
+        if self.gpio_path is None:
+            return NoopPin(mode)
+        return FilePin(self.gpio_path.format(pin_id), mode)
+
+    @staticmethod
+    def aux_irq(pin, handler):
+        # no interrupts on the host, the driver polls the pin
+        if hasattr(pin, 'irq'):
+            pin.irq(handler=handler)
+
+
+class NoopPin:
+    # an input reads always HIGH (the module is never busy)
+    def __init__(self, mode=PIN_OUT, value=1):
+        self.mode = mode
+        self._value = value
+
+    def value(self, value=None):
+        if value is None:
+            return self._value
+        self._value = 1 if value else 0
+
+    def on(self):
+        self._value = 1
+
+    def off(self):
+        self._value = 0
+
+    def irq(self, handler=None, trigger=None):
+        pass
+
+
+class FilePin:
+    # pin exposed as a file with '0' or '1' (sysfs GPIO value, already exported and configured)
+    # the file stays open (AUX is polled in the waits), every read or write starts from the beginning
+    def __init__(self, path, mode=PIN_OUT):
+        self.path = path
+        self.mode = mode
+        self._file = open(path, 'r+b' if mode == PIN_OUT else 'rb', buffering=0)
+
+    def value(self, value=None):
+        self._file.seek(0)
+        if value is None:
+            return 1 if self._file.read(1) == b'1' else 0
+        self._file.write(b'1' if value else b'0')
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def irq(self, handler=None, trigger=None):
+        pass
+
+    def deinit(self):
+        self._file.close()
+
+
+class SerialUART:
+    # machine.UART API on a pyserial port: SerialUART('/dev/ttyUSB0') or SerialUART(serial=port)
+    # parity of machine.UART.init is None, 0 (even) or 1 (odd), see the MicroPython docs
+    # (docs.micropython.org/en/latest/library/machine.UART.html); pyserial: PARITY_NONE 'N',
+    # PARITY_EVEN 'E', PARITY_ODD 'O'
+    PARITY = {None: 'N', 0: 'E', 1: 'O'}
+
+    def __init__(self, port=None, serial=None):
+        if serial is None:
+            import serial as pyserial
+            serial = pyserial.Serial()
+            serial.port = port
+        self.serial = serial
+
+    def init(self, baudrate=9600, bits=8, parity=None, stop=1, timeout=1000, timeout_char=1000):
+        self.serial.baudrate = baudrate
+        self.serial.bytesize = bits
+        self.serial.parity = self.PARITY[parity]
+        self.serial.stopbits = stop
+        self.serial.timeout = timeout / 1000
+        self.serial.inter_byte_timeout = timeout_char / 1000 if timeout_char else None
+        if not self.serial.is_open:
+            self.serial.open()
+
+    def write(self, data):
+        return self.serial.write(bytes(data))
+
+    def any(self):
+        return self.serial.in_waiting
+
+    def read(self, size=None):
+        if size is None:
+            # what is available, without waiting (the driver uses it to empty the buffer)
+            data = self.serial.read(self.serial.in_waiting) if self.serial.in_waiting else None
+        else:
+            data = self.serial.read(size)
+        return data if data else None
+
+    def readinto(self, buf, size=None):
+        size = len(buf) if size is None else size
+        available = self.serial.in_waiting
+        data = self.serial.read(min(size, available) if available else size)
+        if not data:
+            return None
+        buf[:len(data)] = data
+        return len(data)
+
+    def flush(self):
+        self.serial.flush()
+
+    def deinit(self):
+        self.serial.close()
+
+
+_default_platform = None
+
+
+def default_platform():
+    global _default_platform
+    if _default_platform is None:
+        _default_platform = MicroPythonPlatform() if utime is not None else HostPlatform()
+    return _default_platform
@@ -0,0 +1,459 @@
+#############################################################################################
+# EBYTE LoRa E220 Series for MicroPython - reliable link
+#
+# Acknowledged messages over fixed transmission, for the commands that must arrive:
+#
+#   link = ReliableLink(lora, 0x00, 0x01, 23)          # own address and channel
+#   code, seq = link.send_fixed_message(0x00, 0x02, 23, 'open valve')
+#   code = link.flush()                                # all acknowledged (or failed)
+#   code, message, sender = link.receive_message()     # sender is (ADDH, ADDL, CHAN)
+#
+# Every message has a 7 byte header and the receiver answers with a 7 byte ACK:
+#
+#   0xFB | ADDH | ADDL | CHAN | session | seq | length | message        (data)
+#   0xFD | ADDH | ADDL | CHAN | session | seq | length | message        (data, ACK now)
+#   0xFC | ADDH | ADDL | CHAN | session | seq | bits                    (ACK)
+#
+# ADDH, ADDL and CHAN are the ones of the node that sends the frame (fixed transmission
+# doesn't give the address of the sender), 0xFB-0xFD can't be the first byte of an UTF-8
+# string, of a JSON or of a fragment. The length splits the frames that the driver
+# reads together (back to back packets when the receiver doesn't poll while they arrive).
+#
+# The sequence number counts per peer, the window is the number of sequence numbers (from
+# the oldest without ACK) that can be sent before an ACK. The ACK acknowledges seq and, in
+# bits, the 8 sequence numbers before it, so one ACK confirms all the messages read together
+# and a lost ACK is covered by the next one. The session is chosen at start: a peer that
+# restarts sends with a new session and its sequence numbers start again.
+#
+# The module is half duplex, an ACK sent while the sender transmits the next message is lost:
+# the receiver delays the ACK by the time of a message (every message of the window resets
+# the delay) and acknowledges at once the message that fills the window and the
+# retransmissions (0xFD), after which the sender waits the ACK. With window=1 every message
+# is acknowledged at once.
+#
+# A message without ACK is sent again after the retransmission timeout, computed like TCP
+# (RFC 6298) from the round trip time measured from the last frame sent to the peer, with
+# the time on air of an ACK as the minimum variation. The timeout doubles at every retry,
+# plus a random part up to the timeout itself so that the senders of two colliding packets
+# don't retry together, after `retries` retries the message fails. The receiver drops the
+# duplicates (the ACK was lost) in a window of the last 32 sequence numbers, the messages
+# are given in order of arrival.
+#
+# The driver empties the UART after every send, so the link reads the frames already
+# received (and waits the one arriving) before sending: call poll() often (receive_message
+# and flush do it), and don't call the receive methods of the driver while the link is in
+# use. Messages bigger than a sub packet are fragmented by the driver, the length in the
+# header of the fragments splits them when they are read together with other frames.
+#############################################################################################
+
+from lora_e220_operation_constant import ResponseStatusCode
+
+try:
+    from os import urandom
+except ImportError:
+    urandom = None
+
+DATA_MARKER = 0xFB
+ACK_MARKER = 0xFC
+# data that the sender doesn't follow with more before the ACK (window full, retransmission)
+ACK_NOW_MARKER = 0xFD
+HEADER_SIZE = 7
+MAX_MESSAGE_SIZE = 255
+ACK_SIZE = 7
+# sequence numbers before seq acknowledged by an ACK, the window can't be bigger
+ACK_BITS = 8
+DUPLICATE_WINDOW = 32
+BROADCAST = 0xFFFF
+
+INITIAL_RTO_MS = 1000
+# added to the time of a message for the delay of the ACK
+ACK_DELAY_MS = 20
+MIN_RTO_MS = 20
+MAX_RTO_MS = 30000
+
+
+class Outstanding:
+    # a message waiting its ACK
+    __slots__ = ('seq', 'frame', 'sent', 'timeout', 'wait', 'tries', 'done')
+
+    def __init__(self, seq, frame, sent, timeout, wait):
+        self.seq = seq
+        self.frame = frame
+        self.sent = sent
+        self.timeout = timeout
+        # timeout with the random part
+        self.wait = wait
+        self.tries = 1
+        self.done = False
+
+
+class Peer:
+    def __init__(self, address, chan, rto):
+        self.address = address
+        self.chan = chan
+
+        # sender: next sequence number, messages waiting the ACK and round trip time (ms)
+        self.next_seq = 0
+        self.outstanding = []
+        self.srtt = None
+        self.rttvar = 0
+        self.rto = rto
+        # an ACK now frame has been sent, the next messages wait the ACK (it would be lost)
+        self.ack_requested = False
+
+        # receiver: session of the peer, highest sequence number received and bitmap of the
+        # received ones (bit i is highest - i)
+        self.session = None
+        self.highest = 0
+        self.received = 0
+        self.ack_due = False
+        self.ack_at = 0
+
+    def is_duplicate(self, session, seq) -> bool:
+        if session != self.session:
+            return False
+        back = (self.highest - seq) & 0xFF
+        if back >= 128:
+            # after highest
+            return False
+        return back >= DUPLICATE_WINDOW or self.received & (1 << back) != 0
+
+    def mark(self, session, seq):
+        if session != self.session:
+            self.session = session
+            self.highest = seq
+            self.received = 1
+            return
+        ahead = (seq - self.highest) & 0xFF
+        if 0 < ahead < 128:
+            self.received = ((self.received << ahead) | 1) & 0xFFFFFFFF if ahead < DUPLICATE_WINDOW else 1
+            self.highest = seq
+        else:
+            self.received |= 1 << ((self.highest - seq) & 0xFF)
+
+
+class ReliableLink:
+    def __init__(self, lora, ADDH, ADDL, CHAN, window=4, retries=5, rssi=False, inbox_size=8, session=None):
+        if not 0 < window <= ACK_BITS:
+            raise ValueError('Invalid window')
+
+        self.lora = lora
+        self.clock = lora.clock
+        self.ADDH = ADDH
+        self.ADDL = ADDL
+        self.CHAN = CHAN
+        self.window = window
+        self.retries = retries
+        # the module appends the RSSI byte to the received frames (enableRSSI)
+        self.rssi = rssi
+        self.inbox_size = inbox_size
+        if session is None:
+            session = urandom(1)[0] if urandom is not None else self.clock.ticks_us() & 0xFF
+        self.session = session
+        # xorshift state of the random part of the timeouts, different on every node
+        self._seed = (((ADDH << 8) | ADDL) ^ (session * 257)) & 0xFFFF or 1
+
+        self.peers = {}
+        self._inbox = []
+        self._ack_due = []
+        # called with (ADDH, ADDL, CHAN), seq and E220_SUCCESS or ERR_E220_TIMEOUT for every message
+        self.on_result = None
+
+        self.sent = 0
+        self.retransmitted = 0
+        self.delivered = 0
+        self.failed = 0
+        self.received = 0
+        self.duplicates = 0
+        self.dropped = 0
+        self.ignored = 0
+        self.acks_sent = 0
+
+    def _peer(self, address, chan) -> Peer:
+        peer = self.peers.get(address)
+        if peer is None:
+            peer = Peer(address, chan, self._initial_rto())
+            self.peers[address] = peer
+        else:
+            peer.chan = chan
+        return peer
+
+    def _ack_time(self) -> float:
+        # ms on air of an ACK (with the address and channel of the fixed transmission)
+        return self.lora.get_aux_busy_time(ACK_SIZE)
+
+    def _initial_rto(self) -> int:
+        return max(INITIAL_RTO_MS, int(4 * self._ack_time()))
+
+    def _random(self, n) -> int:
+        x = self._seed
+        x ^= (x << 7) & 0xFFFF
+        x ^= x >> 9
+        x ^= (x << 8) & 0xFFFF
+        self._seed = x
+        return x % n if n > 0 else 0
+
+    def _wait(self, timeout) -> int:
+        return timeout + self._random(timeout)
+
+    def rto(self, ADDH, ADDL):
+        # ms of the retransmission timeout of a peer, None if never sent to it
+        peer = self.peers.get((ADDH << 8) | ADDL)
+        return peer.rto if peer is not None else None
+
+    def send_fixed_message(self, ADDH, ADDL, CHAN, message) -> (ResponseStatusCode, int):
+        # returns when the message is on air (after waiting a free slot of the window), the ACK
+        # comes later: on_result, flush or pending tell if it arrived
+        if isinstance(message, str):
+            message = message.encode('utf-8')
+        address = (ADDH << 8) | ADDL
+        if address == BROADCAST:
+            return ResponseStatusCode.ERR_E220_INVALID_PARAM, None
+        if len(message) > MAX_MESSAGE_SIZE:
+            return ResponseStatusCode.ERR_E220_PACKET_TOO_BIG, None
+
+        peer = self._peer(address, CHAN)
+        while not self._can_send(peer):
+            # every message is acknowledged or fails within its retries, so the slot frees up
+            self.poll()
+            if not self._can_send(peer):
+                self.clock.idle()
+
+        seq = peer.next_seq
+        oldest = peer.outstanding[0].seq if peer.outstanding else seq
+        # the last message of the window asks the ACK at once
+        marker = ACK_NOW_MARKER if ((seq - oldest) & 0xFF) + 1 >= self.window else DATA_MARKER
+        frame = bytearray((marker, self.ADDH, self.ADDL, self.CHAN, self.session, seq, len(message))) + message
+        code = self._transmit(peer, frame)
+        if code != ResponseStatusCode.E220_SUCCESS:
+            return code, None
+
+        peer.next_seq = (seq + 1) & 0xFF
+        peer.outstanding.append(Outstanding(seq, frame, self.clock.ticks_ms(), peer.rto, self._wait(peer.rto)))
+        self._sent_to(peer, frame)
+        self.sent += 1
+        return code, seq
+
+    def can_send(self, ADDH, ADDL) -> bool:
+        # send_fixed_message wouldn't wait (to call from an event loop)
+        peer = self.peers.get((ADDH << 8) | ADDL)
+        return peer is None or self._can_send(peer)
+
+    def _can_send(self, peer) -> bool:
+        # the window is on the sequence numbers (from the oldest waiting), so that an ACK covers them all
+        if peer.ack_requested:
+            return False
+        return not peer.outstanding or ((peer.next_seq - peer.outstanding[0].seq) & 0xFF) < self.window
+
+    def _sent_to(self, peer, frame):
+        # the receiver acknowledges after the last message of the window: the timeouts start again
+        now = self.clock.ticks_ms()
+        for message in peer.outstanding:
+            message.sent = now
+        if frame[0] == ACK_NOW_MARKER:
+            peer.ack_requested = True
+
+    def pending(self) -> int:
+        # messages waiting the ACK
+        return sum(len(peer.outstanding) for peer in self.peers.values())
+
+    def flush(self, timeout=None) -> ResponseStatusCode:
+        # wait the ACK (or the failure) of all the messages sent, ERR_E220_TIMEOUT if one failed
+        clock = self.clock
+        failed = self.failed
+        start = clock.ticks_ms()
+        while self.pending() > 0:
+            self.poll()
+            if self.pending() == 0:
+                break
+            if timeout is not None and clock.ticks_diff(clock.ticks_ms(), start) > timeout:
+                return ResponseStatusCode.ERR_E220_TIMEOUT
+            clock.idle()
+        return ResponseStatusCode.E220_SUCCESS if self.failed == failed else ResponseStatusCode.ERR_E220_TIMEOUT
+
+    def receive_message(self, timeout=1000):
+        code, data, sender = self.receive_raw(timeout)
+        if code != ResponseStatusCode.E220_SUCCESS:
+            return code, None, None
+        return code, str(data, 'utf-8'), sender
+
+    def receive_raw(self, timeout=1000):
+        # returns (code, bytes, (ADDH, ADDL, CHAN) of the sender), waits timeout ms for a message
+        clock = self.clock
+        start = clock.ticks_ms()
+        while not self._inbox:
+            self.poll()
+            if self._inbox:
+                break
+            if clock.ticks_diff(clock.ticks_ms(), start) > timeout:
+                return ResponseStatusCode.ERR_E220_TIMEOUT, None, None
+            clock.idle()
+        data, peer = self._inbox.pop(0)
+        return ResponseStatusCode.E220_SUCCESS, data, (peer.address >> 8, peer.address & 0xFF, peer.chan)
+
+    def poll(self) -> int:
+        # read the frames received, send the ACKs and the retransmissions, returns the messages waiting
+        self._drain()
+        self._send_acks()
+        self._retransmit()
+        return len(self._inbox)
+
+    def _drain(self):
+        lora = self.lora
+        # every packet ends with the RSSI byte if enabled, the driver strips the last one (and the
+        # ones of the fragments) and the others are between the frames read together
+        trailer = 1 if self.rssi else 0
+        while True:
+            if lora.poll() == 0:
+                if lora.available() == 0:
+                    return
+                # a packet is arriving, wait its end (a send would throw it away)
+                self.clock.idle()
+                continue
+            code, data = lora.receive_raw(self.rssi)[:2]
+            if code != ResponseStatusCode.E220_SUCCESS or data is None:
+                self.ignored += 1
+                continue
+            index = 0
+            while index < len(data):
+                marker = data[index]
+                if (marker == DATA_MARKER or marker == ACK_NOW_MARKER) and index + HEADER_SIZE <= len(data):
+                    size = HEADER_SIZE + data[index + HEADER_SIZE - 1]
+                elif marker == ACK_MARKER:
+                    size = ACK_SIZE
+                else:
+                    size = 0
+                if size == 0 or index + size > len(data):
+                    # not a frame of the link
+                    self.ignored += 1
+                    break
+                if marker != ACK_MARKER:
+                    self._received(data[index:index + size])
+                else:
+                    self._acknowledged(data[index:index + size])
+                index += size + trailer
+
+    def _received(self, data):
+        peer = self._peer((data[1] << 8) | data[2], data[3])
+        session = data[4]
+        seq = data[5]
+        if peer.is_duplicate(session, seq):
+            # the ACK was lost, acknowledge it again
+            self.duplicates += 1
+        elif len(self._inbox) >= self.inbox_size:
+            # no ACK, the sender retries when there is room
+            self.dropped += 1
+            return
+        else:
+            peer.mark(session, seq)
+            self._inbox.append((bytes(data[HEADER_SIZE:]), peer))
+            self.received += 1
+
+        if data[0] == ACK_NOW_MARKER:
+            peer.ack_at = self.clock.ticks_ms()
+        else:
+            # more messages of the window can follow
+            peer.ack_at = self.clock.ticks_add(self.clock.ticks_ms(), self._ack_delay(len(data)))
+        if not peer.ack_due:
+            peer.ack_due = True
+            self._ack_due.append(peer)
+
+    def _ack_delay(self, size) -> int:
+        # ms to wait the next message of the window, sent after this one of size bytes (plus the
+        # time the sender takes to write it)
+        return int(self.lora.get_aux_busy_time(size) * 1.5) + ACK_DELAY_MS
+
+    def _acknowledged(self, data):
+        peer = self.peers.get((data[1] << 8) | data[2])
+        if peer is None or data[4] != self.session:
+            # not ours, or of a previous session
+            self.ignored += 1
+            return
+
+        seq = data[5]
+        bits = data[6]
+        peer.ack_requested = False
+        now = self.clock.ticks_ms()
+        for message in peer.outstanding:
+            back = (seq - message.seq) & 0xFF
+            if back == 0 or (back <= ACK_BITS and bits & (1 << (back - 1))):
+                message.done = True
+                if message.tries == 1:
+                    # Karn: the round trip of a retransmitted message is ambiguous
+                    self._update_rto(peer, self.clock.ticks_diff(now, message.sent))
+                self.delivered += 1
+                self._result(peer, message, ResponseStatusCode.E220_SUCCESS)
+        peer.outstanding = [message for message in peer.outstanding if not message.done]
+
+    def _update_rto(self, peer, rtt):
+        if peer.srtt is None:
+            peer.srtt = rtt
+            peer.rttvar = rtt / 2
+        else:
+            peer.rttvar = 0.75 * peer.rttvar + 0.25 * abs(peer.srtt - rtt)
+            peer.srtt = 0.875 * peer.srtt + 0.125 * rtt
+        rto = peer.srtt + max(4 * peer.rttvar, self._ack_time())
+        peer.rto = int(min(max(rto, MIN_RTO_MS), MAX_RTO_MS))
+
+    def _result(self, peer, message, code):
+        if self.on_result is not None:
+            self.on_result((peer.address >> 8, peer.address & 0xFF, peer.chan), message.seq, code)
+
+    def _send_acks(self):
+        # one ACK per peer for all the frames read, sending it can read new ones
+        clock = self.clock
+        index = 0
+        while index < len(self._ack_due):
+            peer = self._ack_due[index]
+            if clock.ticks_diff(clock.ticks_ms(), peer.ack_at) < 0:
+                index += 1
+                continue
+            self._ack_due.pop(index)
+            peer.ack_due = False
+            frame = bytes((ACK_MARKER, self.ADDH, self.ADDL, self.CHAN, peer.session, peer.highest,
+                           (peer.received >> 1) & 0xFF))
+            if self._transmit(peer, frame) == ResponseStatusCode.E220_SUCCESS:
+                self.acks_sent += 1
+
+    def _retransmit(self):
+        clock = self.clock
+        # a send can read a frame of a new peer
+        for peer in list(self.peers.values()):
+            if not peer.outstanding:
+                continue
+            for message in list(peer.outstanding):
+                if message.done or clock.ticks_diff(clock.ticks_ms(), message.sent) < message.wait:
+                    continue
+                if message.tries > self.retries:
+                    message.done = True
+                    peer.outstanding.remove(message)
+                    peer.ack_requested = False
+                    self.failed += 1
+                    self._result(peer, message, ResponseStatusCode.ERR_E220_TIMEOUT)
+                    continue
+                message.tries += 1
+                message.timeout = min(message.timeout * 2, MAX_RTO_MS)
+                message.wait = self._wait(message.timeout)
+                message.frame[0] = ACK_NOW_MARKER
+                self._transmit(peer, message.frame)
+                self._sent_to(peer, message.frame)
+                self.retransmitted += 1
+
+    def _transmit(self, peer, frame) -> ResponseStatusCode:
+        # the driver empties the UART after the send: read what arrived before
+        self._drain()
+        return self.lora.send_fixed_message(peer.address >> 8, peer.address & 0xFF, peer.chan, frame)
+
+    def stats(self) -> dict:
+        return {
+            'sent': self.sent,
+            'retransmitted': self.retransmitted,
+            'delivered': self.delivered,
+            'failed': self.failed,
+            'pending': self.pending(),
+            'received': self.received,
+            'duplicates': self.duplicates,
+            'dropped': self.dropped,
+            'ignored': self.ignored,
+            'acks_sent': self.acks_sent,
+        }
@@ -0,0 +1,111 @@
+#############################################################################################
+# EBYTE LoRa E220 Series for MicroPython - schema registry
+#
+# Sender and receiver register the same message type as a numbered list of fields with
+# their type, then only the schema id and the packed values are transmitted:
+#
+#   0xB2 | schema id | numeric fields (struct, little endian) | string fields (length + UTF-8)
+#
+# The field types are the struct format characters (b B h H i I q Q f d ?) and 's' for
+# a string up to 255 bytes. ustruct has no '?' on the boards: a bool is packed as 'B'. q and
+# Q need a port with long integers.
+#############################################################################################
+
+try:
+    import ustruct as struct
+except ImportError:
+    import struct
+
+STRING_FIELD = 's'
+BOOL_FIELD = '?'
+NUMERIC_FIELDS = 'bBhHiIqQfd?'
+
+
+class Schema:
+    def __init__(self, schema_id, fields):
+        self.schema_id = schema_id
+        self.names = []
+        self.strings = []
+        # indexes in names of the bool fields
+        self.bools = []
+        fmt = '<'
+        for name, field_type in fields:
+            if field_type == STRING_FIELD:
+                self.strings.append(name)
+            elif field_type == BOOL_FIELD:
+                self.bools.append(len(self.names))
+                self.names.append(name)
+                fmt += 'B'
+            elif len(field_type) == 1 and field_type in NUMERIC_FIELDS:
+                self.names.append(name)
+                fmt += field_type
+            else:
+                raise ValueError('Invalid field type')
+        self.format = fmt
+        self.size = struct.calcsize(fmt)
+
+
+class SchemaCodec:
+    MAGIC = 0xB2
+
+    def __init__(self):
+        self.schemas = {}
+
+    def register(self, schema_id, fields):
+        if not 0 <= schema_id <= 0xFF:
+            raise ValueError('Invalid schema id')
+        self.schemas[schema_id] = Schema(schema_id, fields)
+
+    def codec(self, schema_id):
+        # codec bound to a schema, to pass to send_*_dict
+        return BoundSchemaCodec(self, self.schemas[schema_id])
+
+    def encode(self, obj, schema_id) -> bytearray:
+        schema = self.schemas[schema_id]
+        out = bytearray(2 + schema.size)
+        out[0] = self.MAGIC
+        out[1] = schema_id
+        values = [obj[name] for name in schema.names]
+        for i in schema.bools:
+            values[i] = 1 if values[i] else 0
+        struct.pack_into(schema.format, out, 2, *values)
+        for name in schema.strings:
+            raw = obj[name].encode('utf-8')
+            if len(raw) > 0xFF:
+                raise ValueError('String too long')
+            out.append(len(raw))
+            out.extend(raw)
+        return out
+
+    def decode(self, data):
+        if len(data) < 2 or data[0] != self.MAGIC:
+            raise ValueError('Not a schema message')
+        schema = self.schemas[data[1]]
+
+        values = struct.unpack_from(schema.format, data, 2)
+        msg = {}
+        for i in range(len(schema.names)):
+            msg[schema.names[i]] = values[i]
+        for i in schema.bools:
+            msg[schema.names[i]] = values[i] != 0
+
+        pos = 2 + schema.size
+        for name in schema.strings:
+            size = data[pos]
+            msg[name] = str(data[pos + 1:pos + 1 + size], 'utf-8')
+            pos += 1 + size
+        return msg
+
+
+class BoundSchemaCodec:
+    MAGIC = SchemaCodec.MAGIC
+
+    def __init__(self, registry, schema):
+        self.registry = registry
+        self.schema = schema
+
+    def encode(self, obj):
+        return self.registry.encode(obj, self.schema.schema_id)
+
+    def decode(self, data):
+        return self.registry.decode(data)
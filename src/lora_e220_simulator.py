@@ -0,0 +1,380 @@
+#############################################################################################
+# EBYTE LoRa E220 Series for MicroPython - simulated module
+#
+# A software E220 to test and benchmark the driver without hardware: it gives the UART and
+# the M0, M1 and AUX pins that go where the real ones go
+#
+#   air = Air()
+#   module = SimulatedE220('400T22D', air)
+#   lora = LoRaE220('400T22D', module.uart, aux_pin=module.aux, m0_pin=module.m0, m1_pin=module.m1)
+#
+# The mode follows M0 and M1, in program mode the module answers READ_CONFIGURATION and
+# WRITE_CFG_PWR_DWN_SAVE/LOSE over its registers (SAVE survives power_cycle, LOSE doesn't).
+# In normal and WOR transmitter mode what is written on the UART goes on the air: AUX goes
+# LOW a moment after the write (AUX_LOW_DELAY_US) and stays LOW for the UART transfer and
+# the time on air (lora_e220_airtime), the modules on the
+# same channel, air data rate and key with the target address (fixed transmission) or the
+# address of the sender (transparent) receive it at the end, with the RSSI byte if enabled.
+# 0xFFFF is broadcast and monitor address.
+#
+# A received packet is output on the UART byte by byte at the UART speed (AUX LOW until the
+# last byte), after the packets before it: a reader that polls sees the gap between two
+# packets, one that doesn't finds them back to back. The key (CRYPT_H, CRYPT_L) is write
+# only, a read returns 0 in its registers.
+#
+# Not simulated: LBT, WOR preamble timing, noise and collisions (see lora_e220_network).
+#############################################################################################
+
+from lora_e220 import Configuration
+from lora_e220_constants import UARTBaudRate, SubPacketSetting, FixedTransmission, RssiEnableByte
+from lora_e220_operation_constant import ModeType, ProgramCommand, PacketLength
+from lora_e220_platform import default_platform
+
+BROADCAST = 0xFFFF
+REGISTERS_SIZE = PacketLength.PL_CONFIGURATION
+PROGRAM_BAUDRATE = 9600
+WRONG_FORMAT_RESPONSE = bytes((ProgramCommand.WRONG_FORMAT,) * 3)
+# registers of the key (CRYPT_H, CRYPT_L), read as 0
+CRYPT_REGISTER = 6
+
+
+class Air:
+    # shared medium: every transmission is offered to all the attached modules
+    def __init__(self, rssi=200):
+        self.modules = []
+        self.default_rssi = rssi
+        self.transmissions = 0
+
+    def attach(self, module):
+        self.modules.append(module)
+
+    def configuration_changed(self, module):
+        # called after a write of the registers of module
+        pass
+
+    def rssi(self, sender, receiver) -> int:
+        # RSSI byte of the link (dBm = -(256 - rssi)), override it to model the distance
+        return self.default_rssi
+
+    def transmit(self, sender, chan, address, packets):
+        # packets: list of (payload, ticks_us at the end of its time on air)
+        self.transmissions += 1
+        for module in self.modules:
+            if module is not sender and module.receives(sender, chan, address):
+                rssi = self.rssi(sender, module)
+                for payload, at in packets:
+                    module.deliver(payload, at, rssi)
+
+
+class SimulatedPin:
+    def __init__(self, module, value=0):
+        self.module = module
+        self._value = value
+        self.handler = None
+
+    def value(self, value=None):
+        if value is None:
+            return self._value
+        self._value = 1 if value else 0
+        self.module.pins_changed()
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def irq(self, handler=None, trigger=None):
+        self.handler = handler
+
+
+class SimulatedAux(SimulatedPin):
+    # HIGH when the module is idle, the handler is called on the rising edge
+    def __init__(self, module):
+        super().__init__(module, 1)
+
+    def value(self, value=None):
+        self.module.update()
+        return self._value
+
+    def set(self, value):
+        rising = value == 1 and self._value == 0
+        self._value = value
+        if rising and self.handler is not None:
+            self.handler(self)
+
+
+class SimulatedUART:
+    # machine.UART API, the bytes written go to the module and read() returns what the module outputs
+    def __init__(self, module):
+        self.module = module
+        self.baudrate = 9600
+        self.timeout = 1000
+        self.rx = bytearray()
+
+    def init(self, baudrate=9600, bits=8, parity=None, stop=1, timeout=1000, timeout_char=1000):
+        self.baudrate = baudrate
+        self.timeout = timeout
+
+    def write(self, data):
+        self.module.received_from_uart(bytes(data))
+        return len(data)
+
+    def any(self):
+        self.module.update()
+        return len(self.rx)
+
+    def _wait(self, size):
+        # like the UART timeout: wait the bytes still in flight
+        clock = self.module.clock
+        start = clock.ticks_ms()
+        while self.any() < size and clock.ticks_diff(clock.ticks_ms(), start) < self.timeout:
+            clock.idle()
+
+    def read(self, size=None):
+        if size is None:
+            # what is available, without waiting
+            size = self.any()
+        else:
+            self._wait(size)
+        data = bytes(self.rx[:size])
+        del self.rx[:size]
+        return data if data else None
+
+    def readinto(self, buf, size=None):
+        size = len(buf) if size is None else size
+        self._wait(1)
+        size = min(size, len(self.rx))
+        if size == 0:
+            return None
+        buf[:size] = self.rx[:size]
+        del self.rx[:size]
+        return size
+
+    def flush(self):
+        pass
+
+    def deinit(self):
+        pass
+
+
+class SimulatedE220:
+    # AUX LOW after a change of M0/M1 and after a permanent write (flash), in ms
+    MODE_SWITCH_MS = 5
+    SAVE_MS = 20
+    # AUX goes LOW this long after the UART write of a packet to send, in us
+    AUX_LOW_DELAY_US = 50
+    PID = bytes((0x20, 0x0B, 0x0E))
+
+    def __init__(self, model='400T22D', air=None, clock=None):
+        self.model = model
+        self.clock = clock if clock is not None else default_platform().clock
+        self.air = air
+
+        self.configuration = Configuration(model)
+        self._saved = self.configuration.to_bytes()
+
+        self.uart = SimulatedUART(self)
+        self.m0 = SimulatedPin(self)
+        self.m1 = SimulatedPin(self)
+        self.aux = SimulatedAux(self)
+
+        self.mode = ModeType.MODE_0_NORMAL
+        self._busy_until = self.clock.ticks_us()
+        # ticks_us of a pending AUX LOW, None if there isn't one
+        self._aux_low_at = None
+        self._command = bytearray()
+        # (ticks_us of arrival, bytes output on the UART)
+        self._incoming = []
+        # (ticks_us of the first byte, bytes) being output on the UART, bytes of the first already output
+        self._output = []
+        self._output_sent = 0
+        self._output_end = self.clock.ticks_us()
+
+        self.sent = 0
+        self.received = 0
+
+        if air is not None:
+            air.attach(self)
+
+    @property
+    def address(self) -> int:
+        return (self.configuration.ADDH << 8) | self.configuration.ADDL
+
+    def save(self):
+        # the registers of self.configuration become the ones at power on (set them before begin)
+        self._saved = self.configuration.to_bytes()
+        self._configuration_changed()
+
+    def power_cycle(self):
+        # the volatile registers are lost, the saved ones reloaded
+        self.configuration.from_bytes(self._saved)
+        self._command = bytearray()
+        self._incoming = []
+        self._output = []
+        self._output_sent = 0
+        self._aux_low_at = None
+        self.uart.rx = bytearray()
+        self._configuration_changed()
+
+    def _configuration_changed(self):
+        if self.air is not None:
+            self.air.configuration_changed(self)
+
+    def _busy(self, ms, start=None, aux_delay_us=0):
+        start = self.clock.ticks_us() if start is None else start
+        until = self.clock.ticks_add(start, int(ms * 1000))
+        if self.clock.ticks_diff(until, self._busy_until) > 0:
+            self._busy_until = until
+        if aux_delay_us > 0 and self.aux._value == 1:
+            self._aux_low_at = self.clock.ticks_add(start, aux_delay_us)
+        else:
+            self.aux.set(0)
+
+    def update(self):
+        # output the bytes of the packets arrived by now and raise AUX at the end of the busy time
+        if not self._incoming and not self._output and self.aux._value == 1 and self._aux_low_at is None:
+            return
+        clock = self.clock
+        now = clock.ticks_us()
+        if self._aux_low_at is not None and clock.ticks_diff(now, self._aux_low_at) >= 0:
+            self._aux_low_at = None
+            self.aux.set(0)
+        while self._incoming and clock.ticks_diff(now, self._incoming[0][0]) >= 0:
+            at, data = self._incoming.pop(0)
+            if self.mode != ModeType.MODE_3_PROGRAM:
+                start = at if clock.ticks_diff(at, self._output_end) > 0 else self._output_end
+                duration = self.configuration.get_uart_time(len(data))
+                self._output_end = clock.ticks_add(start, int(duration * 1000))
+                self._output.append((start, data))
+                self.received += 1
+                self._busy(clock.ticks_diff(self._output_end, at) / 1000, at)
+        self._output_bytes(now)
+        if self.aux._value == 0 and clock.ticks_diff(now, self._busy_until) >= 0:
+            self.aux.set(1)
+
+    def _output_bytes(self, now):
+        # the bytes of the packets in output sent on the UART by now
+        char_us = self.configuration.get_uart_time(1) * 1000
+        while self._output:
+            start, data = self._output[0]
+            elapsed = self.clock.ticks_diff(now, start)
+            count = min(len(data), int(elapsed / char_us)) if elapsed > 0 else 0
+            if count > self._output_sent:
+                self.uart.rx += data[self._output_sent:count]
+                self._output_sent = count
+            if count < len(data):
+                return
+            self._output.pop(0)
+            self._output_sent = 0
+
+    def pins_changed(self):
+        mode = (self.m1._value << 1) | self.m0._value
+        if mode != self.mode:
+            self.mode = mode
+            self._command = bytearray()
+            self._busy(self.MODE_SWITCH_MS)
+
+    def _uart_matches(self) -> bool:
+        if self.mode == ModeType.MODE_3_PROGRAM:
+            return self.uart.baudrate == PROGRAM_BAUDRATE
+        return self.uart.baudrate == UARTBaudRate.get_bps(self.configuration.SPED.uartBaudRate)
+
+    def received_from_uart(self, data):
+        self.update()
+        if not self._uart_matches():
+            # wrong speed, the module reads garbage
+            return
+        if self.mode == ModeType.MODE_3_PROGRAM:
+            self._command += data
+            self._program()
+        elif self.mode != ModeType.MODE_2_WOR_RECEIVER:
+            self._transmit(data)
+
+    def _program(self):
+        command = self._command
+        while len(command) >= 3:
+            cmd, address, length = command[0], command[1], command[2]
+            if cmd == ProgramCommand.READ_CONFIGURATION:
+                if address + length > REGISTERS_SIZE + PacketLength.PL_PID:
+                    self._wrong_format()
+                    return
+                registers = bytearray(self.configuration.to_bytes()[3:] + self.PID)
+                registers[CRYPT_REGISTER:CRYPT_REGISTER + 2] = b'\x00\x00'
+                self.uart.rx += bytes((cmd, address, length)) + bytes(registers[address:address + length])
+                del command[:3]
+            elif cmd in (ProgramCommand.WRITE_CFG_PWR_DWN_SAVE, ProgramCommand.WRITE_CFG_PWR_DWN_LOSE):
+                if address + length > REGISTERS_SIZE:
+                    self._wrong_format()
+                    return
+                if len(command) < 3 + length:
+                    return
+                self._write_registers(cmd, address, command[3:3 + length])
+                del command[:3 + length]
+            else:
+                self._wrong_format()
+                return
+
+    def _wrong_format(self):
+        self.uart.rx += WRONG_FORMAT_RESPONSE
+        self._command = bytearray()
+
+    def _write_registers(self, cmd, address, values):
+        data = bytearray(self.configuration.to_bytes())
+        data[3 + address:3 + address + len(values)] = values
+        self.configuration.from_bytes(data)
+        data = self.configuration.to_bytes()
+        if cmd == ProgramCommand.WRITE_CFG_PWR_DWN_SAVE:
+            saved = bytearray(self._saved)
+            saved[3 + address:3 + address + len(values)] = data[3 + address:3 + address + len(values)]
+            self._saved = bytes(saved)
+            self._busy(self.SAVE_MS)
+        self.uart.rx += bytes((ProgramCommand.RETURNED_COMMAND, address, len(values))) + \
+            data[3 + address:3 + address + len(values)]
+        self._configuration_changed()
+
+    def _transmit(self, data):
+        configuration = self.configuration
+        if configuration.TRANSMISSION_MODE.fixedTransmission == FixedTransmission.FIXED_TRANSMISSION:
+            if len(data) < 3:
+                return
+            address = (data[0] << 8) | data[1]
+            chan = data[2]
+            payload = data[3:]
+        else:
+            address = self.address
+            chan = configuration.CHAN
+            payload = data
+
+        now = self.clock.ticks_us()
+        self._busy(configuration.get_aux_busy_time(len(payload)), now, self.AUX_LOW_DELAY_US)
+        self.sent += 1
+        if self.air is None:
+            return
+
+        # every sub packet arrives at the end of its own time on air (after the UART transfer of the first)
+        size = SubPacketSetting.get_size(configuration.OPTION.subPacketSetting)
+        at = self.clock.ticks_add(now, int(configuration.get_uart_time(min(len(data), size)) * 1000))
+        packets = []
+        for index in range(0, len(payload), size):
+            chunk = payload[index:index + size]
+            at = self.clock.ticks_add(at, int(configuration.get_time_on_air(len(chunk)) * 1000))
+            packets.append((chunk, at))
+        self.air.transmit(self, chan, address, packets)
+
+    def receives(self, sender, chan, address) -> bool:
+        mine = self.configuration
+        theirs = sender.configuration
+        return self.mode != ModeType.MODE_3_PROGRAM and mine.CHAN == chan and \
+            mine.SPED.airDataRate == theirs.SPED.airDataRate and \
+            mine.CRYPT.CRYPT_H == theirs.CRYPT.CRYPT_H and mine.CRYPT.CRYPT_L == theirs.CRYPT.CRYPT_L and \
+            (address == BROADCAST or address == self.address or self.address == BROADCAST)
+
+    def deliver(self, payload, at, rssi):
+        if self.configuration.TRANSMISSION_MODE.enableRSSI == RssiEnableByte.RSSI_ENABLED:
+            payload = payload + bytes((rssi,))
+        # in order of arrival
+        index = len(self._incoming)
+        while index > 0 and self.clock.ticks_diff(self._incoming[index - 1][0], at) > 0:
+            index -= 1
+        self._incoming.insert(index, (at, payload))
@@ -0,0 +1,39 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from lora_e220 import LoRaE220  # noqa: E402
+from lora_e220_constants import FixedTransmission, RssiEnableByte  # noqa: E402
+from lora_e220_operation_constant import ResponseStatusCode  # noqa: E402
+from lora_e220_platform import VirtualClock  # noqa: E402
+from lora_e220_simulator import Air, SimulatedE220  # noqa: E402
+
+
+@pytest.fixture
+def clock():
+    return VirtualClock()
+
+
+@pytest.fixture
+def air():
+    return Air()
+
+
+@pytest.fixture
+def node(air, clock):
+    # a driver on a simulated module with fixed transmission at address 0x00 ADDL, channel 23
+    def node(ADDL, rssi=False, **kwargs):
+        module = SimulatedE220('400T22D', air, clock=clock)
+        module.configuration.ADDL = ADDL
+        module.configuration.TRANSMISSION_MODE.fixedTransmission = FixedTransmission.FIXED_TRANSMISSION
+        if rssi:
+            module.configuration.TRANSMISSION_MODE.enableRSSI = RssiEnableByte.RSSI_ENABLED
+        module.save()
+        lora = LoRaE220('400T22D', module.uart, aux_pin=module.aux, m0_pin=module.m0, m1_pin=module.m1,
+                        clock=clock, **kwargs)
+        assert lora.begin() == ResponseStatusCode.E220_SUCCESS
+        return lora
+    return node
@@ -0,0 +1,119 @@
+import asyncio
+import sys
+
+import pytest
+
+import uasyncio_shim
+
+sys.modules.setdefault('uasyncio', uasyncio_shim)
+
+from lora_e220_async import AsyncLoRaE220  # noqa: E402
+from lora_e220_constants import FixedTransmission  # noqa: E402
+from lora_e220_operation_constant import ResponseStatusCode, ModeType  # noqa: E402
+from lora_e220_simulator import SimulatedE220  # noqa: E402
+
+
+@pytest.fixture
+def async_node(air, clock):
+    # AsyncLoRaE220 on a simulated module, fixed transmission at address 0x00 ADDL, channel 23
+    uasyncio_shim.clock = clock
+
+    def async_node(ADDL, **kwargs):
+        module = SimulatedE220('400T22D', air, clock=clock)
+        module.configuration.ADDL = ADDL
+        module.configuration.TRANSMISSION_MODE.fixedTransmission = FixedTransmission.FIXED_TRANSMISSION
+        module.save()
+        lora = AsyncLoRaE220('400T22D', module.uart, aux_pin=module.aux, m0_pin=module.m0, m1_pin=module.m1,
+                             clock=clock, **kwargs)
+        assert asyncio.run(lora.begin()) == ResponseStatusCode.E220_SUCCESS
+        assert module.mode == ModeType.MODE_0_NORMAL
+        return lora
+    return async_node
+
+
+def test_begin_reads_the_configuration(async_node):
+    lora = async_node(2)
+    code, configuration = asyncio.run(lora.get_configuration())
+    assert code == ResponseStatusCode.E220_SUCCESS
+    assert configuration.ADDL == 2
+
+
+def test_receive(node, async_node):
+    sender = node(1)
+    receiver = async_node(2, rx_buffer_size=256)
+
+    async def run():
+        assert sender.send_fixed_message(0, 2, 23, 'hello') == ResponseStatusCode.E220_SUCCESS
+        assert await receiver.receive_message() == (ResponseStatusCode.E220_SUCCESS, 'hello')
+
+        assert sender.send_fixed_message(0, 2, 23, b'\x00\xfa') == ResponseStatusCode.E220_SUCCESS
+        code, data = await receiver.receive_raw()
+        assert code == ResponseStatusCode.E220_SUCCESS
+        assert bytes(data) == b'\x00\xfa'
+
+        # a fragmented message bigger than the receive buffer, then a message in the same read
+        assert sender.send_fixed_message(0, 2, 23, 'X' * 700) == ResponseStatusCode.E220_SUCCESS
+        assert sender.send_fixed_message(0, 2, 23, 'after') == ResponseStatusCode.E220_SUCCESS
+        assert await receiver.receive_message() == (ResponseStatusCode.E220_SUCCESS, 'X' * 700)
+        assert await receiver.receive_message() == (ResponseStatusCode.E220_SUCCESS, 'after')
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize('delimiter', ['\n', b'\n', 10])
+def test_receive_until_delimiter(node, async_node, delimiter):
+    sender = node(1)
+    receiver = async_node(2)
+
+    async def run():
+        assert sender.send_fixed_message(0, 2, 23, 'l1\nl2\n') == ResponseStatusCode.E220_SUCCESS
+        assert await receiver.receive_message(delimiter=delimiter) == (ResponseStatusCode.E220_SUCCESS, 'l1')
+        assert await receiver.receive_message(delimiter=delimiter) == (ResponseStatusCode.E220_SUCCESS, 'l2')
+
+        assert sender.send_fixed_message(0, 2, 23, 'abcdef') == ResponseStatusCode.E220_SUCCESS
+        assert await receiver.receive_message(size=3) == (ResponseStatusCode.E220_SUCCESS, 'abc')
+        assert await receiver.receive_message(size=3) == (ResponseStatusCode.E220_SUCCESS, 'def')
+    asyncio.run(run())
+
+
+def test_send(node, async_node):
+    sender = async_node(1)
+    receiver = node(2)
+
+    async def run():
+        assert await sender.send_fixed_message(0, 2, 23, 'Y' * 450) == ResponseStatusCode.E220_SUCCESS
+        assert await sender.send_fixed_dict(0, 2, 23, {'t': 21}) == ResponseStatusCode.E220_SUCCESS
+    asyncio.run(run())
+    assert receiver.receive_message() == (ResponseStatusCode.E220_SUCCESS, 'Y' * 450)
+    assert receiver.receive_dict()[:2] == (ResponseStatusCode.E220_SUCCESS, {'t': 21})
+
+
+def test_receive_timeout(async_node):
+    receiver = async_node(2)
+    code, data = asyncio.run(receiver.receive_raw())
+    assert code != ResponseStatusCode.E220_SUCCESS
+    assert data is None
+
+
+def test_buffered_receive_parameters(node, async_node):
+    # the check of the buffered receive path of the async driver: rx_buffer_size, max_message_size
+    # and the bytes after a delimiter kept in the ring buffer for the next receive
+    sender = node(1)
+    receiver = async_node(2, rx_buffer_size=256, max_message_size=300)
+    assert len(receiver._rx.buf) == 256
+
+    async def run():
+        assert sender.send_fixed_message(0, 2, 23, 'Z' * 250) == ResponseStatusCode.E220_SUCCESS
+        assert await receiver.receive_message() == (ResponseStatusCode.E220_SUCCESS, 'Z' * 250)
+
+        assert sender.send_fixed_message(0, 2, 23, 'first;rest') == ResponseStatusCode.E220_SUCCESS
+        # all the bytes output on the UART
+        receiver.clock.sleep_ms(50)
+        assert await receiver.receive_message(delimiter=';') == (ResponseStatusCode.E220_SUCCESS, 'first')
+        assert receiver.available() == 4
+        assert await receiver.receive_message(size=4) == (ResponseStatusCode.E220_SUCCESS, 'rest')
+
+        assert sender.send_fixed_message(0, 2, 23, 'W' * 400) == ResponseStatusCode.E220_SUCCESS
+        code, data = await receiver.receive_message()
+        assert code == ResponseStatusCode.ERR_E220_PACKET_TOO_BIG
+        assert data is None
+    asyncio.run(run())
@@ -0,0 +1,88 @@
+import pytest
+
+from lora_e220 import LoRaE220
+from lora_e220_constants import UARTBaudRate
+from lora_e220_operation_constant import ResponseStatusCode, ModeType, SerialUARTBaudRate
+from lora_e220_simulator import SimulatedE220
+
+
+def simulated_driver(clock, **kwargs):
+    module = SimulatedE220('400T22D', clock=clock)
+    lora = LoRaE220('400T22D', module.uart, aux_pin=module.aux, m0_pin=module.m0, m1_pin=module.m1,
+                    clock=clock, **kwargs)
+    assert lora.begin() == ResponseStatusCode.E220_SUCCESS
+    return lora, module
+
+
+def test_aux_edge_of_a_previous_operation_is_ignored(clock):
+    lora, module = simulated_driver(clock, aux_irq=True)
+    assert lora.send_transparent_message('hello') == ResponseStatusCode.E220_SUCCESS
+
+    # the module goes busy without _arm_aux (a packet received), the rising edge of the send is stale
+    module.deliver(b'x' * 50, clock.ticks_us(), 200)
+    module.update()
+    assert module.aux.value() == 0
+
+    assert lora._wait_aux(1000) == ResponseStatusCode.E220_SUCCESS
+    assert module.aux.value() == 1
+
+
+def test_begin_again_returns_to_normal_mode(clock):
+    # at 19200bps the configuration can't be read, begin only switches to normal mode
+    module = SimulatedE220('400T22D', clock=clock)
+    module.configuration.SPED.uartBaudRate = UARTBaudRate.BPS_19200
+    module.save()
+    lora = LoRaE220('400T22D', module.uart, aux_pin=module.aux, m0_pin=module.m0, m1_pin=module.m1,
+                    uart_baudrate=SerialUARTBaudRate.BPS_RATE_19200, clock=clock)
+    assert lora.begin() == ResponseStatusCode.E220_SUCCESS
+    assert module.mode == ModeType.MODE_0_NORMAL
+
+    # begin drives M0 and M1 HIGH (program mode) before switching to normal mode
+    assert lora.begin() == ResponseStatusCode.E220_SUCCESS
+    assert module.mode == ModeType.MODE_0_NORMAL
+    assert lora.send_transparent_message('hello') == ResponseStatusCode.E220_SUCCESS
+    assert module.sent == 1
+
+
+def test_managed_delay(clock):
+    # the static call of the existing code, on the default clock
+    LoRaE220.managed_delay(1)
+
+    lora, module = simulated_driver(clock)
+    start = clock.now_us
+    lora._managed_delay(50)
+    # on the ms ticks, at least 49ms
+    assert clock.now_us - start >= 49000
+
+
+def test_module_information_is_the_diagnostics_class():
+    import lora_e220
+    from lora_e220 import ModuleInformation
+    from lora_e220_diagnostics import ModuleInformation as DiagnosticsModuleInformation
+
+    assert ModuleInformation is DiagnosticsModuleInformation
+    assert isinstance(ModuleInformation(), lora_e220.ModuleInformation)
+
+    class Extended(ModuleInformation):
+        pass
+    assert isinstance(Extended(), lora_e220.ModuleInformation)
+
+
+def test_get_module_information(clock):
+    lora, module = simulated_driver(clock)
+    code, module_information = lora.get_module_information()
+    assert code == ResponseStatusCode.E220_SUCCESS
+    assert module_information.to_bytes()[3:] == module.PID
+    assert module.mode == ModeType.MODE_0_NORMAL
+
+
+@pytest.mark.parametrize('aux_irq', [True, False])
+def test_aux_latency_of_a_send(clock, aux_irq):
+    # AUX goes LOW a few us after the write: the wait must not end on the HIGH level before it
+    lora, module = simulated_driver(clock, aux_irq=aux_irq)
+    busy_us = module.configuration.get_aux_busy_time(len('hello')) * 1000
+    start = clock.now_us
+    assert lora.send_transparent_message('hello') == ResponseStatusCode.E220_SUCCESS
+    assert clock.now_us - start >= busy_us
+    if aux_irq:
+        assert busy_us <= lora.last_aux_latency_us <= busy_us + 1000
@@ -0,0 +1,92 @@
+import pytest
+
+from lora_e220_fragment import Fragmenter, Reassembler, FRAGMENT_HEADER_SIZE, fragment_length
+from lora_e220_operation_constant import ResponseStatusCode
+from lora_e220_platform import VirtualClock
+
+
+def test_fragments_rebuild_the_message():
+    message = bytes(range(256)) * 2
+    reassembler = Reassembler(clock=VirtualClock())
+    fragments = list(Fragmenter().fragments(message, 200))
+
+    assert len(fragments) == 3
+    for fragment in fragments[:-1]:
+        assert len(fragment) == 200
+        assert reassembler.feed(fragment) == (ResponseStatusCode.E220_SUCCESS, None)
+    code, rebuilt = reassembler.feed(fragments[-1])
+    assert code == ResponseStatusCode.E220_SUCCESS
+    assert bytes(rebuilt) == message
+
+
+def test_fragment_length_splits_merged_fragments():
+    fragments = list(Fragmenter().fragments(b'x' * 450, 200))
+    merged = b''.join(fragments)
+
+    assert fragment_length(merged) == len(fragments[0])
+    assert fragment_length(merged, trailer=1) == len(fragments[0]) + 1
+    assert fragment_length(b'hello') == 5
+
+
+def test_truncated_fragment_is_discarded():
+    fragment = next(Fragmenter().fragments(b'x' * 450, 200))
+    code, message = Reassembler(clock=VirtualClock()).feed(fragment[:FRAGMENT_HEADER_SIZE + 10])
+    assert code == ResponseStatusCode.ERR_E220_DATA_SIZE_NOT_MATCH
+    assert message is None
+
+
+@pytest.mark.parametrize('rssi', [False, True])
+def test_fragments_received_together(node, rssi):
+    # the receiver doesn't poll while the fragments arrive: they are in the UART back to back
+    sender = node(1, rssi)
+    receiver = node(2, rssi)
+
+    assert sender.send_fixed_message(0, 2, 23, 'A' * 450) == ResponseStatusCode.E220_SUCCESS
+    assert sender.send_fixed_message(0, 2, 23, 'next') == ResponseStatusCode.E220_SUCCESS
+
+    assert receiver.receive_message(rssi)[:2] == (ResponseStatusCode.E220_SUCCESS, 'A' * 450)
+    assert receiver.receive_message(rssi)[:2] == (ResponseStatusCode.E220_SUCCESS, 'next')
+
+
+def test_message_bigger_than_the_receive_buffer(node):
+    sender = node(1)
+    receiver = node(2, rx_buffer_size=256)
+
+    assert sender.send_fixed_message(0, 2, 23, 'B' * 1000) == ResponseStatusCode.E220_SUCCESS
+    assert receiver.receive_message() == (ResponseStatusCode.E220_SUCCESS, 'B' * 1000)
+
+
+@pytest.mark.parametrize('rssi', [False, True])
+def test_raw_payload_that_starts_with_the_marker(node, rssi):
+    # not fragmented by the sender: not taken for a fragment by the receiver
+    sender = node(1, rssi)
+    receiver = node(2, rssi)
+    payload = b'\xfa\x01\x00\x02\x03abc'
+
+    assert sender.send_fixed_message(0, 2, 23, payload) == ResponseStatusCode.E220_SUCCESS
+    code, data = receiver.receive_raw(rssi)[:2]
+    assert code == ResponseStatusCode.E220_SUCCESS
+    assert bytes(data) == payload
+
+    assert sender.send_fixed_message(0, 2, 23, payload[:1]) == ResponseStatusCode.E220_SUCCESS
+    code, data = receiver.receive_raw(rssi)[:2]
+    assert code == ResponseStatusCode.E220_SUCCESS
+    assert bytes(data) == payload[:1]
+
+
+def test_fragments_of_a_message_that_starts_with_the_marker(node):
+    sender = node(1)
+    receiver = node(2)
+    payload = b'\xfa' * 450
+
+    assert sender.send_fixed_message(0, 2, 23, payload) == ResponseStatusCode.E220_SUCCESS
+    code, data = receiver.receive_raw()
+    assert code == ResponseStatusCode.E220_SUCCESS
+    assert bytes(data) == payload
+
+
+def test_message_id_zero_is_the_escape():
+    fragmenter = Fragmenter()
+    ids = set(next(fragmenter.fragments(b'x' * 450, 200))[1] for _ in range(600))
+    assert 0 not in ids
+    assert len(ids) == 255
@@ -0,0 +1,14 @@
+from lora_e220_network import Network
+
+
+def test_shadowing_is_fixed_per_link():
+    network = Network(seed=3, shadowing_db=8)
+    a = network.add_node(1, 0, 0)
+    b = network.add_node(2, 500, 0)
+    c = network.add_node(3, 0, 500)
+
+    loss = network.path_loss(a.module, b.module)
+    assert network.path_loss(a.module, b.module) == loss
+    assert network.path_loss(b.module, a.module) == loss
+    # same distance, another link: its own shadowing
+    assert network.path_loss(a.module, c.module) != loss
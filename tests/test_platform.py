@@ -0,0 +1,34 @@
+from lora_e220_constants import UARTParity
+from lora_e220_platform import FilePin, SerialUART, PIN_IN, PIN_OUT
+
+
+def test_file_pin_keeps_the_file_open(tmp_path):
+    path = tmp_path / 'value'
+    path.write_text('0\n')
+    pin = FilePin(str(path), PIN_OUT)
+    aux = FilePin(str(path), PIN_IN)
+
+    pin.on()
+    assert aux.value() == 1
+    assert aux.value() == 1
+    pin.value(0)
+    assert aux.value() == 0
+    assert path.read_text() == '0\n'
+
+    pin.deinit()
+    aux.deinit()
+
+
+
+def test_serial_parity_of_machine_uart():
+    # machine.UART: None, 0 (even) or 1 (odd)
+    assert SerialUART.PARITY == {None: 'N', 0: 'E', 1: 'O'}
+
+
+def test_parity_of_the_module_mode():
+    assert UARTParity.get_uart_value(UARTParity.MODE_00_8N1) is None
+    assert UARTParity.get_uart_value(UARTParity.MODE_01_8O1) == 1
+    assert UARTParity.get_uart_value(UARTParity.MODE_10_8E1) == 0
+    assert UARTParity.get_uart_value(UARTParity.MODE_11_8N1) is None
+    assert SerialUART.PARITY[UARTParity.get_uart_value(UARTParity.MODE_01_8O1)] == 'O'
+    assert SerialUART.PARITY[UARTParity.get_uart_value(UARTParity.MODE_10_8E1)] == 'E'
@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+from lora_e220_operation_constant import ResponseStatusCode
+from lora_e220_reliable import ReliableLink, MAX_MESSAGE_SIZE
+
+
+def exchange(clock, sender, receiver, messages, limit_ms=120000):
+    # one thread for both nodes: send when the window has room, poll both until all acknowledged
+    received = []
+    index = 0
+    start = clock.ticks_ms()
+    while index < len(messages) or sender.pending() > 0:
+        assert clock.ticks_diff(clock.ticks_ms(), start) < limit_ms
+        if index < len(messages) and sender.can_send(0, 2):
+            code, seq = sender.send_fixed_message(0, 2, 23, messages[index])
+            assert code == ResponseStatusCode.E220_SUCCESS
+            index += 1
+        sender.poll()
+        while receiver.poll() > 0:
+            received.append(receiver.receive_message(0)[1])
+        clock.idle()
+    return received
+
+
+@pytest.mark.parametrize('rssi', [False, True])
+def test_messages_of_the_maximum_size(node, clock, rssi):
+    # bigger than a sub packet: the driver fragments them
+    sender = ReliableLink(node(1, rssi), 0, 1, 23, rssi=rssi)
+    receiver = ReliableLink(node(2, rssi), 0, 2, 23, rssi=rssi)
+    messages = [chr(ord('A') + i) * MAX_MESSAGE_SIZE for i in range(5)]
+
+    assert exchange(clock, sender, receiver, messages) == messages
+    assert sender.stats()['delivered'] == len(messages)
+    assert sender.stats()['failed'] == 0
+    assert receiver.stats()['ignored'] == 0
+
+
+def test_lost_frames_are_sent_again(node, clock, air, monkeypatch):
+    # a fifth of the transmissions (messages and ACKs) are lost
+    loss = random.Random(1)
+    transmit = air.transmit
+
+    def lossy(sender, chan, address, packets):
+        if loss.random() >= 0.2:
+            transmit(sender, chan, address, packets)
+    monkeypatch.setattr(air, 'transmit', lossy)
+
+    sender = ReliableLink(node(1), 0, 1, 23)
+    receiver = ReliableLink(node(2), 0, 2, 23)
+    messages = ['command {}'.format(i) for i in range(30)]
+
+    received = exchange(clock, sender, receiver, messages)
+    assert sorted(received) == sorted(messages)
+    assert sender.stats()['delivered'] == len(messages)
+    assert sender.stats()['retransmitted'] > 0
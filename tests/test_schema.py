@@ -0,0 +1,14 @@
+from lora_e220_schema import SchemaCodec
+
+
+def test_bool_field_is_packed_as_a_byte():
+    # ustruct on the boards has no '?' format
+    registry = SchemaCodec()
+    registry.register(1, (('on', '?'), ('temp', 'h'), ('alarm', '?'), ('name', 's')))
+    assert '?' not in registry.schemas[1].format
+
+    data = registry.encode({'on': True, 'temp': -5, 'alarm': 0, 'name': 'gh1'}, 1)
+    assert len(data) == 2 + 4 + 4
+    message = registry.decode(data)
+    assert message == {'on': True, 'temp': -5, 'alarm': False, 'name': 'gh1'}
+    assert message['on'] is True
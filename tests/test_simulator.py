@@ -0,0 +1,106 @@
+from lora_e220_constants import AirDataRate
+from lora_e220_operation_constant import ResponseStatusCode
+
+
+def test_fixed_and_broadcast_messages(node):
+    sender = node(1)
+    receiver = node(2)
+    other = node(3)
+
+    assert sender.send_fixed_message(0, 2, 23, 'to two') == ResponseStatusCode.E220_SUCCESS
+    assert receiver.receive_message() == (ResponseStatusCode.E220_SUCCESS, 'to two')
+    assert other.available() == 0
+
+    assert sender.send_broadcast_message(23, 'to all') == ResponseStatusCode.E220_SUCCESS
+    assert receiver.receive_message() == (ResponseStatusCode.E220_SUCCESS, 'to all')
+    assert other.receive_message() == (ResponseStatusCode.E220_SUCCESS, 'to all')
+
+
+def test_rssi_byte(node):
+    sender = node(1, rssi=True)
+    receiver = node(2, rssi=True)
+
+    sender.send_fixed_message(0, 2, 23, 'hello')
+    assert receiver.receive_message(True) == (ResponseStatusCode.E220_SUCCESS, 'hello', 200)
+
+
+def test_packet_is_output_at_the_uart_speed(node, clock):
+    sender = node(1)
+    receiver = node(2)
+
+    # about 1ms a byte at 9600bps, the send returns about 20ms after the end on air
+    sender.send_fixed_message(0, 2, 23, 'x' * 100)
+    assert 0 < receiver.uart.any() < 100
+    clock.sleep_ms(200)
+    assert receiver.uart.any() == 100
+
+
+def test_polled_packets_are_framed_apart(node, clock):
+    sender = node(1)
+    receiver = node(2)
+
+    sender.send_fixed_message(0, 2, 23, 'one')
+    for _ in range(100):
+        receiver.poll()
+        clock.idle()
+    assert receiver.poll() == 1
+
+    sender.send_fixed_message(0, 2, 23, 'two')
+    assert receiver.receive_message() == (ResponseStatusCode.E220_SUCCESS, 'one')
+    assert receiver.receive_message() == (ResponseStatusCode.E220_SUCCESS, 'two')
+
+
+def test_configuration_round_trip(node):
+    lora = node(1)
+    module = lora.uart.module
+
+    code, configuration = lora.get_configuration()
+    assert code == ResponseStatusCode.E220_SUCCESS
+    configuration.CHAN = 40
+    configuration.SPED.airDataRate = AirDataRate.AIR_DATA_RATE_101_192
+    code, written = lora.set_configuration(configuration)
+    assert code == ResponseStatusCode.E220_SUCCESS
+    assert written.to_bytes()[3:] == configuration.to_bytes()[3:]
+
+    code, read = lora.get_configuration(refresh=True)
+    assert code == ResponseStatusCode.E220_SUCCESS
+    assert read.to_bytes()[3:] == configuration.to_bytes()[3:]
+
+    # a volatile write is lost at power off, a permanent one is not
+    read.CHAN = 50
+    assert lora.set_configuration(read, permanentConfiguration=False)[0] == ResponseStatusCode.E220_SUCCESS
+    module.power_cycle()
+    code, read = lora.get_configuration(refresh=True)
+    assert read.CHAN == 40
+    assert read.SPED.airDataRate == AirDataRate.AIR_DATA_RATE_101_192
+
+
+def test_key_is_write_only(node):
+    sender = node(1)
+    receiver = node(2)
+
+    code, configuration = sender.get_configuration()
+    configuration.CRYPT.CRYPT_H = 0x12
+    configuration.CRYPT.CRYPT_L = 0x34
+    assert sender.set_configuration(configuration)[0] == ResponseStatusCode.E220_SUCCESS
+    assert sender.uart.module.configuration.CRYPT.CRYPT_H == 0x12
+
+    code, read = sender.get_configuration(refresh=True)
+    assert (read.CRYPT.CRYPT_H, read.CRYPT.CRYPT_L) == (0, 0)
+
+    # the receiver with another key doesn't hear it
+    sender.send_fixed_message(0, 2, 23, 'secret')
+    assert receiver.receive_message()[0] != ResponseStatusCode.E220_SUCCESS
+
+
+def test_delimited_and_sized_reads(node):
+    sender = node(1)
+    receiver = node(2)
+
+    sender.send_fixed_message(0, 2, 23, 'one\ntwo\n')
+    assert receiver.receive_message(delimiter='\n') == (ResponseStatusCode.E220_SUCCESS, 'one')
+    assert receiver.receive_message(delimiter=b'\n') == (ResponseStatusCode.E220_SUCCESS, 'two')
+
+    sender.send_fixed_message(0, 2, 23, 'abcdef')
+    assert receiver.receive_message(size=4) == (ResponseStatusCode.E220_SUCCESS, 'abcd')
+    assert receiver.receive_message(size=4) == (ResponseStatusCode.E220_SUCCESS, 'ef')
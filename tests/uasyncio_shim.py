@@ -0,0 +1,57 @@
+# The uasyncio API used by lora_e220_async, on CPython asyncio and on the virtual clock of the
+# simulated modules: the sleeps advance the clock (no real time), the streams poll the UART
+# object without blocking like the uasyncio ones. The tests set clock before running.
+import asyncio
+
+TimeoutError = asyncio.TimeoutError
+clock = None
+
+
+async def sleep_ms(ms):
+    clock.sleep_ms(ms)
+    await asyncio.sleep(0)
+
+
+async def wait_for_ms(awaitable, timeout):
+    task = asyncio.ensure_future(awaitable)
+    start = clock.ticks_ms()
+    while not task.done():
+        if clock.ticks_diff(clock.ticks_ms(), start) > timeout:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            raise TimeoutError
+        await asyncio.sleep(0)
+    return task.result()
+
+
+class StreamReader:
+    def __init__(self, stream, extra=None):
+        self.stream = stream
+
+    async def readexactly(self, size):
+        data = b''
+        while len(data) < size:
+            chunk = self.stream.read(size - len(data))
+            if chunk:
+                data += chunk
+            else:
+                await sleep_ms(1)
+        return data
+
+
+class StreamWriter:
+    def __init__(self, stream, extra=None):
+        self.stream = stream
+        self.out = b''
+
+    def write(self, data):
+        self.out += bytes(data)
+
+    async def drain(self):
+        data, self.out = self.out, b''
+        while data:
+            data = data[self.stream.write(data):]
+            await asyncio.sleep(0)